@@ -5,10 +5,29 @@ A system for managing conversations between AI agents with different roles
 and capabilities, including file management and image generation.
 """
 
-from .agents import Agent
-from .image_generator import ImageGenerator
-from .file_manager import FileManager
-from .conversation_manager import ConversationManager
+import importlib
 
 __version__ = "1.0.0"
 __all__ = ["Agent", "ImageGenerator", "FileManager", "ConversationManager"]
+
+# Public names and the modules defining them. They are imported on first
+# attribute access so importing the package stays cheap.
+_LAZY_ATTRIBUTES = {
+    "Agent": ".agents",
+    "ImageGenerator": ".image_generator",
+    "FileManager": ".file_manager",
+    "ConversationManager": ".conversation_manager",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
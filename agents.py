@@ -1,10 +1,60 @@
-import requests
 import re
-import os
-from dotenv import load_dotenv
+import time
+from contextlib import nullcontext
+from context_window import ContextWindow, content_hash
+from environment import getenv
+from metrics import counter, gauge, histogram
+from project_delta import ProjectView
+from tracing import traced
 
-# Load environment variables
-load_dotenv()
+# Shared connection pool so consecutive LLM calls reuse warm connections,
+# created on the first real LLM call so importing agents stays cheap
+http_session = None
+
+
+def get_http_session():
+    global http_session
+    if http_session is None:
+        import requests
+
+        http_session = requests.Session()
+    return http_session
+
+
+# Optional semaphore bounding concurrent LLM calls, possibly shared between
+# processes by the batch runner
+llm_limiter = None
+
+
+def set_llm_limiter(limiter):
+    """Bound concurrent LLM calls with a (multiprocessing) semaphore"""
+    global llm_limiter
+    llm_limiter = limiter
+
+
+LLM_LATENCY = histogram(
+    "llm_request_duration_seconds",
+    "Time taken to get a reply from the LLM",
+    ["agent", "provider"],
+)
+LLM_REQUESTS = counter(
+    "llm_requests_total",
+    "LLM calls by HTTP status, connection_error or exception",
+    ["provider", "status"],
+)
+LLM_TOKENS = counter(
+    "llm_tokens_total",
+    "Prompt and reply tokens reported by the LLM API",
+    ["agent", "kind"],
+)
+AGENT_MESSAGES = gauge(
+    "agent_history_messages", "Messages in an agent's history", ["agent"]
+)
+AGENT_HISTORY_CHARS = gauge(
+    "agent_history_characters",
+    "Characters in an agent's message history",
+    ["agent"],
+)
 
 
 class Agent:
@@ -16,6 +66,8 @@ class Agent:
         can_write_files=False,
         can_read_files=False,
         can_generate_images=False,
+        reviews_code=False,
+        audits_performance=False,
         model_name="qwen/qwen3-1.7b",
     ):
         self.name = name
@@ -24,13 +76,25 @@ class Agent:
         self.can_write_files = can_write_files
         self.can_read_files = can_read_files
         self.can_generate_images = can_generate_images
+        # Receives static analysis findings with every prompt
+        self.reviews_code = reviews_code
+        # Receives performance budget violations of the pages
+        self.audits_performance = audits_performance
         self.model_name = model_name
+        # Project files as of this agent's last prompt
+        self.project_view = ProjectView()
+        # Once the full listing is compacted away, the next prompt sends it
+        # again rather than changes relative to it
+        self.context = ContextWindow(
+            name, on_baseline_lost=self.project_view.reset
+        )
         self.messages = [
             {
                 "role": "user",
                 "content": f"Your name is {self.name} and your personality is {self.personality} You work together with other employees of a development team and should help each other out. {self.get_file_instructions()}",
             }
         ]
+        self._record_history()
 
     def _filter_thinking_sections(self, text):
         """Remove thinking sections between <think> and </think> tags"""
@@ -51,7 +115,12 @@ class Agent:
 FILE_ACTION: READ
 FILENAME: file.ext
 
-This will show you the current content of the file so you can analyze and understand how to improve it. Always read existing files before making modifications to understand the current structure and implementation."""
+This will show you the current content of the file so you can analyze and understand how to improve it. Always read existing files before making modifications to understand the current structure and implementation.
+
+To see which files link to, embed or style a file (and what it links to) without reading it, or use * for the navigation menus, broken links and missing images of the whole site:
+
+FILE_ACTION: REFERENCES
+FILENAME: file.ext"""
 
         if self.can_write_files:
             instructions += """
@@ -91,26 +160,49 @@ IMPORTANT: When referencing images in HTML files, use relative paths like "image
 
         return instructions
 
-    def update_messages(self, name, message):
-        self.messages.append(
-            {"role": "user", "content": name + ": " + message}
+    def update_messages(
+        self, name, message, file=None, file_content=None, baseline=False
+    ):
+        """
+        Append a message; file marks the body of a file that was read, with
+        file_content its content, baseline a message carrying the full
+        project listing
+        """
+        entry = {"role": "user", "content": name + ": " + message}
+        if file:
+            entry["file"] = file
+            if file_content is not None:
+                entry["file_hash"] = content_hash(file_content)
+                entry["file_chars"] = len(file_content)
+        if baseline:
+            entry["baseline"] = True
+        self.messages.append(entry)
+        self.context.fit(self.messages)
+        self._record_history()
+
+    def _record_history(self):
+        AGENT_MESSAGES.labels(self.name).set(len(self.messages))
+        AGENT_HISTORY_CHARS.labels(self.name).set(
+            sum(len(m["content"]) for m in self.messages)
         )
 
-    def get_response(self, name, prompt, project_files=None):
-        # Add context about existing files
+    @traced(
+        "get_response", "llm", detail=lambda agent, *a: {"agent": agent.name}
+    )
+    def get_response(self, name, prompt, project_files=None, knowledge=None):
+        # Add context about existing files: the full listing the first
+        # time, afterwards only what changed since this agent's last prompt
         context_prompt = prompt
+        baseline = False
         if project_files and (
             self.can_write_files
             or self.can_read_files
             or self.can_generate_images
         ):
-            files_info = "\n\nCurrent project files:\n"
-            for file_path, content in project_files.items():
-                if isinstance(content, str):
-                    files_info += f"- {file_path}: {len(content)} characters\n"
-                else:
-                    files_info += f"- {file_path}: image file\n"
-            context_prompt = prompt + files_info
+            baseline = self.project_view.files is None
+            context_prompt = prompt + self.project_view.report(
+                project_files, knowledge
+            )
 
         # LMStudio API call (commented out)
         # try:
@@ -136,13 +228,9 @@ IMPORTANT: When referencing images in HTML files, use relative paths like "image
         #     )
 
         # Google AI Studio API call
+        provider = getenv("LLM_PROVIDER", "gemini").lower()
+        start = time.perf_counter()
         try:
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError(
-                    "GOOGLE_API_KEY not found in environment variables"
-                )
-
             # Convert messages to Google AI Studio format
             conversation_text = ""
             for msg in self.messages:
@@ -152,55 +240,98 @@ IMPORTANT: When referencing images in HTML files, use relative paths like "image
                     conversation_text += f"Assistant: {msg['content']}\n"
             conversation_text += f"User: {name}: {context_prompt}\n"
 
-            response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}",
-                headers={
-                    "Content-Type": "application/json",
-                },
-                json={"contents": [{"parts": [{"text": conversation_text}]}]},
-                timeout=60,
-            )
+            if provider == "stub":
+                import stub_llm
 
-            if response.status_code == 200:
-                response_data = response.json()
-                message_content = response_data["candidates"][0]["content"][
-                    "parts"
-                ][0]["text"]
-                # Filter out thinking sections
-                message_content = self._filter_thinking_sections(
-                    message_content
-                )
+                # Offline deterministic replies for local runs and tests
+                with llm_limiter or nullcontext():
+                    message_content = stub_llm.generate(
+                        self.name, conversation_text
+                    )
+                LLM_REQUESTS.labels(provider, "200").inc()
             else:
-                print(f"Google AI Studio API error: {response.status_code}")
-                print(f"Response: {response.text}")
-                message_content = f"Error: Failed to get response from Google AI Studio (status: {response.status_code})"
+                message_content = self._call_gemini(conversation_text)
 
-        except requests.exceptions.RequestException as e:
-            print(f"Google AI Studio connection error: {e}")
-            message_content = "Error: Could not connect to Google AI Studio. Check your internet connection and API key."
         except Exception as e:
+            LLM_REQUESTS.labels(provider, "exception").inc()
             print(f"Unexpected error: {e}")
             message_content = f"Error: {str(e)}"
+        LLM_LATENCY.labels(self.name, provider).observe(
+            time.perf_counter() - start
+        )
 
-        self.update_messages(name, prompt)
+        # The file report stays in the history, since later reports only
+        # describe what changed after it
+        self.update_messages(name, context_prompt, baseline=baseline)
         self.update_messages(self.name, message_content)
 
         return message_content
 
+    def _call_gemini(self, conversation_text):
+        """Send the conversation to Google AI Studio and return the reply"""
+        import requests
+
+        api_key = getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError(
+                "GOOGLE_API_KEY not found in environment variables"
+            )
+
+        try:
+            with llm_limiter or nullcontext():
+                response = get_http_session().post(
+                    f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}",
+                    headers={
+                        "Content-Type": "application/json",
+                    },
+                    json={
+                        "contents": [{"parts": [{"text": conversation_text}]}]
+                    },
+                    timeout=60,
+                )
+        except requests.exceptions.RequestException as e:
+            LLM_REQUESTS.labels("gemini", "connection_error").inc()
+            print(f"Google AI Studio connection error: {e}")
+            return "Error: Could not connect to Google AI Studio. Check your internet connection and API key."
+
+        LLM_REQUESTS.labels("gemini", str(response.status_code)).inc()
+        if response.status_code == 200:
+            response_data = response.json()
+            usage = response_data.get("usageMetadata", {})
+            LLM_TOKENS.labels(self.name, "prompt").inc(
+                usage.get("promptTokenCount", 0)
+            )
+            LLM_TOKENS.labels(self.name, "reply").inc(
+                usage.get("candidatesTokenCount", 0)
+            )
+            message_content = response_data["candidates"][0]["content"][
+                "parts"
+            ][0]["text"]
+            # Filter out thinking sections
+            message_content = self._filter_thinking_sections(message_content)
+        else:
+            print(f"Google AI Studio API error: {response.status_code}")
+            print(f"Response: {response.text}")
+            message_content = f"Error: Failed to get response from Google AI Studio (status: {response.status_code})"
+        return message_content
+
     def should_activate(self, context):
         """Check if this agent should respond based on current context"""
+        triggers = context.get("triggers", ())
         return any(
             trigger in context.get("phase", "")
             or trigger in context.get("keywords", [])
-            or trigger in context.get("last_message", "")
+            or trigger in triggers
             for trigger in self.activation_triggers
         )
 
     def reset_messages(self):
         """Reset agent messages to only the initial system prompt"""
+        self.project_view.reset()
         self.messages = [
             {
                 "role": "user",
                 "content": f"Your name is {self.name} and your personality is {self.personality}. {self.get_file_instructions()}",
             }
         ]
+        self._record_history()
@@ -0,0 +1,204 @@
+import threading
+import time
+from environment import getenv
+from metrics import counter, gauge
+
+QUEUE_DEPTH = gauge(
+    "comfyui_queue_depth",
+    "Running and pending jobs reported by a ComfyUI backend",
+    ["backend"],
+)
+IN_FLIGHT = gauge(
+    "comfyui_in_flight", "Jobs this process has on a backend", ["backend"]
+)
+EJECTIONS = counter(
+    "comfyui_backend_ejections_total",
+    "Times a backend was ejected as unhealthy",
+    ["backend"],
+)
+
+DEFAULT_ENDPOINT = "http://127.0.0.1:8188"
+
+
+class ComfyUIBackend:
+    """A single ComfyUI instance with its own connection pool and health"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._session = None
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.completed = 0
+
+    def __repr__(self):
+        return f"ComfyUIBackend({self.base_url!r})"
+
+    @property
+    def session(self):
+        """Connection pool for this backend, created on first request"""
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+        return self._session
+
+    @property
+    def load(self):
+        """Jobs ahead of a new submission: remote queue or our own jobs"""
+        return max(self.queue_depth, self.in_flight)
+
+    def is_healthy(self, now=None):
+        return (now or time.monotonic()) >= self.ejected_until
+
+    def probe(self):
+        """Check if this ComfyUI instance is running"""
+        try:
+            response = self.session.get(f"{self.base_url}/", timeout=2)
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def fetch_queue_depth(self):
+        """Running and pending job count from ComfyUI's /queue, or None"""
+        try:
+            response = self.session.get(f"{self.base_url}/queue", timeout=2)
+            if response.status_code != 200:
+                return None
+            queue = response.json()
+            return len(queue.get("queue_running", [])) + len(
+                queue.get("queue_pending", [])
+            )
+        except Exception:
+            return None
+
+
+class BackendPool:
+    """
+    Least-loaded dispatch over several ComfyUI instances.
+
+    Queue depths are refreshed from each backend's /queue endpoint at most
+    once per refresh interval. A backend that fails max_failures times in a
+    row is ejected for eject_seconds before it is tried again.
+    """
+
+    def __init__(
+        self,
+        endpoints=None,
+        max_failures=3,
+        eject_seconds=30.0,
+        refresh_interval=0.5,
+    ):
+        endpoints = endpoints or [DEFAULT_ENDPOINT]
+        self.backends = [ComfyUIBackend(url) for url in endpoints]
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a pool from the comma separated COMFYUI_ENDPOINTS variable"""
+        endpoints = [
+            url.strip()
+            for url in getenv("COMFYUI_ENDPOINTS", DEFAULT_ENDPOINT).split(",")
+            if url.strip()
+        ]
+        return cls(endpoints)
+
+    def __len__(self):
+        return len(self.backends)
+
+    def probe_all(self):
+        """Probe every backend, ejecting the ones that don't answer"""
+        for backend in self.backends:
+            if backend.probe():
+                backend.failures = 0
+                backend.ejected_until = 0.0
+            else:
+                self._eject(backend)
+        return self.healthy_backends()
+
+    def healthy_backends(self):
+        now = time.monotonic()
+        return [b for b in self.backends if b.is_healthy(now)]
+
+    def _eject(self, backend):
+        backend.failures = self.max_failures
+        backend.ejected_until = time.monotonic() + self.eject_seconds
+        EJECTIONS.labels(backend.base_url).inc()
+
+    def _refresh_queue_depths(self, backends):
+        """
+        Poll the backends' queues, at most once per refresh interval. The
+        requests are made without holding the lock, so a slow backend does
+        not stall other threads' acquire and release.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+        for backend in backends:
+            depth = backend.fetch_queue_depth()
+            with self._lock:
+                if depth is None:
+                    self._record_failure(backend)
+                else:
+                    backend.queue_depth = depth
+                    QUEUE_DEPTH.labels(backend.base_url).set(depth)
+
+    def acquire(self, exclude=()):
+        """
+        Reserve the least-loaded healthy backend, or return None if none is
+        available. Every acquire must be paired with a release.
+        """
+        candidates = [b for b in self.healthy_backends() if b not in exclude]
+        self._refresh_queue_depths(candidates)
+        with self._lock:
+            candidates = [b for b in candidates if b.is_healthy()]
+            if not candidates:
+                return None
+            backend = min(
+                candidates, key=lambda b: (b.load, b.in_flight, b.completed)
+            )
+            backend.in_flight += 1
+            # Counts towards the remote queue until the next refresh sees it
+            backend.queue_depth += 1
+            IN_FLIGHT.labels(backend.base_url).set(backend.in_flight)
+            return backend
+
+    def release(self, backend, success):
+        with self._lock:
+            backend.in_flight = max(0, backend.in_flight - 1)
+            backend.queue_depth = max(0, backend.queue_depth - 1)
+            IN_FLIGHT.labels(backend.base_url).set(backend.in_flight)
+            if success:
+                backend.failures = 0
+                backend.completed += 1
+            else:
+                self._record_failure(backend)
+
+    def _record_failure(self, backend):
+        backend.failures += 1
+        if backend.failures >= self.max_failures:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            EJECTIONS.labels(backend.base_url).inc()
+            print(f"⚠️ Ejecting unhealthy ComfyUI backend {backend.base_url}")
+
+    def status(self):
+        """Snapshot of every backend for display and debugging"""
+        now = time.monotonic()
+        return [
+            {
+                "url": b.base_url,
+                "healthy": b.is_healthy(now),
+                "in_flight": b.in_flight,
+                "queue_depth": b.queue_depth,
+                "failures": b.failures,
+                "completed": b.completed,
+            }
+            for b in self.backends
+        ]
@@ -0,0 +1,246 @@
+"""
+Headless batch runner for project jobs.
+
+Reads job specs from a JSONL file, one per line:
+
+    {"project": "bakery", "workflow": "project_creation", "prompt": "..."}
+    {"project": "bakery", "workflow": "add_new_page", "prompt": "..."}
+
+Jobs for the same project run in file order in one worker, each project in
+its own website_project/<name> directory. Different projects run in
+parallel across worker processes, with global limits on concurrent LLM calls
+and image jobs shared by all workers.
+
+Usage:
+    python batch_runner.py jobs.jsonl [--workers 4] [--llm-concurrency 8]
+        [--image-concurrency 2] [--report batch_report.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from pathlib import Path
+from session import WORKFLOWS
+
+
+def load_jobs(path):
+    """Read and validate job specs from a JSONL file"""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            spec = json.loads(line)
+            project = str(spec.get("project", "")).strip()
+            workflow = spec.get("workflow", "project_creation")
+            prompt = str(spec.get("prompt", "")).strip()
+
+            if not re.fullmatch(r"[\w.-]+", project) or project in (".", ".."):
+                raise ValueError(
+                    f"Line {line_number}: invalid project name {project!r}"
+                )
+            if workflow not in WORKFLOWS:
+                raise ValueError(
+                    f"Line {line_number}: unknown workflow {workflow!r}"
+                )
+            if not prompt:
+                raise ValueError(f"Line {line_number}: missing prompt")
+
+            jobs.append(
+                {
+                    "id": len(jobs),
+                    "project": project,
+                    "workflow": workflow,
+                    "prompt": prompt,
+                }
+            )
+    return jobs
+
+
+def _init_worker(llm_limiter, image_limiter, profile_dir=None, sample_ms=0):
+    """Install the shared concurrency limits (and profiler) in a worker"""
+    import agents
+    import image_generator
+
+    agents.set_llm_limiter(llm_limiter)
+    image_generator.set_image_limiter(image_limiter)
+    if profile_dir:
+        import profiler
+
+        profiler.install(profile_dir, sample_ms / 1000 if sample_ms else None)
+
+
+def _run_project_jobs(project_jobs, log_dir):
+    """Run all jobs of one project in order, logging output to a file"""
+    from session import get_session
+
+    results = []
+    log_path = Path(log_dir) / f"{project_jobs[0]['project']}.log"
+    with open(log_path, "a", encoding="utf-8") as log:
+        with redirect_stdout(log):
+            for job in project_jobs:
+                started = time.time()
+                start = time.perf_counter()
+                error = None
+                try:
+                    session = get_session(job["project"])
+                    session.run(job["workflow"], job["prompt"])
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    print(f"❌ Job {job['id']} failed: {error}")
+                log.flush()
+
+                project_dir = Path("website_project") / job["project"]
+                files = [p for p in project_dir.rglob("*") if p.is_file()]
+                results.append(
+                    {
+                        **{k: job[k] for k in ("id", "project", "workflow")},
+                        "status": "failed" if error else "succeeded",
+                        "error": error,
+                        "started_at": started,
+                        "seconds": round(time.perf_counter() - start, 3),
+                        "files": len(files),
+                        "bytes": sum(p.stat().st_size for p in files),
+                        "worker_pid": os.getpid(),
+                        "log": str(log_path),
+                    }
+                )
+    return results
+
+
+def run_batch(
+    jobs,
+    workers=4,
+    llm_concurrency=8,
+    image_concurrency=2,
+    log_dir="batch_logs",
+    profile_dir=None,
+    profile_sample_ms=0,
+):
+    """Run jobs across worker processes and return the report dict"""
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+
+    by_project = {}
+    for job in jobs:
+        by_project.setdefault(job["project"], []).append(job)
+
+    results = []
+    start = time.perf_counter()
+    with multiprocessing.Manager() as manager:
+        llm_limiter = manager.BoundedSemaphore(llm_concurrency)
+        image_limiter = manager.BoundedSemaphore(image_concurrency)
+
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(workers, len(by_project))),
+            initializer=_init_worker,
+            initargs=(
+                llm_limiter,
+                image_limiter,
+                profile_dir,
+                profile_sample_ms,
+            ),
+        ) as executor:
+            futures = {
+                executor.submit(_run_project_jobs, project_jobs, log_dir): name
+                for name, project_jobs in by_project.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    project_results = future.result()
+                except Exception as e:
+                    project_results = [
+                        {
+                            **{
+                                k: job[k]
+                                for k in ("id", "project", "workflow")
+                            },
+                            "status": "failed",
+                            "error": f"Worker crashed: {e}",
+                        }
+                        for job in by_project[futures[future]]
+                    ]
+                for result in project_results:
+                    print(
+                        f"{'✅' if result['status'] == 'succeeded' else '❌'} "
+                        f"[{result['id']}] {result['project']} "
+                        f"{result['workflow']} "
+                        f"({result.get('seconds', 0):.1f}s)"
+                    )
+                results.extend(project_results)
+
+    wall_seconds = time.perf_counter() - start
+    results.sort(key=lambda r: r["id"])
+    succeeded = sum(r["status"] == "succeeded" for r in results)
+    return {
+        "jobs": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "workers": workers,
+        "llm_concurrency": llm_concurrency,
+        "image_concurrency": image_concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "jobs_per_minute": round(len(results) / wall_seconds * 60, 2),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run project jobs in batch")
+    parser.add_argument("jobs", help="JSONL file with one job per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--image-concurrency", type=int, default=2)
+    parser.add_argument("--report", default="batch_report.json")
+    parser.add_argument("--log-dir", default="batch_logs")
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="write per-scenario CPU and memory profiles of every worker",
+    )
+    parser.add_argument(
+        "--profile-sample-ms",
+        type=float,
+        default=0,
+        help="also sample all stacks at this interval",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args.jobs)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot load jobs: {e}")
+        return 1
+    if not jobs:
+        print("❌ No jobs found.")
+        return 1
+
+    print(f"🚀 Running {len(jobs)} jobs with {args.workers} workers")
+    report = run_batch(
+        jobs,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        image_concurrency=args.image_concurrency,
+        log_dir=args.log_dir,
+        profile_dir=args.profile,
+        profile_sample_ms=args.profile_sample_ms,
+    )
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"📊 {report['succeeded']}/{report['jobs']} jobs succeeded in "
+        f"{report['wall_seconds']}s ({report['jobs_per_minute']} jobs/min)"
+    )
+    print(f"📄 Report written to {args.report}")
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Image backend pool benchmark.
+
+Starts several fake ComfyUI servers and measures image throughput as the
+number of backends grows.
+
+Usage:
+    python benchmarks/bench_backend_pool.py [--images 16] [--job-seconds 0.2]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_comfyui import FakeComfyUIServer  # noqa: E402
+from image_generator import ImageGenerator  # noqa: E402
+
+
+def run(backend_count, image_count, job_seconds):
+    servers = [
+        FakeComfyUIServer(job_seconds=job_seconds).start()
+        for _ in range(backend_count)
+    ]
+    try:
+        generator = ImageGenerator(endpoints=[s.url for s in servers])
+        generator.poll_interval = 0.02
+
+        with tempfile.TemporaryDirectory() as tmp:
+            requests_list = [
+                {
+                    "prompt": f"Benchmark image {i}",
+                    "style": "",
+                    "output_path": os.path.join(tmp, f"image_{i}.png"),
+                }
+                for i in range(image_count)
+            ]
+            start = time.perf_counter()
+            results = generator.generate_images(requests_list)
+            elapsed = time.perf_counter() - start
+
+        per_backend = [s.jobs_completed for s in servers]
+        return elapsed, sum(results), per_backend
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--job-seconds", type=float, default=0.2)
+    parser.add_argument("--backends", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    baseline = None
+    rows = []
+    for count in args.backends:
+        elapsed, succeeded, per_backend = run(
+            count, args.images, args.job_seconds
+        )
+        throughput = args.images / elapsed
+        baseline = baseline or throughput
+        rows.append(
+            f"{count:>8} {succeeded:>4}/{args.images:<4} {elapsed:8.2f}s "
+            f"{throughput:8.2f} img/s {throughput / baseline:6.2f}x  "
+            f"{per_backend}"
+        )
+
+    print("-" * 72)
+    print("backends  images     wall     throughput  scale  jobs per backend")
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cold start benchmark based on python -X importtime.
+
+Imports each entry module in a fresh interpreter, reports the cumulative
+import time and the slowest imports, and lists heavy third-party packages
+that got loaded eagerly. With --max-ms the script exits non-zero when an
+entry module takes longer than the budget, so regressions stay visible.
+
+Usage:
+    python benchmarks/bench_import_time.py [--runs 5] [--top 8] [--max-ms 50]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_MODULES = [
+    "main",
+    "development_simulation",
+    "conversation_manager",
+    "file_manager",
+    "agents",
+    "image_generator",
+    "batch_runner",
+    "job_service",
+]
+
+# Packages that should only load when an action actually needs them
+HEAVY_PACKAGES = ["PIL", "requests", "urllib3", "dotenv"]
+
+
+def import_profile(module):
+    """
+    Return ({imported module: cumulative us}, heavy packages loaded).
+    Interpreter startup (everything up to and including site) is left out.
+    """
+    code = (
+        f"import {module}, sys; "
+        f"print(','.join(p for p in {HEAVY_PACKAGES!r} if p in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        if name.strip() == "site":
+            timings = {}
+            continue
+        timings[name.strip()] = int(cumulative_us)
+    heavy = [p for p in result.stdout.strip().split(",") if p]
+    return timings, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("modules", nargs="*", default=ENTRY_MODULES)
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        runs = [import_profile(module) for _ in range(args.runs)]
+        totals = [timings.get(module, 0) / 1000 for timings, _ in runs]
+        median_ms = statistics.median(totals)
+        timings, heavy = runs[-1]
+
+        print(f"\n{module}: {median_ms:.1f} ms (median of {args.runs})")
+        print(f"  eager heavy packages: {', '.join(heavy) or 'none'}")
+        slowest = sorted(
+            (item for item in timings.items() if item[0] != module),
+            key=lambda item: item[1],
+            reverse=True,
+        )[: args.top]
+        for name, cumulative_us in slowest:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        if args.max_ms is not None and median_ms > args.max_ms:
+            failures.append(f"{module} ({median_ms:.1f} ms)")
+
+    if failures:
+        print(f"\n❌ Over the {args.max_ms} ms budget: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
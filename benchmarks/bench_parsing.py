@@ -0,0 +1,274 @@
+"""
+Micro-benchmarks for reply parsing and conversation heuristics.
+
+Times the pure-Python code that runs on every agent reply and every round:
+FileManager action parsing and markdown stripping, Agent thinking-section
+filtering, ConversationManager context heuristics and the project directory
+scan. Replies come from a synthetic corpus (1 KB up to several MB) and,
+optionally, a directory of recorded replies; project scans run over
+synthetic trees of different sizes. Results are reported as ops/s plus the
+peak and retained memory allocated per operation, measured with tracemalloc.
+
+File writes and image generation are replaced with no-ops so only parsing
+is measured.
+
+Usage:
+    python benchmarks/bench_parsing.py [--sizes 1 64 1024] [--json out.json]
+    python benchmarks/bench_parsing.py --corpus recorded_replies/ --filter image
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agents import Agent  # noqa: E402
+from conversation_manager import ConversationManager  # noqa: E402
+from file_manager import FileManager  # noqa: E402
+
+REPLY_BLOCK = """<think>
+The client wants page {n}; check the layout before writing anything.
+</think>
+
+Here is the update for section {n}. We were stuck on the grid but it's fixed now, looks good.
+
+**FILE_ACTION:** CREATE
+**FILENAME:** `page-{n}.html`
+CONTENT:
+```html
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <title>Page {n}</title>
+    <link rel="stylesheet" href="styles.css">
+</head>
+<body>
+    <main class="section-{n}">
+        <h1>Section {n}</h1>
+        <img src="images/photo-{n}.png" alt="Photo {n}">
+        <p>Some *emphasis* and __strong__ text with `code` for block {n}.</p>
+    </main>
+</body>
+</html>
+```
+
+1. IMAGE_ACTION: GENERATE
+- FILENAME: images/photo-{n}.png
+- PROMPT: Professional photo number {n} for the website
+- STYLE: modern, clean
+
+FILE_ACTION: READ
+FILENAME: styles.css
+
+"""
+
+TREE_FILES = [
+    ("page-{n}.html", "<html><body><h1>Page {n}</h1></body></html>\n" * 20),
+    ("css/style-{n}.css", ".section-{n} {{ margin: {n}px; }}\n" * 20),
+    ("js/script-{n}.js", "console.log('script {n}');\n" * 20),
+    ("images/photo-{n}.png", "\x89PNG fake image data"),
+]
+
+
+class NullImageGenerator:
+    """Accepts every image request without rendering anything"""
+
+    def generate_images(self, requests_list):
+        return [True] * len(requests_list)
+
+
+def synthetic_reply(size):
+    """A reply of about size bytes made of repeated action blocks"""
+    blocks = []
+    total = 0
+    while total < size:
+        blocks.append(REPLY_BLOCK.format(n=len(blocks) + 1))
+        total += len(blocks[-1])
+    return "".join(blocks)[: max(size, len(blocks[0]))]
+
+
+def load_corpus(sizes_kb, corpus_dir):
+    corpus = [
+        (f"synthetic {size}KB", synthetic_reply(size * 1024))
+        for size in sizes_kb
+    ]
+    if corpus_dir:
+        for path in sorted(Path(corpus_dir).rglob("*")):
+            if path.is_file():
+                text = path.read_text(encoding="utf-8", errors="replace")
+                corpus.append((f"{path.name} {len(text) // 1024}KB", text))
+    return corpus
+
+
+def build_tree(root, file_count):
+    """Write a synthetic project of file_count files under root"""
+    for i in range(file_count):
+        name, content = TREE_FILES[i % len(TREE_FILES)]
+        path = Path(root) / name.format(n=i)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content.format(n=i))
+
+
+def parsing_file_manager(project_dir):
+    file_manager = FileManager("bench", responsive_images=False)
+    file_manager.project_dir = Path(project_dir)
+    file_manager.create_file = lambda filename, content: None
+    file_manager.modify_file = lambda filename, content: None
+    file_manager.read_file = lambda filename: ""
+    file_manager._image_generator = NullImageGenerator()
+    return file_manager
+
+
+def reply_benchmarks(corpus, project_dir):
+    file_manager = parsing_file_manager(project_dir)
+    agent = Agent("Developer", "Benchmark agent")
+    conversation = ConversationManager([], "bench")
+
+    for label, reply in corpus:
+        lines = reply.split("\n")
+        yield "FileManager._process_file_actions", label, (
+            lambda reply=reply: file_manager._process_file_actions(reply)
+        )
+        yield "FileManager._process_image_actions", label, (
+            lambda reply=reply: file_manager._process_image_actions(reply)
+        )
+        yield "FileManager._strip_markdown", label, (
+            lambda lines=lines: [
+                file_manager._strip_markdown(line) for line in lines
+            ]
+        )
+        yield "Agent._filter_thinking_sections", label, (
+            lambda reply=reply: agent._filter_thinking_sections(reply)
+        )
+        yield "ContextMatcher.scan", label, (
+            lambda reply=reply: conversation.matcher.scan(reply)
+        )
+        yield "ConversationManager reply heuristics", label, (
+            lambda reply=reply: reply_heuristics(conversation, reply)
+        )
+
+
+def reply_heuristics(conversation, reply):
+    """Every keyword heuristic run on one fresh reply"""
+    conversation._scanned = (None, None)
+    conversation.analyze_context(reply)
+    conversation.update_context_from_response("Client", reply)
+    conversation.should_change_agents(reply)
+    conversation.should_end_round(reply)
+
+
+def scan_benchmarks(tree_sizes, root):
+    for file_count in tree_sizes:
+        tree = Path(root) / f"tree-{file_count}"
+        build_tree(tree, file_count)
+        conversation = ConversationManager([], "bench")
+        conversation.file_manager.project_dir = tree
+
+        def cold(conversation=conversation):
+            conversation.file_index.clear()
+            conversation.file_manager.project_files.clear()
+            conversation.load_all_project_files()
+
+        label = f"{file_count} files"
+        yield "ConversationManager.load_all_project_files (cold)", label, cold
+        yield (
+            "ConversationManager.load_all_project_files (warm)",
+            label,
+            conversation.load_all_project_files,
+        )
+
+
+def ops_per_second(func, min_time):
+    """Call func in growing batches until a batch takes min_time"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return number / elapsed
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+
+def allocations(func):
+    """Peak and retained bytes allocated by one call"""
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        end, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak - start, end - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1, 64, 1024, 4096],
+        help="synthetic reply sizes in KB",
+    )
+    parser.add_argument(
+        "--trees",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="synthetic project sizes in files",
+    )
+    parser.add_argument("--corpus", help="directory of recorded replies")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--filter", help="only run benchmarks matching this")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.sizes, args.corpus)
+    results = []
+    print(
+        f"{'benchmark':<52} {'input':<18} {'ops/s':>10} "
+        f"{'peak KB':>10} {'kept KB':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmarks = list(reply_benchmarks(corpus, tmp))
+        benchmarks += scan_benchmarks(args.trees, tmp)
+        for name, label, func in benchmarks:
+            if args.filter and args.filter.lower() not in name.lower():
+                continue
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    func()  # warm up caches and compiled regexes
+                    rate = ops_per_second(func, args.min_time)
+                    peak, retained = allocations(func)
+            results.append(
+                {
+                    "benchmark": name,
+                    "input": label,
+                    "ops_per_second": rate,
+                    "peak_bytes": peak,
+                    "retained_bytes": retained,
+                }
+            )
+            print(
+                f"{name:<52} {label:<18} {rate:>10.1f} "
+                f"{peak / 1024:>10.1f} {retained / 1024:>9.1f}"
+            )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
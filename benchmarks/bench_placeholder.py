@@ -0,0 +1,140 @@
+"""
+Placeholder image benchmark.
+
+Compares the original line-by-line placeholder renderer with the cached
+placeholder engine, single process and batched over a process pool.
+
+Usage:
+    python benchmarks/bench_placeholder.py [--count 40] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+from placeholder_renderer import (  # noqa: E402
+    render_batch,
+    render_placeholder,
+    wrap_text,
+)
+
+PROMPT = (
+    "Professional website hero image of a modern coffee shop interior with "
+    "warm lighting, wooden tables and customers working on laptops"
+)
+STYLE = "photorealistic, warm tones"
+
+
+def legacy_render(prompt, style, output_path):
+    """The placeholder renderer as it was before the cached engine"""
+    width, height = 800, 600
+    image = Image.new("RGB", (width, height), "#f0f0f0")
+    draw = ImageDraw.Draw(image)
+
+    for y in range(height):
+        color_value = int(240 - (y / height) * 40)
+        color = (color_value, color_value + 10, color_value + 20)
+        draw.line([(0, y), (width, y)], fill=color)
+
+    try:
+        font_large = ImageFont.truetype("arial.ttf", 24)
+        font_small = ImageFont.truetype("arial.ttf", 16)
+    except OSError:
+        font_large = ImageFont.load_default()
+        font_small = ImageFont.load_default()
+
+    lines = wrap_text(prompt, 50)
+    total_text_height = len(lines) * 30 + 60
+    y_offset = (height - total_text_height) // 2
+    for line in lines:
+        text_width = draw.textlength(line, font=font_large)
+        draw.text(
+            ((width - text_width) // 2, y_offset),
+            line,
+            fill="#333333",
+            font=font_large,
+        )
+        y_offset += 30
+
+    if style:
+        style_text = f"Style: {style}"
+        text_width = draw.textlength(style_text, font=font_small)
+        draw.text(
+            ((width - text_width) // 2, y_offset + 20),
+            style_text,
+            fill="#666666",
+            font=font_small,
+        )
+
+    draw.rectangle(
+        [10, 10, width - 10, height - 10], outline="#cccccc", width=2
+    )
+    image.save(output_path)
+    return True
+
+
+def measure(label, count, render):
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} {count:>5} images  {elapsed:8.3f}s  "
+        f"{count / elapsed:8.1f} img/s"
+    )
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        def paths(extension):
+            return [
+                os.path.join(tmp, f"image_{i}.{extension}")
+                for i in range(args.count)
+            ]
+
+        before = measure(
+            "legacy (png)",
+            args.count,
+            lambda: [legacy_render(PROMPT, STYLE, p) for p in paths("png")],
+        )
+        results = {}
+        for extension in ["png", "webp", "jpg"]:
+            results[extension] = measure(
+                f"cached ({extension})",
+                args.count,
+                lambda: [
+                    render_placeholder(PROMPT, STYLE, p)
+                    for p in paths(extension)
+                ],
+            )
+        batch = measure(
+            f"cached batch x{args.workers} (png)",
+            args.count,
+            lambda: render_batch(
+                [
+                    {"prompt": PROMPT, "style": STYLE, "output_path": p}
+                    for p in paths("png")
+                ],
+                max_workers=args.workers,
+            ),
+        )
+
+    print("-" * 60)
+    print(f"Speedup (single process, png): {results['png'] / before:.1f}x")
+    print(f"Speedup (batched, png):        {batch / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
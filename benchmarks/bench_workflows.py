@@ -0,0 +1,362 @@
+"""
+End-to-end offline benchmark of the simulation workflows.
+
+Runs every DevelopmentSimulation workflow against the stub LLM and a fake
+ComfyUI server, using a latency and response-size profile. For each workflow
+it reports wall time, the time spent in LLM calls, image generation, disk
+access and response parsing, the number of exchanges, bytes written and peak
+memory. Each run happens in its own process and a fresh copy of the project,
+so runs don't share caches or memory.
+
+Results can be saved as a baseline and later runs compared against it; the
+script exits non-zero when wall time or peak memory grows by more than the
+threshold.
+
+Usage:
+    python benchmarks/bench_workflows.py [--profile typical] [--runs 3]
+    python benchmarks/bench_workflows.py --save-baseline baseline.json
+    python benchmarks/bench_workflows.py --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PROJECT_NAME = "bench"
+
+# llm_latency and image_seconds are seconds per call, response_bytes is the
+# approximate size of every LLM reply
+PROFILES = {
+    "fast": {
+        "llm_latency": 0.0,
+        "response_bytes": 0,
+        "image_seconds": 0.0,
+        "image_size": [256, 256],
+    },
+    "typical": {
+        "llm_latency": 0.05,
+        "response_bytes": 4000,
+        "image_seconds": 0.2,
+        "image_size": [800, 600],
+    },
+    "slow": {
+        "llm_latency": 0.5,
+        "response_bytes": 32000,
+        "image_seconds": 1.0,
+        "image_size": [1024, 1024],
+    },
+}
+
+WORKFLOWS = {
+    "project_creation": "Build a website for a small coffee roastery",
+    "add_new_page": "Add an about page with the story of the roastery",
+    "improve_existing_page": "Improve the homepage hero and typography",
+    "add_images_to_website": "Add product photos for the coffee beans",
+    "add_custom_feature": "Add a contact form with validation",
+}
+
+CATEGORIES = ["llm", "image", "disk", "parse"]
+
+# Methods attributed to each category; time is exclusive, so a parse method
+# that writes a file only counts the parsing part
+INSTRUMENTED = {
+    ("agents", "Agent", "get_response"): "llm",
+    ("file_manager", "FileManager", "_process_image_actions"): "image",
+    ("file_manager", "FileManager", "_process_image_variants"): "image",
+    ("file_manager", "FileManager", "create_file"): "disk",
+    ("file_manager", "FileManager", "modify_file"): "disk",
+    ("file_manager", "FileManager", "read_file"): "disk",
+    (
+        "conversation_manager",
+        "ConversationManager",
+        "load_all_project_files",
+    ): "disk",
+    ("file_manager", "FileManager", "process_agent_response"): "parse",
+    (
+        "conversation_manager",
+        "ConversationManager",
+        "analyze_context",
+    ): "parse",
+    (
+        "conversation_manager",
+        "ConversationManager",
+        "update_context_from_response",
+    ): "parse",
+}
+
+
+class CategoryTimer:
+    """Exclusive time per category for nested, single-threaded calls"""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(CATEGORIES, 0.0)
+        self.calls = dict.fromkeys(CATEGORIES, 0)
+        self._stack = []
+
+    def wrap(self, category, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = [time.perf_counter(), 0.0]
+            self._stack.append(frame)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._stack.pop()
+                elapsed = time.perf_counter() - frame[0]
+                self.totals[category] += elapsed - frame[1]
+                self.calls[category] += 1
+                if self._stack:
+                    self._stack[-1][1] += elapsed
+
+        return wrapper
+
+
+def instrument(timer):
+    import importlib
+
+    for (module_name, class_name, method), category in INSTRUMENTED.items():
+        cls = getattr(importlib.import_module(module_name), class_name)
+        setattr(cls, method, timer.wrap(category, getattr(cls, method)))
+
+
+def snapshot(directory):
+    return {
+        str(path): (path.stat().st_mtime_ns, path.stat().st_size)
+        for path in Path(directory).rglob("*")
+        if path.is_file()
+    }
+
+
+def bytes_written(before, after):
+    """Total size of the files that are new or changed"""
+    return sum(
+        size
+        for path, (mtime, size) in after.items()
+        if before.get(path) != (mtime, size)
+    )
+
+
+def configure_environment(profile, comfyui_url):
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY"] = str(profile["llm_latency"])
+    os.environ["STUB_LLM_RESPONSE_BYTES"] = str(profile["response_bytes"])
+    if comfyui_url:
+        os.environ["COMFYUI_ENDPOINTS"] = comfyui_url
+
+
+def build_simulation():
+    from development_simulation import DevelopmentSimulation
+
+    simulation = DevelopmentSimulation(PROJECT_NAME)
+    generator = simulation.conversation_manager.file_manager.image_generator
+    generator.poll_interval = 0.02
+    return simulation
+
+
+def run_workflow(workflow, work_dir, profile, comfyui_url, verbose, results):
+    """Child process: run one workflow in work_dir and report its metrics"""
+    os.chdir(work_dir)
+    configure_environment(profile, comfyui_url)
+    timer = CategoryTimer()
+    instrument(timer)
+
+    output = None if verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(output or sys.stdout):
+        simulation = build_simulation()
+        project_dir = simulation.conversation_manager.file_manager.project_dir
+        before = snapshot(project_dir)
+        start = time.perf_counter()
+        getattr(simulation, workflow)(WORKFLOWS[workflow])
+        wall = time.perf_counter() - start
+        after = snapshot(project_dir)
+
+    metrics = {
+        "wall_seconds": wall,
+        **{f"{c}_seconds": timer.totals[c] for c in CATEGORIES},
+        "exchanges": timer.calls["llm"],
+        "bytes_written": bytes_written(before, after),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / 1024,
+    }
+    metrics["other_seconds"] = wall - sum(timer.totals[c] for c in CATEGORIES)
+    results.put(metrics)
+
+
+def seed_project(seed_dir, profile, comfyui_url):
+    """Child process: create the project the follow-up workflows build on"""
+    os.chdir(seed_dir)
+    configure_environment(profile, comfyui_url)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        build_simulation().project_creation(WORKFLOWS["project_creation"])
+
+
+def in_process(target, *args):
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"{target.__name__} exited with {process.exitcode}")
+
+
+def benchmark(workflows, profile, runs, comfyui_url, verbose):
+    summary = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_dir = Path(tmp) / "seed"
+        seed_dir.mkdir()
+        if any(w != "project_creation" for w in workflows):
+            in_process(seed_project, seed_dir, profile, comfyui_url)
+
+        for workflow in workflows:
+            samples = []
+            for run in range(runs):
+                work_dir = Path(tmp) / f"{workflow}-{run}"
+                if workflow == "project_creation":
+                    work_dir.mkdir()
+                else:
+                    shutil.copytree(seed_dir, work_dir)
+
+                results = multiprocessing.Queue()
+                in_process(
+                    run_workflow,
+                    workflow,
+                    work_dir,
+                    profile,
+                    comfyui_url,
+                    verbose,
+                    results,
+                )
+                samples.append(results.get())
+                shutil.rmtree(work_dir)
+
+            summary[workflow] = {
+                key: (
+                    max(s[key] for s in samples)
+                    if key == "peak_rss_mb"
+                    else statistics.median(s[key] for s in samples)
+                )
+                for key in samples[0]
+            }
+            print_result(workflow, summary[workflow])
+    return summary
+
+
+def print_result(workflow, metrics):
+    breakdown = "  ".join(
+        f"{c} {metrics[f'{c}_seconds']:.2f}s" for c in CATEGORIES + ["other"]
+    )
+    print(
+        f"{workflow:<24} {metrics['wall_seconds']:7.2f}s  {breakdown}  "
+        f"{metrics['exchanges']:.0f} exchanges  "
+        f"{metrics['bytes_written'] / 1024:.0f} KB written  "
+        f"{metrics['peak_rss_mb']:.0f} MB peak"
+    )
+
+
+def compare(summary, baseline, threshold):
+    """Print changes against the baseline and return the regressions"""
+    regressions = []
+    print(f"\nCompared with baseline (threshold {threshold:.0%}):")
+    for workflow, metrics in summary.items():
+        previous = baseline.get(workflow)
+        if not previous:
+            print(f"  {workflow}: no baseline")
+            continue
+        for key in ["wall_seconds", "peak_rss_mb"]:
+            if not previous.get(key):
+                continue
+            change = metrics[key] / previous[key] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  ❌ regression"
+                regressions.append(f"{workflow} {key}")
+            print(
+                f"  {workflow:<24} {key:<13} {previous[key]:8.2f} -> "
+                f"{metrics[key]:8.2f} ({change:+.1%}){flag}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profile", choices=PROFILES, default="typical")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--workflows", nargs="+", choices=WORKFLOWS, default=list(WORKFLOWS)
+    )
+    parser.add_argument("--llm-latency", type=float)
+    parser.add_argument("--response-bytes", type=int)
+    parser.add_argument("--image-seconds", type=float)
+    parser.add_argument("--image-size", type=int, nargs=2)
+    parser.add_argument(
+        "--placeholders",
+        action="store_true",
+        help="skip the fake ComfyUI server and render placeholder images",
+    )
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--save-baseline", help="write results to this file")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    profile = dict(PROFILES[args.profile])
+    for key in profile:
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+    print(f"Profile {args.profile}: {json.dumps(profile)}\n")
+
+    server = None
+    if not args.placeholders:
+        from fake_comfyui import FakeComfyUIServer
+
+        server = FakeComfyUIServer(
+            job_seconds=profile["image_seconds"],
+            image_size=tuple(profile["image_size"]),
+        ).start()
+    try:
+        summary = benchmark(
+            args.workflows,
+            profile,
+            args.runs,
+            server.url if server else "http://127.0.0.1:9",
+            args.verbose,
+        )
+    finally:
+        if server:
+            server.stop()
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(
+            json.dumps(
+                {"profile": profile, "results": summary},
+                indent=2,
+            )
+        )
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("profile") != profile:
+            print("\n⚠️ Baseline was recorded with a different profile")
+        regressions = compare(summary, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
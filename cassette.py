@@ -0,0 +1,287 @@
+"""
+Record and replay every outbound HTTP request.
+
+With HTTP_CASSETTE=run.jsonl.gz and HTTP_CASSETTE_MODE=record, every request
+made through requests (Gemini calls, ComfyUI probes, jobs and downloads) is
+written to the cassette together with its response and timing. API keys in
+query strings, auth headers and bodies are redacted.
+
+With HTTP_CASSETTE_MODE=replay the same requests are answered from the
+cassette without touching the network. Requests are matched by method and
+URL, in recorded order, preferring an entry with the same body. Responses
+are returned instantly unless HTTP_CASSETTE_SPEED is set: 1 replays at the
+recorded latency, 10 at ten times the speed.
+"""
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from environment import getenv
+
+FORMAT_VERSION = 1
+REDACTED = "REDACTED"
+SECRET_PARAMS = {"key", "api_key", "apikey", "token", "access_token"}
+SECRET_HEADERS = {"authorization", "x-goog-api-key", "cookie", "set-cookie"}
+# Bodies are stored decoded, so transport encodings no longer apply
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding"}
+SECRET_ENV = ["GOOGLE_API_KEY"]
+TEXT_TYPES = ("text/", "application/json", "application/javascript")
+
+_active = None
+
+
+class CassetteMiss(Exception):
+    """A replayed run made a request that is not in the cassette"""
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def redact_url(url):
+    parts = urlsplit(url)
+    query = [
+        (name, REDACTED if name.lower() in SECRET_PARAMS else value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query, safe=",")))
+
+
+def _redact_text(text):
+    for name in SECRET_ENV:
+        secret = os.getenv(name)
+        if secret:
+            text = text.replace(secret, REDACTED)
+    return text
+
+
+def _redact_headers(headers):
+    return {
+        name: REDACTED if name.lower() in SECRET_HEADERS else value
+        for name, value in (headers or {}).items()
+        if name.lower() not in DROPPED_HEADERS
+    }
+
+
+def _encode_body(body, content_type=""):
+    """Store text bodies as text and anything else as base64"""
+    if body is None:
+        return None
+    if isinstance(body, str):
+        return {"text": _redact_text(body)}
+    if not content_type or content_type.startswith(TEXT_TYPES):
+        try:
+            return {"text": _redact_text(body.decode("utf-8"))}
+        except UnicodeDecodeError:
+            pass
+    return {"base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(body):
+    if not body:
+        return b""
+    if "text" in body:
+        return body["text"].encode("utf-8")
+    return base64.b64decode(body["base64"])
+
+
+def _full_url(url, kwargs):
+    """The URL with any params= merged in, as it goes over the wire"""
+    if not kwargs.get("params"):
+        return url
+    from requests.models import PreparedRequest
+
+    prepared = PreparedRequest()
+    prepared.prepare_url(url, kwargs["params"])
+    return prepared.url
+
+
+def _request_body(kwargs):
+    if kwargs.get("json") is not None:
+        return json.dumps(kwargs["json"], sort_keys=True)
+    return kwargs.get("data")
+
+
+def _body_digest(body):
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    if not isinstance(body, str):
+        return None
+    return hashlib.sha1(_redact_text(body).encode("utf-8")).hexdigest()
+
+
+class Recorder:
+    """Wraps Session.request and appends every exchange to the cassette"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = _open(path, "w")
+        self.start = time.monotonic()
+        self.count = 0
+        self._lock = threading.Lock()
+        self._write({"version": FORMAT_VERSION, "recorded_at": time.time()})
+
+    def _write(self, entry):
+        with self._lock:
+            self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.file.flush()
+
+    def wrap(self, request):
+        def recording_request(session, method, url, **kwargs):
+            started = time.monotonic()
+            response = request(session, method, url, **kwargs)
+            # Reading the body here means streamed downloads are buffered
+            # while recording; replays stream them from memory
+            content = response.content
+            body = _request_body(kwargs)
+            self._write(
+                {
+                    "offset": round(started - self.start, 4),
+                    "elapsed": round(time.monotonic() - started, 4),
+                    "method": method.upper(),
+                    "url": redact_url(_full_url(url, kwargs)),
+                    "request": {
+                        "headers": _redact_headers(kwargs.get("headers")),
+                        "body": _encode_body(body),
+                        "digest": _body_digest(body),
+                    },
+                    "response": {
+                        "status": response.status_code,
+                        "reason": response.reason,
+                        "headers": _redact_headers(dict(response.headers)),
+                        "body": _encode_body(
+                            content, response.headers.get("Content-Type", "")
+                        ),
+                    },
+                }
+            )
+            self.count += 1
+            return response
+
+        return recording_request
+
+    def close(self):
+        self.file.close()
+
+
+class Player:
+    """Answers requests from a recorded cassette"""
+
+    def __init__(self, path, speed=0.0):
+        self.path = path
+        self.speed = speed
+        self.entries = defaultdict(deque)
+        self.last = {}
+        self.count = 0
+        self._lock = threading.Lock()
+        with _open(path, "r") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported cassette version in {path}")
+            for line in f:
+                entry = json.loads(line)
+                self.entries[(entry["method"], entry["url"])].append(entry)
+
+    def _next_entry(self, method, url, digest):
+        key = (method.upper(), redact_url(url))
+        with self._lock:
+            queue = self.entries.get(key)
+            if queue:
+                match = next(
+                    (e for e in queue if e["request"]["digest"] == digest),
+                    queue[0],
+                )
+                queue.remove(match)
+                self.last[key] = match
+                self.count += 1
+                return match
+            # Polling loops may ask once more than they did when recording
+            if key in self.last:
+                return self.last[key]
+        raise CassetteMiss(f"No recorded response for {key[0]} {key[1]}")
+
+    def wrap(self, request):
+        from requests.models import Response
+        from requests.structures import CaseInsensitiveDict
+
+        def replaying_request(session, method, url, **kwargs):
+            entry = self._next_entry(
+                method,
+                _full_url(url, kwargs),
+                _body_digest(_request_body(kwargs)),
+            )
+            if self.speed > 0:
+                time.sleep(entry["elapsed"] / self.speed)
+
+            recorded = entry["response"]
+            content = _decode_body(recorded["body"])
+            response = Response()
+            response.status_code = recorded["status"]
+            response.reason = recorded["reason"]
+            response.headers = CaseInsensitiveDict(recorded["headers"])
+            response.url = url
+            if "text" in (recorded["body"] or {}):
+                response.encoding = "utf-8"
+            response.raw = io.BytesIO(content)
+            response._content = content
+            response._content_consumed = True
+            return response
+
+        return replaying_request
+
+    def close(self):
+        pass
+
+
+def active():
+    """The installed Recorder or Player, or None"""
+    return _active
+
+
+def install(path, mode="record", speed=0.0):
+    """Route all requests.Session traffic through a cassette"""
+    global _active
+    import atexit
+    import requests.sessions
+
+    if _active is not None:
+        return _active
+    if mode == "record":
+        _active = Recorder(path)
+    elif mode == "replay":
+        _active = Player(path, speed)
+        # The recorded run had a key; the replayed one doesn't need it
+        os.environ.setdefault("GOOGLE_API_KEY", REDACTED)
+        # Poll ComfyUI at the replay speed instead of once per second
+        os.environ.setdefault(
+            "COMFYUI_POLL_INTERVAL", str(1.0 / speed if speed > 0 else 0)
+        )
+    else:
+        raise ValueError(f"Unknown cassette mode: {mode}")
+
+    session_class = requests.sessions.Session
+    session_class.request = _active.wrap(session_class.request)
+    atexit.register(_active.close)
+    print(f"📼 HTTP cassette {mode}: {path}")
+    return _active
+
+
+def install_from_env():
+    """Install a cassette if HTTP_CASSETTE is set"""
+    path = getenv("HTTP_CASSETTE")
+    if not path:
+        return None
+    return install(
+        path,
+        getenv("HTTP_CASSETTE_MODE", "replay"),
+        float(getenv("HTTP_CASSETTE_SPEED", "0") or 0),
+    )
@@ -0,0 +1,215 @@
+"""
+Token budget for an agent's message history.
+
+Every message gets an estimated token count. When the history exceeds the
+budget, the oldest messages outside the most recent few are shrunk in two
+steps until it fits again:
+
+1. File bodies added by READ actions are replaced with a reference holding
+   the file's hash and size, starting with files that were read again later.
+2. Older turns are folded into a rolling summary message placed right after
+   the system prompt. Summaries of individual messages are cached by content
+   hash, so compacting the same reply for several agents is done once.
+
+The system prompt and the most recent messages are always kept verbatim.
+Messages marked as a baseline, such as an agent's full project listing, are
+compacted like any other, but the owner is told through on_baseline_lost so
+it can send the baseline again instead of referring to one the agent no
+longer sees.
+
+    AGENT_CONTEXT_TOKENS=16000   budget per agent, 0 keeps the full history
+    AGENT_CONTEXT_KEEP=6         recent messages that are never compacted
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from environment import getenv_int
+from metrics import counter
+
+DEFAULT_BUDGET = 16000
+DEFAULT_KEEP = 6
+# Roughly four characters per token for English text and markup
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 200
+SUMMARY_CACHE_SIZE = 2048
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+COMPACTIONS = counter(
+    "agent_context_compactions_total",
+    "Messages shrunk to fit an agent's context budget",
+    ["agent", "kind"],
+)
+
+_ACTION_LINE = re.compile(
+    r"^\W*(FILE_ACTION|IMAGE_ACTION|FILENAME)\W*\s*(.+)$", re.MULTILINE
+)
+_CODE_BLOCK = re.compile(r"```.*?(```|$)", re.DOTALL)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+_summaries = OrderedDict()
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def tokens(message):
+    """Estimated tokens of a message, cached on the message"""
+    if "tokens" not in message:
+        message["tokens"] = estimate_tokens(message["content"])
+    return message["tokens"]
+
+
+def summarize(content):
+    """
+    One line describing a message: who spoke, their first sentence and the
+    file and image actions they took. Cached by content hash.
+    """
+    key = content_hash(content)
+    summary = _summaries.get(key)
+    if summary is not None:
+        _summaries.move_to_end(key)
+        return summary
+
+    speaker, _, text = content.partition(": ")
+    actions = []
+    for kind, value in _ACTION_LINE.findall(text):
+        value = value.strip(" *`")
+        if kind == "FILENAME" and actions:
+            actions[-1] += f" {value}"
+        elif kind != "FILENAME":
+            actions.append(value)
+    prose = " ".join(_CODE_BLOCK.sub(" ", text).split())
+    first = _SENTENCE_END.split(prose, 1)[0][:SUMMARY_LINE_CHARS]
+    summary = f"- {speaker}: {first}"
+    if actions:
+        summary += f" [{'; '.join(actions)}]"
+
+    _summaries[key] = summary
+    if len(_summaries) > SUMMARY_CACHE_SIZE:
+        _summaries.popitem(last=False)
+    return summary
+
+
+class ContextWindow:
+    """Keeps one agent's message list within a token budget"""
+
+    def __init__(
+        self, agent_name, budget=None, keep=None, on_baseline_lost=None
+    ):
+        self.agent_name = agent_name
+        self.on_baseline_lost = on_baseline_lost
+        self.budget = (
+            getenv_int("AGENT_CONTEXT_TOKENS", DEFAULT_BUDGET)
+            if budget is None
+            else budget
+        )
+        self.keep = (
+            getenv_int("AGENT_CONTEXT_KEEP", DEFAULT_KEEP)
+            if keep is None
+            else keep
+        )
+
+    def total(self, messages):
+        return sum(tokens(m) for m in messages)
+
+    def fit(self, messages):
+        """Shrink messages in place until they fit the budget"""
+        if self.budget <= 0:
+            return
+        total = self.total(messages)
+        if total <= self.budget:
+            return
+        # Everything between the system prompt (and summary) and the most
+        # recent messages can be compacted
+        first = 2 if len(messages) > 1 and messages[1].get("summary") else 1
+        last = max(first, len(messages) - self.keep)
+
+        for index in self._stale_files(messages, first, last):
+            total -= self._evict_file(messages[index])
+            if total <= self.budget:
+                return
+
+        compacted = 0
+        lines = []
+        baseline_lost = False
+        while first + compacted < last and total > self.budget:
+            message = messages[first + compacted]
+            baseline_lost |= bool(message.get("baseline"))
+            lines.append(
+                message["summary_line"]
+                if "summary_line" in message
+                else summarize(message["content"])
+            )
+            total -= tokens(message)
+            compacted += 1
+        if compacted:
+            del messages[first : first + compacted]
+            total += self._extend_summary(messages, lines)
+            COMPACTIONS.labels(self.agent_name, "turn").inc(compacted)
+        if baseline_lost and self.on_baseline_lost:
+            self.on_baseline_lost()
+
+    def _stale_files(self, messages, first, last):
+        """File body messages to evict, files read again later first"""
+        seen = set()
+        superseded = []
+        others = []
+        for index in range(len(messages) - 1, first - 1, -1):
+            message = messages[index]
+            if "file" not in message or message.get("evicted"):
+                continue
+            if message["file"] in seen:
+                superseded.append(index)
+            elif index < last:
+                others.append(index)
+            seen.add(message["file"])
+        return sorted(superseded) + sorted(others)
+
+    def _evict_file(self, message):
+        """
+        Replace a file body with a reference holding the hash of the file's
+        content, if the message carries one; returns tokens freed
+        """
+        message["evicted"] = True
+        digest = message.get("file_hash")
+        size = message.get("file_chars", len(message["content"]))
+        reference = f"sha1 {digest}, " if digest else ""
+        message["content"] = (
+            f"system: Content of {message['file']} omitted "
+            f"({reference}{size} characters). "
+            f"Read the file again if you need it."
+        )
+        message["summary_line"] = f"- system: showed {message['file']}" + (
+            f" (sha1 {digest})" if digest else ""
+        )
+        before = tokens(message)
+        message["tokens"] = estimate_tokens(message["content"])
+        COMPACTIONS.labels(self.agent_name, "file").inc()
+        return before - message["tokens"]
+
+    def _extend_summary(self, messages, lines):
+        """Append lines to the rolling summary; returns its token growth"""
+        if len(messages) > 1 and messages[1].get("summary"):
+            summary = messages[1]
+            before = tokens(summary)
+        else:
+            summary = {"role": "user", "summary": True, "lines": []}
+            messages.insert(1, summary)
+            before = 0
+        summary["lines"].extend(lines)
+        # The summary gets at most a quarter of the budget; the oldest
+        # lines go first
+        while (
+            len(summary["lines"]) > 1
+            and estimate_tokens("\n".join(summary["lines"])) > self.budget // 4
+        ):
+            summary["lines"].pop(0)
+        summary["content"] = "\n".join([SUMMARY_HEADER] + summary["lines"])
+        summary["tokens"] = estimate_tokens(summary["content"])
+        return summary["tokens"] - before
@@ -1,7 +1,23 @@
 from file_manager import FileManager
+from keyword_matcher import ContextMatcher
+from knowledge_cache import KnowledgeCache
+from metrics import counter, histogram
+from round_control import RoundController
+from site_build import BUILD_DIR
+from tracing import traced
 import os
 from pathlib import Path
 
+ROUNDS = counter(
+    "conversation_rounds_total", "Conversation rounds by phase", ["phase"]
+)
+ROUND_EXCHANGES = histogram(
+    "conversation_round_exchanges",
+    "Agent replies per conversation round",
+    ["phase"],
+    buckets=(1, 2, 3, 4, 6, 9, 12, 15),
+)
+
 
 class ConversationManager:
     def __init__(self, agents, project_name):
@@ -16,11 +32,33 @@ class ConversationManager:
             "stuck_count": 0,
         }
         self.file_manager = FileManager(project_name)
+        # Modification time and size of every file loaded from disk, so
+        # repeated scans only re-read files that actually changed
+        self.file_index = {}
+        self._knowledge = None
+        # Phase, keyword, trigger and round signals of a message, found in
+        # one pass; the last scan is kept as every heuristic reads the same
+        # reply
+        self.matcher = ContextMatcher(
+            trigger
+            for agent in agents
+            for trigger in agent.activation_triggers
+        )
+        self._scanned = (None, None)
 
+    @property
+    def knowledge(self):
+        """Summaries of the project files, persisted in the project"""
+        if self._knowledge is None:
+            self._knowledge = KnowledgeCache(self.file_manager.project_dir)
+        return self._knowledge
+
+    @traced("load_all_project_files", "scan")
     def load_all_project_files(self):
         """
         Scan the entire project directory and load all files into project_files context.
         This ensures agents have access to all existing files, not just those created through file actions.
+        Files whose modification time and size are unchanged since the last scan are not read again.
         """
         project_dir = self.file_manager.project_dir
 
@@ -30,6 +68,8 @@ class ConversationManager:
 
         loaded_count = 0
         skipped_count = 0
+        unchanged_count = 0
+        seen = set()
 
         print(f"🔍 Scanning project directory: {project_dir}")
 
@@ -41,12 +81,23 @@ class ConversationManager:
                 for d in dirs
                 if not d.startswith(".")
                 and d not in ["__pycache__", "node_modules", ".git"]
+                and not (Path(root) == project_dir and d == BUILD_DIR)
             ]
 
             for file in files:
                 # Skip hidden files and common non-text files
                 if file.startswith(".") or file.endswith(
-                    (".pyc", ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg")
+                    (
+                        ".pyc",
+                        ".png",
+                        ".jpg",
+                        ".jpeg",
+                        ".gif",
+                        ".ico",
+                        ".svg",
+                        ".webp",
+                        ".avif",
+                    )
                 ):
                     skipped_count += 1
                     continue
@@ -58,6 +109,20 @@ class ConversationManager:
                     "\\", "/"
                 )  # Normalize path separators
 
+                seen.add(relative_path_str)
+                try:
+                    stat = file_path.stat()
+                    signature = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    skipped_count += 1
+                    continue
+                if (
+                    self.file_index.get(relative_path_str) == signature
+                    and relative_path_str in self.file_manager.project_files
+                ):
+                    unchanged_count += 1
+                    continue
+
                 try:
                     # Try to read the file as text
                     with open(file_path, "r", encoding="utf-8") as f:
@@ -67,6 +132,7 @@ class ConversationManager:
                     self.file_manager.project_files[relative_path_str] = (
                         content
                     )
+                    self.file_index[relative_path_str] = signature
                     loaded_count += 1
                     print(
                         f"  📄 Loaded: {relative_path_str} ({len(content)} characters)"
@@ -77,14 +143,24 @@ class ConversationManager:
                     self.file_manager.project_files[relative_path_str] = (
                         "binary_file"
                     )
+                    self.file_index[relative_path_str] = signature
                     loaded_count += 1
                     print(f"  🔧 Binary file: {relative_path_str}")
                 except Exception as e:
                     print(f"  ❌ Error loading {relative_path_str}: {str(e)}")
                     skipped_count += 1
 
-        print(f"✅ Loaded {loaded_count} files, skipped {skipped_count} files")
-        return loaded_count
+        # Forget files that were deleted since the last scan
+        for relative_path_str in list(self.file_index):
+            if relative_path_str not in seen:
+                del self.file_index[relative_path_str]
+                self.file_manager.project_files.pop(relative_path_str, None)
+
+        print(
+            f"✅ Loaded {loaded_count} files, {unchanged_count} unchanged, "
+            f"skipped {skipped_count} files"
+        )
+        return loaded_count + unchanged_count
 
     def refresh_project_context(self):
         """
@@ -101,6 +177,7 @@ class ConversationManager:
 
         # Clear all and reload
         self.file_manager.project_files.clear()
+        self.file_index.clear()
 
         # Reload from directory
         return self.load_all_project_files()
@@ -121,10 +198,16 @@ class ConversationManager:
 
         return active_agents[:3]  # Limit to 3 agents max per round
 
+    @traced("conversation round", "round")
     def run_conversation_round(
         self, initial_prompt, max_exchanges=3, debug=False
     ):
-        """Run one round of conversation with relevant agents"""
+        """
+        Run one round of conversation with relevant agents. max_exchanges
+        passes is the usual budget; RoundController ends the round earlier
+        when it stalls or repeats itself and extends it while files keep
+        changing.
+        """
 
         # Load all existing project files into context
         self.load_all_project_files()
@@ -139,14 +222,35 @@ class ConversationManager:
         print("-" * 50)
 
         current_message = initial_prompt
+        exchanges = 0
+        controller = RoundController(
+            max_exchanges,
+            any(
+                agent.can_write_files
+                or agent.can_read_files
+                or agent.can_generate_images
+                for agent in active_agents
+            ),
+        )
 
-        for round_num in range(max_exchanges):
+        while True:
             for agent in active_agents:
                 print(f"\n{agent.name}: ", end="")
+                message = current_message
+                if agent.reviews_code:
+                    message += self.file_manager.analysis_report()
+                if agent.audits_performance:
+                    message += self.file_manager.performance_report()
                 response = agent.get_response(
-                    "user", current_message, self.file_manager.project_files
+                    "user",
+                    message,
+                    self.file_manager.project_files,
+                    self.knowledge,
                 )
+                exchanges += 1
                 print(response)
+                changed = False
+                actions = []
 
                 # Debug action detection if requested
                 if debug and (
@@ -162,22 +266,42 @@ class ConversationManager:
                     or agent.can_read_files
                     or agent.can_generate_images
                 ):
+                    project_files = self.file_manager.project_files
+                    before = dict(project_files)
                     actions = self.file_manager.process_agent_response(
                         response
                     )
+                    # The agent knows what it just wrote, so its next file
+                    # report doesn't need to repeat it
+                    for filename, content in project_files.items():
+                        if content is not before.get(filename):
+                            agent.project_view.see(filename, content)
+                            changed |= content != before.get(filename)
                     for action in actions:
                         if (
                             isinstance(action, dict)
                             and action.get("type") == "read"
                         ):
+                            agent.project_view.see(
+                                action["filename"], action["content"]
+                            )
                             # Add read file content to agent's conversation history
                             file_content_message = f"File content of {action['filename']}:\n\n```\n{action['content']}\n```"
                             agent.update_messages(
-                                "system", file_content_message
+                                "system",
+                                file_content_message,
+                                file=action["filename"],
+                                file_content=action["content"],
                             )
                             print(
                                 f"🔧 {action['message']} (content added to conversation)"
                             )
+                        elif (
+                            isinstance(action, dict)
+                            and action.get("type") == "references"
+                        ):
+                            agent.update_messages("system", action["content"])
+                            print(f"🔧 {action['message']}")
                         elif isinstance(action, dict):
                             print(f"🔧 {action['message']}")
                         else:
@@ -185,6 +309,7 @@ class ConversationManager:
 
                 # Update context based on response
                 self.update_context_from_response(agent.name, response)
+                controller.record(response, changed, bool(actions))
                 current_message = response
 
                 # Check if we need to change active agents mid-conversation
@@ -192,101 +317,64 @@ class ConversationManager:
                     break
 
             # Check if conversation should continue
-            if self.should_end_round(current_message):
+            reason = controller.end_pass(
+                self.should_end_round(current_message)
+            )
+            if reason:
+                print(
+                    f"\n⏹️ Round ended after {controller.passes} "
+                    f"pass(es): {reason}"
+                )
                 break
 
+        ROUNDS.labels(context["phase"]).inc()
+        ROUND_EXCHANGES.labels(context["phase"]).observe(exchanges)
+
+    def signals(self, message):
+        """Keyword signals of a message, scanned once"""
+        if self._scanned[0] is not message:
+            self._scanned = (message, self.matcher.scan(message))
+        return self._scanned[1]
+
     def analyze_context(self, message):
         """Analyze the message to determine context and phase"""
-        message_lower = message.lower()
-
-        # Determine phase
-        if any(
-            word in message_lower
-            for word in ["design", "mockup", "ui", "layout"]
-        ):
-            phase = "design"
-        elif any(
-            word in message_lower
-            for word in ["code", "develop", "implement", "feature"]
-        ):
-            phase = "development"
-        elif any(
-            word in message_lower for word in ["test", "bug", "qa", "quality"]
-        ):
-            phase = "testing"
-        elif any(
-            word in message_lower
-            for word in ["requirements", "spec", "need", "want"]
-        ):
-            phase = "planning"
-        elif any(
-            word in message_lower for word in ["review", "feedback", "check"]
-        ):
-            phase = "review"
-        else:
-            phase = self.current_phase
-
-        # Extract keywords
-        keywords = [
-            word
-            for word in message_lower.split()
-            if word
-            in ["urgent", "deadline", "stuck", "help", "problem", "bug"]
-        ]
-
+        signals = self.signals(message)
         return {
-            "phase": phase,
-            "keywords": keywords,
+            "phase": signals.phase(self.current_phase),
+            "keywords": signals.keywords,
+            "triggers": signals.triggers,
             "last_message": message,
             "project_context": self.project_context,
         }
 
     def update_context_from_response(self, agent_name, response):
         """Update project context based on agent responses"""
-        response_lower = response.lower()
+        signals = self.signals(response)
 
-        if "stuck" in response_lower or "problem" in response_lower:
+        if "stuck" in signals:
             self.project_context["stuck_count"] += 1
-        elif "solved" in response_lower or "fixed" in response_lower:
+        elif "unstuck" in signals:
             self.project_context["stuck_count"] = max(
                 0, self.project_context["stuck_count"] - 1
             )
 
         if agent_name == "Client":
-            if any(
-                word in response_lower
-                for word in ["good", "great", "perfect", "love"]
-            ):
+            if "positive" in signals:
                 self.project_context["satisfaction_level"] = min(
                     1.0, self.project_context["satisfaction_level"] + 0.1
                 )
-            elif any(
-                word in response_lower
-                for word in ["bad", "terrible", "hate", "wrong"]
-            ):
+            elif "negative" in signals:
                 self.project_context["satisfaction_level"] = max(
                     0.0, self.project_context["satisfaction_level"] - 0.2
                 )
 
     def should_change_agents(self, response):
         """Check if we need different agents based on the response"""
-        return (
-            "need designer" in response.lower()
-            or "call the manager" in response.lower()
-            or "get qa" in response.lower()
-        )
+        return "change_agents" in self.signals(response)
 
     def should_end_round(self, message):
         """Determine if this conversation round should end"""
-        return any(
-            phrase in message.lower()
-            for phrase in [
-                "that sounds good",
-                "agreed",
-                "let's move forward",
-                "next step",
-            ]
-        )
+        return "end_round" in self.signals(message)
 
     def show_project_status(self):
         """Show current project files and structure"""
@@ -1,5 +1,13 @@
+import time
 from agents import Agent
 from conversation_manager import ConversationManager
+from environment import getenv
+from site_build import BUILD_DIR, SiteBuilder
+from site_transforms import SiteTransformer
+from tracing import span
+
+# Callables receiving the events of every simulation, e.g. the profiler
+event_hooks = []
 
 
 class DevelopmentSimulation:
@@ -18,6 +26,7 @@ class DevelopmentSimulation:
             ],
             can_write_files=True,
             can_read_files=True,
+            audits_performance=True,
         )
         self.client = Agent(
             "Client",
@@ -55,6 +64,7 @@ class DevelopmentSimulation:
             activation_triggers=["testing", "qa", "bug", "quality", "test"],
             can_write_files=True,
             can_read_files=True,
+            reviews_code=True,
         )
         self.manager = Agent(
             "Manager",
@@ -77,155 +87,227 @@ class DevelopmentSimulation:
         self.conversation_manager = ConversationManager(
             self.agents, project_name
         )
-
-    def project_creation(self, prompt):
-        print(f"=== STARTING PROJECT: {self.project_name} ===")
-        print("=== SCENARIO 1: Client wants to discuss requirements ===")
-        self.conversation_manager.run_conversation_round(prompt)
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 2: Developer implements the basic structure ===")
-        self.conversation_manager.run_conversation_round(
-            "Let's start implementing the website. Create the basic HTML structure with a homepage. Include proper DOCTYPE, head section with meta tags, title, and body structure. Also create a CSS file for styling and link it to the HTML. Make sure to create a solid foundation for the website."
+        # Callables receiving a dict for every workflow and scenario event
+        self.event_listeners = []
+        self.site = SiteTransformer(self.conversation_manager.file_manager)
+        self.builder = None
+        if getenv("SITE_BUILD", "1") != "0":
+            self.builder = SiteBuilder(
+                self.conversation_manager.file_manager.project_dir
+            )
+
+    def _emit(self, event_type, **data):
+        """Notify event listeners, e.g. the job service progress stream"""
+        event = {"type": event_type, "time": time.time(), **data}
+        for listener in event_hooks + self.event_listeners:
+            listener(event)
+
+    def _run_workflow(self, workflow, header, scenarios):
+        """
+        Run the scenarios of a workflow in order. Each scenario is a tuple of
+        (title, prompt) or (title, prompt, local), where local is a method
+        doing the scenario's work without the agents; the prompt is only used
+        if local finds nothing to work from. The project status is shown
+        after every scenario and all agents are reset at the end, also when a
+        scenario fails.
+        """
+        print(header)
+        self.site.start_workflow()
+        self._emit(
+            "workflow_started",
+            workflow=workflow,
+            project=self.project_name,
+            scenarios=len(scenarios),
         )
-
-        self.conversation_manager.show_project_status()
-
-        print(
-            "\n=== SCENARIO 3: Designer creates images and improves visuals ==="
+        workflow_start = time.perf_counter()
+
+        try:
+            for number, (title, prompt, *local) in enumerate(scenarios, 1):
+                prefix = "" if number == 1 else "\n"
+                print(f"{prefix}=== SCENARIO {number}: {title} ===")
+                self._emit("scenario_started", scenario=number, title=title)
+                scenario_start = time.perf_counter()
+
+                with span("scenario", "scenario", title=title):
+                    if not (local and self._run_local(local[0])):
+                        self.conversation_manager.run_conversation_round(
+                            prompt
+                        )
+                    self.conversation_manager.show_project_status()
+
+                self._emit(
+                    "scenario_finished",
+                    scenario=number,
+                    title=title,
+                    seconds=round(time.perf_counter() - scenario_start, 3),
+                )
+        except Exception as e:
+            self._emit(
+                "workflow_failed",
+                workflow=workflow,
+                error=f"{type(e).__name__}: {e}",
+                seconds=round(time.perf_counter() - workflow_start, 3),
+            )
+            raise
+        finally:
+            self.conversation_manager.reset_all_agents()
+
+        self._build_site()
+        self._emit(
+            "workflow_finished",
+            workflow=workflow,
+            seconds=round(time.perf_counter() - workflow_start, 3),
         )
-        self.conversation_manager.run_conversation_round(
-            "We need actual images for the website. Generate hero images and product photos that look professional."
-        )
-
-        self.conversation_manager.show_project_status()
-
-        print(
-            "\n=== SCENARIO 4: Developer implements the newly made images ==="
-        )
-        self.conversation_manager.run_conversation_round(
-            "IMPORTANT: Look at the images that have been generated and implement them into the existing HTML files. Review all HTML files in the project and update them to include the new images using proper <img> tags with relative paths (e.g., src='images/filename.png'). Update the CSS files to style the images appropriately and add any necessary JavaScript functionality. Make sure to modify the existing files to properly display and integrate the new images."
-        )
-
-        self.conversation_manager.show_project_status()
-        self.conversation_manager.reset_all_agents()
-
-    def add_new_page(self, page_request):
-        print(f"=== ADDING NEW PAGE TO PROJECT: {self.project_name} ===")
-        print("=== SCENARIO 1: Client specifies new page requirements ===")
-        self.conversation_manager.run_conversation_round(page_request)
-
-        self.conversation_manager.show_project_status()
 
+    def _build_site(self):
+        """Build stage: bring the project's dist/ up to date"""
+        if self.builder is None:
+            return
+        result = self.builder.build()
+        if result is None:
+            return
         print(
-            "\n=== SCENARIO 2: Designer creates layout and visual design for new page ==="
+            f"📦 Built {BUILD_DIR}/: {len(result['written'])} written, "
+            f"{result['unchanged']} unchanged, {len(result['removed'])} "
+            f"removed ({result['source_bytes']} -> {result['build_bytes']} "
+            f"bytes)"
         )
-        self.conversation_manager.run_conversation_round(
-            "Design the layout and visual elements for this new page. Consider how it fits with the existing website design and create any necessary images or graphics."
+        self._emit(
+            "site_built",
+            written=len(result["written"]),
+            unchanged=result["unchanged"],
+            removed=len(result["removed"]),
+            source_bytes=result["source_bytes"],
+            build_bytes=result["build_bytes"],
         )
 
-        self.conversation_manager.show_project_status()
+    def _run_local(self, transform):
+        """Run a local scenario; False if it has nothing to work from"""
+        self.conversation_manager.load_all_project_files()
+        return transform() is not None
+
+    def _sync_navigation(self):
+        changed = self.site.sync_navigation()
+        if changed is not None:
+            print(f"🧭 Navigation updated on {len(changed)} page(s)")
+            for page in changed:
+                print(f"  📄 {page}")
+        return changed
+
+    def _attach_images(self):
+        attached = self.site.attach_images()
+        if attached is not None:
+            print(f"🖼️ Attached {len(attached)} image(s)")
+            for page, image in attached:
+                print(f"  📄 {page}: {image}")
+        return attached
 
-        print("\n=== SCENARIO 3: Developer creates the new page ===")
-        self.conversation_manager.run_conversation_round(
-            "Look at the existing project files and create the new page with proper HTML structure, CSS styling, and any necessary JavaScript functionality. Make sure it matches the existing website's design and structure. Review all existing HTML files to understand the current design patterns, CSS classes, and layout structure before creating the new page."
+    def project_creation(self, prompt):
+        self._run_workflow(
+            "project_creation",
+            f"=== STARTING PROJECT: {self.project_name} ===",
+            [
+                ("Client wants to discuss requirements", prompt),
+                (
+                    "Developer implements the basic structure",
+                    "Let's start implementing the website. Create the basic HTML structure with a homepage. Include proper DOCTYPE, head section with meta tags, title, and body structure. Also create a CSS file for styling and link it to the HTML. Make sure to create a solid foundation for the website.",
+                ),
+                (
+                    "Designer creates images and improves visuals",
+                    "We need actual images for the website. Generate hero images and product photos that look professional.",
+                ),
+                (
+                    "Developer implements the newly made images",
+                    "IMPORTANT: Look at the images that have been generated and implement them into the existing HTML files. Review all HTML files in the project and update them to include the new images using proper <img> tags with relative paths (e.g., src='images/filename.png'). Update the CSS files to style the images appropriately and add any necessary JavaScript functionality. Make sure to modify the existing files to properly display and integrate the new images.",
+                ),
+            ],
         )
 
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 4: Developer updates navigation and links ===")
-        self.conversation_manager.run_conversation_round(
-            "IMPORTANT: Review ALL existing HTML files in the project and update each one to include navigation links to the new page. Look at the current navigation structure in each HTML file, then add appropriate <a> tags and update navigation menus consistently across all pages. Ensure the new page is properly integrated into the website structure by modifying every HTML file that contains navigation."
+    def add_new_page(self, page_request):
+        self._run_workflow(
+            "add_new_page",
+            f"=== ADDING NEW PAGE TO PROJECT: {self.project_name} ===",
+            [
+                ("Client specifies new page requirements", page_request),
+                (
+                    "Designer creates layout and visual design for new page",
+                    "Design the layout and visual elements for this new page. Consider how it fits with the existing website design and create any necessary images or graphics.",
+                ),
+                (
+                    "Developer creates the new page",
+                    "Look at the existing project files and create the new page with proper HTML structure, CSS styling, and any necessary JavaScript functionality. Make sure it matches the existing website's design and structure. Review all existing HTML files to understand the current design patterns, CSS classes, and layout structure before creating the new page.",
+                ),
+                (
+                    "Developer updates navigation and links",
+                    "IMPORTANT: Review ALL existing HTML files in the project and update each one to include navigation links to the new page. Look at the current navigation structure in each HTML file, then add appropriate <a> tags and update navigation menus consistently across all pages. Ensure the new page is properly integrated into the website structure by modifying every HTML file that contains navigation.",
+                    self._sync_navigation,
+                ),
+            ],
         )
 
-        self.conversation_manager.show_project_status()
-        self.conversation_manager.reset_all_agents()
-
     def improve_existing_page(self, improvement_request):
-        print(
-            f"=== IMPROVING EXISTING PAGE IN PROJECT: {self.project_name} ==="
-        )
-        print(
-            "=== SCENARIO 1: Client specifies page improvement requirements ==="
-        )
-        self.conversation_manager.run_conversation_round(improvement_request)
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 2: Designer reviews and updates page design ===")
-        self.conversation_manager.run_conversation_round(
-            "Review the existing page and create an improved design. Update the visual elements, layout, and styling. Generate any new images or graphics if needed to enhance the page."
-        )
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 3: Developer implements page improvements ===")
-        self.conversation_manager.run_conversation_round(
-            "IMPORTANT: Look at all existing project files to understand the current structure, then implement the page improvements. Identify which specific HTML file needs to be improved and modify that file with updated HTML structure, CSS styling, and JavaScript functionality as needed. Also update any related CSS files and ensure the improvements enhance user experience while maintaining consistency with the overall website design. Review the existing files first, then make the specific modifications."
+        self._run_workflow(
+            "improve_existing_page",
+            f"=== IMPROVING EXISTING PAGE IN PROJECT: {self.project_name} ===",
+            [
+                (
+                    "Client specifies page improvement requirements",
+                    improvement_request,
+                ),
+                (
+                    "Designer reviews and updates page design",
+                    "Review the existing page and create an improved design. Update the visual elements, layout, and styling. Generate any new images or graphics if needed to enhance the page.",
+                ),
+                (
+                    "Developer implements page improvements",
+                    "IMPORTANT: Look at all existing project files to understand the current structure, then implement the page improvements. Identify which specific HTML file needs to be improved and modify that file with updated HTML structure, CSS styling, and JavaScript functionality as needed. Also update any related CSS files and ensure the improvements enhance user experience while maintaining consistency with the overall website design. Review the existing files first, then make the specific modifications.",
+                ),
+            ],
         )
 
-        self.conversation_manager.show_project_status()
-        self.conversation_manager.reset_all_agents()
-
     def add_images_to_website(self, image_request):
-        print(f"=== ADDING IMAGES TO PROJECT: {self.project_name} ===")
-        print("=== SCENARIO 1: Client specifies image requirements ===")
-        self.conversation_manager.run_conversation_round(image_request)
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 2: Designer creates and generates images ===")
-        self.conversation_manager.run_conversation_round(
-            "Create and generate the requested images for the website. Use the IMAGE_ACTION format to generate professional, high-quality images that match the website's theme and purpose. Consider different image types like hero images, banners, icons, product photos, or background images as needed."
-        )
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 3: Developer implements images into website ===")
-        self.conversation_manager.run_conversation_round(
-            "IMPORTANT: Review all existing HTML files and implement the newly generated images into the appropriate pages. For each image generated, determine which HTML file(s) should display it, then update those files to include the images with proper <img> tags using relative paths (e.g., src='images/filename.png'), add appropriate alt text, and ensure responsive design. Update CSS files to style the images appropriately and ensure they integrate well with the existing layout. Modify every relevant HTML file to include the new images."
-        )
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 4: Developer optimizes image integration ===")
-        self.conversation_manager.run_conversation_round(
-            "Optimize the image integration by adding proper styling, responsive design features, and any necessary JavaScript functionality. Ensure images load efficiently and enhance the overall user experience."
+        self._run_workflow(
+            "add_images_to_website",
+            f"=== ADDING IMAGES TO PROJECT: {self.project_name} ===",
+            [
+                ("Client specifies image requirements", image_request),
+                (
+                    "Designer creates and generates images",
+                    "Create and generate the requested images for the website. Use the IMAGE_ACTION format to generate professional, high-quality images that match the website's theme and purpose. Consider different image types like hero images, banners, icons, product photos, or background images as needed.",
+                ),
+                (
+                    "Developer implements images into website",
+                    "IMPORTANT: Review all existing HTML files and implement the newly generated images into the appropriate pages. For each image generated, determine which HTML file(s) should display it, then update those files to include the images with proper <img> tags using relative paths (e.g., src='images/filename.png'), add appropriate alt text, and ensure responsive design. Update CSS files to style the images appropriately and ensure they integrate well with the existing layout. Modify every relevant HTML file to include the new images.",
+                    self._attach_images,
+                ),
+                (
+                    "Developer optimizes image integration",
+                    "Optimize the image integration by adding proper styling, responsive design features, and any necessary JavaScript functionality. Ensure images load efficiently and enhance the overall user experience.",
+                ),
+            ],
         )
 
-        self.conversation_manager.show_project_status()
-        self.conversation_manager.reset_all_agents()
-
     def add_custom_feature(self, feature_request):
-        print(f"=== ADDING CUSTOM FEATURE TO PROJECT: {self.project_name} ===")
-        print(
-            "=== SCENARIO 1: Client specifies custom feature requirements ==="
-        )
-        self.conversation_manager.run_conversation_round(feature_request)
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 2: Designer creates UI/UX for the feature ===")
-        self.conversation_manager.run_conversation_round(
-            "Design the user interface and user experience for the custom feature. Create mockups, determine the visual design, layout, and any necessary graphics or icons. Ensure the feature integrates well with the existing website design."
-        )
-
-        self.conversation_manager.show_project_status()
-
-        print(
-            "\n=== SCENARIO 3: Developer implements the feature functionality ==="
-        )
-        self.conversation_manager.run_conversation_round(
-            "IMPORTANT: Review all existing project files to understand the current website structure, then implement the custom feature functionality. Determine which HTML file(s) should contain the feature and modify those files to add the necessary HTML structure. Update or create CSS files to style the feature, and add JavaScript code to make the feature work. Ensure the feature is responsive, accessible, and integrates properly with the existing website by examining and modifying the appropriate existing files."
-        )
-
-        self.conversation_manager.show_project_status()
-
-        print("\n=== SCENARIO 4: Developer adds feature integration ===")
-        self.conversation_manager.run_conversation_round(
-            "IMPORTANT: Review ALL existing HTML files and integrate the custom feature with the rest of the website. Update navigation menus in each HTML file if needed, add links to the feature from relevant pages, and ensure the feature can be easily accessed by users. Look at each existing HTML file and make any necessary modifications to properly link to and integrate with the new feature."
+        self._run_workflow(
+            "add_custom_feature",
+            f"=== ADDING CUSTOM FEATURE TO PROJECT: {self.project_name} ===",
+            [
+                (
+                    "Client specifies custom feature requirements",
+                    feature_request,
+                ),
+                (
+                    "Designer creates UI/UX for the feature",
+                    "Design the user interface and user experience for the custom feature. Create mockups, determine the visual design, layout, and any necessary graphics or icons. Ensure the feature integrates well with the existing website design.",
+                ),
+                (
+                    "Developer implements the feature functionality",
+                    "IMPORTANT: Review all existing project files to understand the current website structure, then implement the custom feature functionality. Determine which HTML file(s) should contain the feature and modify those files to add the necessary HTML structure. Update or create CSS files to style the feature, and add JavaScript code to make the feature work. Ensure the feature is responsive, accessible, and integrates properly with the existing website by examining and modifying the appropriate existing files.",
+                ),
+                (
+                    "Developer adds feature integration",
+                    "IMPORTANT: Review ALL existing HTML files and integrate the custom feature with the rest of the website. Update navigation menus in each HTML file if needed, add links to the feature from relevant pages, and ensure the feature can be easily accessed by users. Look at each existing HTML file and make any necessary modifications to properly link to and integrate with the new feature.",
+                    self._sync_navigation,
+                ),
+            ],
         )
-
-        self.conversation_manager.show_project_status()
-        self.conversation_manager.reset_all_agents()
@@ -0,0 +1,55 @@
+import os
+
+_loaded = False
+
+
+def load_env():
+    """Load the .env file on first use instead of at import time"""
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        try:
+            from dotenv import load_dotenv
+        except ImportError:
+            return
+        load_dotenv()
+
+
+def getenv(name, default=None):
+    """os.getenv that makes sure .env has been loaded first"""
+    load_env()
+    return os.getenv(name, default)
+
+
+_warned = set()
+
+
+def warn_once(message):
+    """Print a configuration warning the first time it comes up"""
+    if message not in _warned:
+        _warned.add(message)
+        print(f"⚠️ {message}")
+
+
+def _getenv_number(name, default, convert):
+    value = getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return convert(value)
+    except ValueError:
+        fallback = (
+            "leaving it unset" if default is None else f"using {default}"
+        )
+        warn_once(f"Ignoring {name}={value!r}: not a number, {fallback}")
+        return default
+
+
+def getenv_int(name, default):
+    """Integer environment variable; malformed values fall back to default"""
+    return _getenv_number(name, default, int)
+
+
+def getenv_float(name, default):
+    """Float environment variable; malformed values fall back to default"""
+    return _getenv_number(name, default, float)
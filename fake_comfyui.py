@@ -0,0 +1,154 @@
+import io
+import json
+import queue
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from PIL import Image
+
+
+class FakeComfyUIServer:
+    """
+    In-process stand-in for a ComfyUI instance, for local testing and
+    benchmarks. It implements the endpoints ImageGenerator uses and processes
+    submitted jobs one at a time, like a single GPU, taking job_seconds each.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        job_seconds=0.2,
+        image_size=(800, 600),
+        outputs_per_job=1,
+    ):
+        self.job_seconds = job_seconds
+        self.outputs_per_job = outputs_per_job
+        self.pending = queue.Queue()
+        self.running = None
+        self.history = {}
+        self.jobs_completed = 0
+        self._lock = threading.Lock()
+
+        buffer = io.BytesIO()
+        Image.new("RGB", image_size, "#8899aa").save(buffer, format="PNG")
+        self.image_bytes = buffer.getvalue()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._threads = []
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self.httpd.serve_forever, daemon=True),
+            threading.Thread(target=self._worker, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.pending.put(None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def queue_state(self):
+        with self._lock:
+            running = [[0, self.running]] if self.running else []
+            pending = [[0, job_id] for job_id in list(self.pending.queue)]
+        return {"queue_running": running, "queue_pending": pending}
+
+    def _worker(self):
+        while True:
+            job_id = self.pending.get()
+            if job_id is None:
+                return
+            with self._lock:
+                self.running = job_id
+            time.sleep(self.job_seconds)
+            images = [
+                {
+                    "filename": f"{job_id}_{index:05d}.png",
+                    "subfolder": "",
+                    "type": "output",
+                }
+                for index in range(self.outputs_per_job)
+            ]
+            with self._lock:
+                self.history[job_id] = {"outputs": {"9": {"images": images}}}
+                self.running = None
+                self.jobs_completed += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == "/":
+                    self._send(200, b"ComfyUI", "text/html")
+                elif path == "/queue":
+                    self._send(200, server.queue_state())
+                elif path.startswith("/object_info/"):
+                    self._send(
+                        200,
+                        {
+                            "input": {
+                                "required": {
+                                    "ckpt_name": [["fake_model.safetensors"]]
+                                }
+                            }
+                        },
+                    )
+                elif path.startswith("/history/"):
+                    job_id = path.rsplit("/", 1)[1]
+                    with server._lock:
+                        entry = server.history.get(job_id)
+                    self._send(200, {job_id: entry} if entry else {})
+                elif path == "/view":
+                    query = parse_qs(urlparse(self.path).query)
+                    if not query.get("filename"):
+                        self._send(404, {"error": "missing filename"})
+                    else:
+                        self._send(200, server.image_bytes, "image/png")
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                if urlparse(self.path).path != "/prompt":
+                    self._send(404, {"error": "not found"})
+                    return
+                job_id = uuid.uuid4().hex
+                server.pending.put(job_id)
+                self._send(200, {"prompt_id": job_id, "number": 0})
+
+        return Handler
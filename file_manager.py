@@ -1,24 +1,61 @@
 import os
 from pathlib import Path
-from image_generator import ImageGenerator
+from image_variants import MANIFEST_NAME, ImageVariantPipeline
+from metrics import counter
+from perf_audit import PerformanceAuditor
+from reference_index import ReferenceIndex
+from site_build import BUILD_DIR
+from static_checks import StaticAnalyzer
+from tracing import traced
 
+FILES_WRITTEN = counter(
+    "files_written_total", "Project files created or modified", ["action"]
+)
+BYTES_WRITTEN = counter(
+    "file_bytes_written_total", "Bytes written to project text files"
+)
+
+# Callables receiving (project_dir, filename) after every file written to a
+# project, e.g. the preview server's live reload
+write_hooks = []
 
-class FileManager:
-    def __init__(self, project_name):
-        # Create the main website_project directory
-        main_project_dir = Path("website_project")
-        main_project_dir.mkdir(exist_ok=True)
-
-        # Create a subdirectory for this specific project
-        self.project_dir = main_project_dir / project_name
-        self.project_dir.mkdir(exist_ok=True)
-        self.project_files = {}
-        self.image_generator = ImageGenerator()
 
-        # Create images directory within the project folder
-        images_dir = self.project_dir / "images"
-        images_dir.mkdir(exist_ok=True)
+def _file_args(file_manager, filename, *args):
+    return {"file": filename}
 
+
+class FileManager:
+    def __init__(self, project_name, responsive_images=True):
+        # Directories are created when the first file is written
+        self.project_dir = Path("website_project") / project_name
+        self.project_files = {}
+        # Links, images, nav menus and selectors of the text files, kept
+        # current on every write
+        self.references = ReferenceIndex()
+        # Mechanical problems found in the written files, for QA
+        self.checks = StaticAnalyzer()
+        self.responsive_images = responsive_images
+        self._image_generator = None
+        self._image_variants = None
+        self._auditor = None
+
+    @property
+    def image_generator(self):
+        """Image generator, created (and ComfyUI probed) on first use"""
+        if self._image_generator is None:
+            from image_generator import ImageGenerator
+
+            self._image_generator = ImageGenerator()
+        return self._image_generator
+
+    @property
+    def image_variants(self):
+        """Post-processing stage producing responsive image variants"""
+        if self._image_variants is None and self.responsive_images:
+            self._image_variants = ImageVariantPipeline(self.project_dir)
+        return self._image_variants
+
+    @traced("process_agent_response", "parse")
     def process_agent_response(self, response):
         """Process agent response for file operations and image generation"""
         actions_performed = []
@@ -29,7 +66,10 @@ class FileManager:
 
         # Handle image generation
         if "IMAGE_ACTION:" in response:
-            actions_performed.extend(self._process_image_actions(response))
+            image_actions = self._process_image_actions(response)
+            actions_performed.extend(image_actions)
+            if self.image_variants and image_actions:
+                actions_performed.extend(self._process_image_variants())
 
         return actions_performed
 
@@ -115,12 +155,27 @@ class FileManager:
                     current_action = None
                     current_filename = None
 
+                elif current_action == "REFERENCES" and current_filename:
+                    content = self.describe_references(current_filename)
+                    print(f"🔗 {content}")
+                    actions_performed.append(
+                        {
+                            "type": "references",
+                            "filename": current_filename,
+                            "content": content,
+                            "message": f"Looked up references: {current_filename}",
+                        }
+                    )
+                    current_action = None
+                    current_filename = None
+
             elif "CONTENT:" in clean_line.upper():
                 in_content = True
                 current_content = []
 
         return actions_performed
 
+    @traced("image actions", "image")
     def _process_image_actions(self, response):
         """Process IMAGE_ACTION commands"""
         actions_performed = []
@@ -236,20 +291,18 @@ class FileManager:
                     current_style = ""
                     in_image_action = False
 
-        # Process all images one by one
+        # Process all images, batching placeholders when possible
         for request in image_requests:
             print(f"🎨 Generating image: {request['filename']}")
             print(f"📝 Prompt: {request['prompt']}")
             print(f"🎭 Style: {request['style']}")
 
-            success = (
-                self.image_generator.generate_image_with_stable_diffusion(
-                    request["prompt"], request["style"], request["output_path"]
-                )
-            )
+        results = self.image_generator.generate_images(image_requests)
 
+        for request, success in zip(image_requests, results):
             if success:
                 self.project_files[request["filename"]] = "image_file"
+                self._notify(request["filename"])
                 actions_performed.append(
                     f"✅ Generated image: {request['filename']}"
                 )
@@ -260,6 +313,62 @@ class FileManager:
 
         return actions_performed
 
+    @traced("image variants", "image")
+    def _process_image_variants(self):
+        """Build variants for new images and point existing HTML at them"""
+        actions_performed = []
+        images = [
+            filename
+            for filename, content in self.project_files.items()
+            if content == "image_file"
+        ]
+        processed = self.image_variants.process(images)
+        if not processed:
+            return actions_performed
+
+        for filename in processed:
+            actions_performed.append(
+                f"🖼️ Created responsive variants: {filename}"
+            )
+
+        # Rewrite pages that already reference the processed images
+        for html_path in self.project_dir.rglob("*.html"):
+            filename = html_path.relative_to(self.project_dir).as_posix()
+            if filename.startswith(f"{BUILD_DIR}/"):
+                continue
+            with open(html_path, "r", encoding="utf-8") as f:
+                content = f.read()
+            rewritten = self.image_variants.rewrite_html(content, filename)
+            if rewritten != content:
+                with open(html_path, "w", encoding="utf-8") as f:
+                    f.write(rewritten)
+                self.project_files[filename] = rewritten
+                self.references.update(filename, rewritten)
+                self._notify(filename)
+                actions_performed.append(
+                    f"🖼️ Updated image markup: {filename}"
+                )
+
+        return actions_performed
+
+    def _notify(self, filename):
+        for hook in write_hooks:
+            hook(self.project_dir, filename)
+
+    def _prepare_content(self, filename, content):
+        """Apply write-time transforms such as responsive image markup"""
+        if not self.responsive_images or not filename.lower().endswith(
+            (".html", ".htm")
+        ):
+            return content
+        # Only build the pipeline once the project has image variants
+        if (
+            self._image_variants is None
+            and not (self.project_dir / MANIFEST_NAME).exists()
+        ):
+            return content
+        return self.image_variants.rewrite_html(content, filename)
+
     def _strip_markdown(self, text):
         """Strip common markdown formatting from text"""
         import re
@@ -288,6 +397,7 @@ class FileManager:
             return value
         return ""
 
+    @traced("create_file", "disk", detail=_file_args)
     def create_file(self, filename, content):
         # Clean up the filename to prevent path issues
         filename = filename.strip()
@@ -298,13 +408,20 @@ class FileManager:
 
         file_path = self.project_dir / filename
         file_path.parent.mkdir(parents=True, exist_ok=True)
+        content = self._prepare_content(filename, content)
 
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
 
         self.project_files[filename] = content
+        self.references.update(filename, content)
+        self.checks.check(filename, content)
+        FILES_WRITTEN.labels("create").inc()
+        BYTES_WRITTEN.inc(len(content.encode("utf-8")))
+        self._notify(filename)
         print(f"✅ Created file: {filename}")
 
+    @traced("modify_file", "disk", detail=_file_args)
     def modify_file(self, filename, content):
         # Clean up the filename to prevent path issues
         filename = filename.strip()
@@ -314,26 +431,65 @@ class FileManager:
             filename = filename[1:]  # Remove leading backslash
 
         file_path = self.project_dir / filename
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        content = self._prepare_content(filename, content)
 
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
 
         self.project_files[filename] = content
+        self.references.update(filename, content)
+        self.checks.check(filename, content)
+        FILES_WRITTEN.labels("modify").inc()
+        BYTES_WRITTEN.inc(len(content.encode("utf-8")))
+        self._notify(filename)
         print(f"✅ Modified file: {filename}")
 
+    @traced("read_file", "disk", detail=_file_args)
     def read_file(self, filename):
         file_path = self.project_dir / filename
         if file_path.exists():
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
                 self.project_files[filename] = content
+                self.references.update(filename, content)
                 return content
         return None
 
+    def exists(self, filename):
+        """Whether a project-relative path is a known or existing file"""
+        return (
+            filename in self.project_files
+            or (self.project_dir / filename).is_file()
+        )
+
+    def describe_references(self, filename):
+        """Reference index query result for a file, or * for the site"""
+        self.references.sync(self.project_files)
+        return self.references.describe(filename, self.exists)
+
+    @traced("static analysis", "parse")
+    def analysis_report(self):
+        """Static analysis findings of the whole project for a prompt"""
+        self.references.sync(self.project_files)
+        self.checks.sync(self.project_files)
+        return self.checks.report(self.references, self.exists)
+
+    @traced("performance audit", "parse")
+    def performance_report(self):
+        """Performance budget violations of the pages on disk, for a prompt"""
+        if not self.project_dir.exists():
+            return ""
+        if self._auditor is None:
+            self._auditor = PerformanceAuditor(self.project_dir)
+        return self._auditor.report()
+
     def get_project_structure(self):
         """Get a summary of all project files"""
         structure = {}
         for root, dirs, files in os.walk(self.project_dir):
+            if Path(root) == self.project_dir and BUILD_DIR in dirs:
+                dirs.remove(BUILD_DIR)
             for file in files:
                 rel_path = os.path.relpath(
                     os.path.join(root, file), self.project_dir
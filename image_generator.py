@@ -1,21 +1,72 @@
+import os
 import random
-import requests
-from PIL import Image, ImageDraw, ImageFont
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from backend_pool import BackendPool
+from environment import getenv_float
+from metrics import counter, histogram
+from tracing import span, traced
+
+# Images are streamed from ComfyUI in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Optional semaphore bounding concurrent image jobs, possibly shared between
+# processes by the batch runner
+image_limiter = None
+
+
+def set_image_limiter(limiter):
+    """Bound concurrent image jobs with a (multiprocessing) semaphore"""
+    global image_limiter
+    image_limiter = limiter
+
+
+IMAGE_JOB_SECONDS = histogram(
+    "image_job_duration_seconds",
+    "Time per ComfyUI job attempt, including polling and download",
+    ["backend", "result"],
+)
+IMAGE_JOBS = counter(
+    "image_jobs_total", "Images by source and result", ["source", "result"]
+)
+
+
+def _result(success):
+    return "ok" if success else "failed"
 
 
 class ImageGenerator:
-    def __init__(self):
-        self.comfyui_available = self._check_comfyui()
+    def __init__(self, endpoints=None):
+        self.backend_pool = (
+            BackendPool(endpoints) if endpoints else BackendPool.from_env()
+        )
+        self.poll_interval = getenv_float("COMFYUI_POLL_INTERVAL", 1.0)
+        self.max_wait = 180
+        self._comfyui_available = None
+
+    @property
+    def comfyui_available(self):
+        """Whether any ComfyUI backend answers, probed on first use"""
+        if self._comfyui_available is None:
+            self._comfyui_available = self._check_comfyui()
+        return self._comfyui_available
+
+    @comfyui_available.setter
+    def comfyui_available(self, value):
+        self._comfyui_available = value
 
     def _check_comfyui(self):
-        """Check if ComfyUI is running"""
-        try:
-            response = requests.get("http://127.0.0.1:8188/", timeout=2)
-            if response.status_code == 200:
-                print("✅ ComfyUI detected and ready")
-                return True
-        except Exception:
-            print("⚠️ ComfyUI not detected, will use placeholder images")
+        """Check which ComfyUI instances are running"""
+        healthy = self.backend_pool.probe_all()
+        if healthy:
+            print(
+                f"✅ ComfyUI detected and ready ({len(healthy)}/"
+                f"{len(self.backend_pool)} backends)"
+            )
+            return True
+        print("⚠️ ComfyUI not detected, will use placeholder images")
         return False
 
     def generate_image_with_stable_diffusion(
@@ -36,15 +87,43 @@ class ImageGenerator:
             return self._generate_placeholder_image(prompt, style, output_path)
 
     def _comfyui_generate(self, prompt, style, output_path):
-        """Generate image using ComfyUI API"""
+        """
+        Generate image on the least-loaded ComfyUI backend, moving on to the
+        next backend if one fails
+        """
+        tried = []
+        while len(tried) < len(self.backend_pool):
+            backend = self.backend_pool.acquire(exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+            success = False
+            start = time.perf_counter()
+            try:
+                with image_limiter or nullcontext():
+                    success = self._comfyui_generate_on(
+                        backend, prompt, style, output_path
+                    )
+            finally:
+                self.backend_pool.release(backend, success)
+                IMAGE_JOB_SECONDS.labels(
+                    backend.base_url, _result(success)
+                ).observe(time.perf_counter() - start)
+                IMAGE_JOBS.labels("comfyui", _result(success)).inc()
+            if success:
+                return True
+        return False
+
+    def _comfyui_generate_on(self, backend, prompt, style, output_path):
+        """Generate image using the ComfyUI API of one backend"""
         try:
             full_prompt = f"{prompt}, {style}" if style else prompt
 
             # Get available models
             model_name = "sd_xl_base_1.0.safetensors"  # Default
             try:
-                response = requests.get(
-                    "http://127.0.0.1:8188/object_info/CheckpointLoaderSimple",
+                response = backend.session.get(
+                    f"{backend.base_url}/object_info/CheckpointLoaderSimple",
                     timeout=5,
                 )
                 if response.status_code == 200:
@@ -119,8 +198,8 @@ class ImageGenerator:
             }
 
             # Submit the workflow
-            response = requests.post(
-                "http://127.0.0.1:8188/prompt",
+            response = backend.session.post(
+                f"{backend.base_url}/prompt",
                 json={"prompt": workflow},
                 timeout=120,
             )
@@ -131,14 +210,13 @@ class ImageGenerator:
 
                 if prompt_id:
                     # Poll for completion
-                    import time
-
-                    for _ in range(180):  # Wait up to 180 seconds
-                        time.sleep(1)
+                    deadline = time.monotonic() + self.max_wait
+                    while time.monotonic() < deadline:
+                        time.sleep(self.poll_interval)
 
                         # Check if generation is complete
-                        history_response = requests.get(
-                            f"http://127.0.0.1:8188/history/{prompt_id}",
+                        history_response = backend.session.get(
+                            f"{backend.base_url}/history/{prompt_id}",
                             timeout=5,
                         )
 
@@ -149,24 +227,17 @@ class ImageGenerator:
                                 and "outputs" in history[prompt_id]
                             ):
                                 outputs = history[prompt_id]["outputs"]
-                                if "9" in outputs and "images" in outputs["9"]:
-                                    # Get the generated image
-                                    image_info = outputs["9"]["images"][0]
-                                    filename = image_info["filename"]
-
-                                    # Download the image from ComfyUI
-                                    image_response = requests.get(
-                                        f"http://127.0.0.1:8188/view?filename={filename}",
-                                        timeout=30,
+                                images = [
+                                    image_info
+                                    for node_output in outputs.values()
+                                    for image_info in node_output.get(
+                                        "images", []
+                                    )
+                                ]
+                                if images:
+                                    return self._download_outputs(
+                                        backend, images, output_path
                                     )
-
-                                    if image_response.status_code == 200:
-                                        with open(output_path, "wb") as f:
-                                            f.write(image_response.content)
-                                        print(
-                                            "✅ ComfyUI generated image successfully"
-                                        )
-                                        return True
 
                     print("⚠️ ComfyUI generation timed out")
                     return False
@@ -181,67 +252,138 @@ class ImageGenerator:
             print(f"ComfyUI generation failed: {e}")
             return False
 
-    def _generate_placeholder_image(self, prompt, style, output_path):
-        """Generate a placeholder image with the prompt as text"""
+    def _download_outputs(self, backend, images, output_path):
+        """
+        Download every image produced by a job. The first one is written to
+        output_path and any further ones next to it with a numeric suffix.
+        """
+        root, extension = os.path.splitext(output_path)
+        success = False
+        for index, image_info in enumerate(images):
+            target = (
+                output_path if index == 0 else f"{root}_{index}{extension}"
+            )
+            if self._download_image(backend, image_info, target):
+                if index == 0:
+                    success = True
+                    print("✅ ComfyUI generated image successfully")
+                else:
+                    print(f"✅ Saved additional ComfyUI output: {target}")
+        return success
+
+    @traced("download image", "image")
+    def _download_image(self, backend, image_info, output_path):
+        """
+        Stream one image from ComfyUI into a temporary file next to
+        output_path, verify it and atomically move it into place, so memory
+        use stays bounded by the chunk size regardless of image size.
+        """
+        params = {
+            "filename": image_info["filename"],
+            "subfolder": image_info.get("subfolder", ""),
+            "type": image_info.get("type", "output"),
+        }
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, temp_path = tempfile.mkstemp(
+            prefix=".download-", suffix=".part", dir=directory
+        )
         try:
-            # Create a 800x600 image with a nice gradient background
-            width, height = 800, 600
-            image = Image.new("RGB", (width, height), "#f0f0f0")
-            draw = ImageDraw.Draw(image)
-
-            # Create gradient background
-            for y in range(height):
-                color_value = int(
-                    240 - (y / height) * 40
-                )  # Gradient from light to slightly darker
-                color = (color_value, color_value + 10, color_value + 20)
-                draw.line([(0, y), (width, y)], fill=color)
-
-            # Add text
-            try:
-                # Try to use a nice font
-                font_large = ImageFont.truetype("arial.ttf", 24)
-                font_small = ImageFont.truetype("arial.ttf", 16)
-            except:
-                # Fallback to default font
-                font_large = ImageFont.load_default()
-                font_small = ImageFont.load_default()
-
-            # Wrap text
-            lines = self._wrap_text(prompt, 50)
-
-            # Calculate text positioning
-            total_text_height = len(lines) * 30 + 60
-            start_y = (height - total_text_height) // 2
-
-            # Draw main prompt
-            y_offset = start_y
-            for line in lines:
-                text_width = draw.textlength(line, font=font_large)
-                x = (width - text_width) // 2
-                draw.text((x, y_offset), line, fill="#333333", font=font_large)
-                y_offset += 30
-
-            # Add style info if provided
-            if style:
-                style_text = f"Style: {style}"
-                text_width = draw.textlength(style_text, font=font_small)
-                x = (width - text_width) // 2
-                draw.text(
-                    (x, y_offset + 20),
-                    style_text,
-                    fill="#666666",
-                    font=font_small,
+            with backend.session.get(
+                f"{backend.base_url}/view",
+                params=params,
+                stream=True,
+                timeout=30,
+            ) as response:
+                if response.status_code != 200:
+                    print(f"❌ ComfyUI download error: {response.status_code}")
+                    return False
+
+                written = 0
+                with os.fdopen(fd, "wb") as f:
+                    fd = None
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        written += len(chunk)
+
+                expected = response.headers.get("Content-Length")
+                if expected is not None and int(expected) != written:
+                    print(
+                        f"❌ Incomplete download of {params['filename']}: "
+                        f"{written} of {expected} bytes"
+                    )
+                    return False
+
+            # Integrity check: the file must decode as an image
+            from PIL import Image
+
+            with Image.open(temp_path) as image:
+                image.verify()
+
+            os.replace(temp_path, output_path)
+            temp_path = None
+            return True
+
+        except Exception as e:
+            print(f"❌ ComfyUI download failed: {e}")
+            return False
+        finally:
+            if fd is not None:
+                os.close(fd)
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @traced(
+        "image job", "image", detail=lambda gen, r: {"file": r["output_path"]}
+    )
+    def _generate_request(self, request):
+        return self.generate_image_with_stable_diffusion(
+            request["prompt"], request.get("style", ""), request["output_path"]
+        )
+
+    def generate_images(self, requests_list):
+        """
+        Generate several images, returning a list of success flags.
+
+        With ComfyUI, jobs are spread over the backend pool concurrently. When
+        ComfyUI is unavailable the placeholders are rendered as one batch in a
+        process pool instead of one after another.
+        """
+        if len(requests_list) < 2:
+            return [self._generate_request(r) for r in requests_list]
+
+        if self.comfyui_available:
+            # One job in flight per healthy backend keeps every GPU busy
+            workers = max(1, len(self.backend_pool.healthy_backends()))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(
+                    executor.map(self._generate_request, requests_list)
                 )
 
-            # Add a decorative border
-            draw.rectangle(
-                [10, 10, width - 10, height - 10], outline="#cccccc", width=2
+        from placeholder_renderer import render_batch
+
+        with image_limiter or nullcontext(), span("placeholders", "image"):
+            results = render_batch(requests_list)
+        IMAGE_JOBS.labels("placeholder", "ok").inc(sum(map(bool, results)))
+        return [
+            success
+            or self._generate_placeholder_image(
+                request["prompt"],
+                request.get("style", ""),
+                request["output_path"],
             )
+            for success, request in zip(results, requests_list)
+        ]
 
-            # Save the image
-            image.save(output_path)
-            return True
+    def _generate_placeholder_image(self, prompt, style, output_path):
+        """Generate a placeholder image with the prompt as text"""
+        from PIL import Image
+        from placeholder_renderer import render_placeholder
+
+        try:
+            with image_limiter or nullcontext():
+                success = render_placeholder(prompt, style, output_path)
+            IMAGE_JOBS.labels("placeholder", _result(success)).inc()
+            return success
 
         except Exception as e:
             print(f"Placeholder generation failed: {e}")
@@ -249,28 +391,14 @@ class ImageGenerator:
             try:
                 img = Image.new("RGB", (800, 600), "#e0e0e0")
                 img.save(output_path)
+                IMAGE_JOBS.labels("placeholder", "fallback").inc()
                 return True
             except:
+                IMAGE_JOBS.labels("placeholder", "failed").inc()
                 return False
 
     def _wrap_text(self, text, width):
         """Wrap text to specified width"""
-        words = text.split()
-        lines = []
-        current_line = []
-
-        for word in words:
-            current_line.append(word)
-            if len(" ".join(current_line)) > width:
-                if len(current_line) > 1:
-                    current_line.pop()
-                    lines.append(" ".join(current_line))
-                    current_line = [word]
-                else:
-                    lines.append(word)
-                    current_line = []
-
-        if current_line:
-            lines.append(" ".join(current_line))
+        from placeholder_renderer import wrap_text
 
-        return lines
+        return wrap_text(text, width)
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+MANIFEST_NAME = ".image_variants.json"
+DEFAULT_WIDTHS = [400, 800, 1200]
+DEFAULT_FORMATS = ["avif", "webp"]
+
+FORMAT_OPTIONS = {
+    "avif": {"quality": 60, "speed": 8},
+    "webp": {"quality": 78, "method": 4},
+}
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+PICTURE_OR_IMG_PATTERN = re.compile(
+    r"(<picture\b.*?</picture\s*>)|(<img\b[^>]*>)",
+    re.IGNORECASE | re.DOTALL,
+)
+ATTRIBUTE_PATTERN = re.compile(
+    r"""([\w:-]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'>]+))?"""
+)
+
+
+def supported_formats(formats):
+    """Filter the requested formats down to the ones Pillow can encode"""
+    from PIL import Image
+
+    try:
+        # Registers an AVIF encoder on Pillow versions without native support
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+
+    Image.init()
+    return [fmt for fmt in formats if fmt.upper() in Image.SAVE]
+
+
+def _build_variant(job):
+    """Process pool entry point: resize one source image into one variant"""
+    from PIL import Image
+
+    try:
+        with Image.open(job["source"]) as image:
+            image.load()
+            if image.width != job["width"]:
+                height = round(image.height * job["width"] / image.width)
+                image = image.resize((job["width"], height), Image.LANCZOS)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.mode else "RGB")
+
+            temp_path = job["output"] + ".tmp"
+            image.save(
+                temp_path,
+                format=job["format"].upper(),
+                **FORMAT_OPTIONS.get(job["format"], {}),
+            )
+            os.replace(temp_path, job["output"])
+            return {
+                "path": job["path"],
+                "width": image.width,
+                "height": image.height,
+                "format": job["format"],
+                "bytes": os.path.getsize(job["output"]),
+            }
+    except Exception as e:
+        print(f"  ❌ Variant {job['path']} failed: {e}")
+        return None
+
+
+def _quote(value):
+    """
+    An attribute value made safe inside double quotes. Values keep their
+    source text, entities included, so only literal quotes are escaped.
+    """
+    return value.replace('"', "&quot;")
+
+
+class ImageVariantPipeline:
+    """
+    Produces responsive width/format variants of generated images and
+    rewrites HTML so browsers only download the variant they need.
+    """
+
+    def __init__(
+        self, project_dir, widths=None, formats=None, max_workers=None
+    ):
+        self.project_dir = project_dir
+        self.widths = sorted(widths or DEFAULT_WIDTHS)
+        self.formats = supported_formats(formats or DEFAULT_FORMATS)
+        self.max_workers = max_workers
+        self.manifest_path = os.path.join(str(project_dir), MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def process(self, filenames):
+        """
+        Build variants for the given project-relative image paths.
+
+        Images whose content hash matches the manifest are skipped, so only
+        new or regenerated images are re-encoded. Returns the list of image
+        paths that now have variants.
+        """
+        from PIL import Image
+
+        jobs = []
+        pending = {}
+
+        for filename in filenames:
+            filename = filename.replace("\\", "/").lstrip("/")
+            if not filename.lower().endswith(SOURCE_EXTENSIONS):
+                continue
+            source = os.path.join(str(self.project_dir), filename)
+            try:
+                with open(source, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                with Image.open(source) as image:
+                    width, height = image.size
+            except Exception as e:
+                print(f"  ❌ Cannot read image {filename}: {e}")
+                continue
+
+            entry = self.manifest.get(filename)
+            if entry and entry["hash"] == digest:
+                continue
+
+            stem, _ = posixpath.splitext(filename)
+            widths = [w for w in self.widths if w < width] + [width]
+            pending[filename] = {
+                "hash": digest,
+                "width": width,
+                "height": height,
+                "variants": [],
+            }
+            for variant_width in widths:
+                for fmt in self.formats:
+                    path = f"{stem}-{variant_width}w.{fmt}"
+                    jobs.append(
+                        {
+                            "image": filename,
+                            "source": source,
+                            "width": variant_width,
+                            "format": fmt,
+                            "path": path,
+                            "output": os.path.join(
+                                str(self.project_dir), path
+                            ),
+                        }
+                    )
+
+        if not jobs:
+            return []
+
+        if len(jobs) < 2 or self.max_workers == 1:
+            results = [_build_variant(job) for job in jobs]
+        else:
+            max_workers = min(
+                self.max_workers or os.cpu_count() or 1, len(jobs)
+            )
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_build_variant, jobs))
+
+        for job, variant in zip(jobs, results):
+            if variant:
+                pending[job["image"]]["variants"].append(variant)
+
+        for filename, entry in pending.items():
+            if entry["variants"]:
+                self.manifest[filename] = entry
+                saved = sum(v["bytes"] for v in entry["variants"])
+                print(
+                    f"  🖼️ {filename}: {len(entry['variants'])} variants "
+                    f"({saved} bytes total)"
+                )
+
+        self._save_manifest()
+        return [name for name, entry in pending.items() if entry["variants"]]
+
+    def rewrite_html(self, html, html_filename="index.html"):
+        """
+        Replace <img> tags that point at images with variants by <picture>
+        markup carrying srcset, intrinsic width/height and lazy loading.
+        Tags already inside a <picture> or carrying a srcset are left alone.
+        """
+        if not self.manifest or "<img" not in html.lower():
+            return html
+
+        base_dir = posixpath.dirname(html_filename.replace("\\", "/"))
+
+        def replace(match):
+            if match.group(1):
+                return match.group(1)
+            return self._picture_markup(match.group(2), base_dir)
+
+        return PICTURE_OR_IMG_PATTERN.sub(replace, html)
+
+    def _picture_markup(self, tag, base_dir):
+        attributes = self._parse_attributes(tag)
+        names = {name.lower() for name, _ in attributes}
+        src = dict((n.lower(), v) for n, v in attributes).get("src")
+        if not src or "srcset" in names:
+            return tag
+
+        image_path = posixpath.normpath(posixpath.join(base_dir, src))
+        entry = self.manifest.get(image_path)
+        if not entry:
+            return tag
+
+        if "width" not in names and "height" not in names:
+            attributes.append(("width", str(entry["width"])))
+            attributes.append(("height", str(entry["height"])))
+        if "loading" not in names:
+            attributes.append(("loading", "lazy"))
+        if "decoding" not in names:
+            attributes.append(("decoding", "async"))
+
+        img = "<img " + " ".join(
+            name if value is None else f'{name}="{_quote(value)}"'
+            for name, value in attributes
+        )
+        img += " />" if tag.rstrip().endswith("/>") else ">"
+
+        sizes = f"(max-width: {entry['width']}px) 100vw, {entry['width']}px"
+        sources = []
+        for fmt in self.formats:
+            candidates = [v for v in entry["variants"] if v["format"] == fmt]
+            if not candidates:
+                continue
+            srcset = ", ".join(
+                f"{posixpath.relpath(v['path'], base_dir or '.')} "
+                f"{v['width']}w"
+                for v in sorted(candidates, key=lambda v: v["width"])
+            )
+            sources.append(
+                f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset}" '
+                f'sizes="{sizes}">'
+            )
+
+        if not sources:
+            return img
+        return "<picture>" + "".join(sources) + img + "</picture>"
+
+    def _parse_attributes(self, tag):
+        """Return the tag's attributes as an ordered list of (name, value)"""
+        body = re.sub(r"^<img\b|/?>$", "", tag.strip(), flags=re.IGNORECASE)
+        attributes = []
+        for name, value in ATTRIBUTE_PATTERN.findall(body):
+            if value == "":
+                attributes.append((name, None))
+                continue
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            attributes.append((name, value))
+        return attributes
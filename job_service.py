@@ -0,0 +1,555 @@
+"""
+Local HTTP service for submitting generation jobs.
+
+Jobs are stored in a SQLite queue, so they survive restarts. Worker threads
+run each job in its own process, which allows running jobs to be cancelled.
+Endpoints:
+
+    POST /jobs                  {"project", "workflow", "prompt", "priority"}
+    GET  /jobs                  list jobs
+    GET  /jobs/<id>             job status and scenario progress
+    GET  /jobs/<id>/events      events so far; ?stream=1 streams them live
+    POST /jobs/<id>/cancel      cancel a queued or running job
+    GET  /jobs/<id>/artifact    zip of the generated project directory
+    GET  /metrics               Prometheus metrics of the service and its jobs
+
+Usage:
+    python job_service.py [--port 8765] [--workers 2] [--db jobs.sqlite3]
+
+Set LLM_PROVIDER=stub to run every workflow offline.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from metrics import REGISTRY, counter, histogram
+from session import WORKFLOWS
+
+PRIORITIES = {"low": 0, "normal": 1, "high": 2}
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+JOBS = counter("jobs_total", "Finished jobs", ["workflow", "status"])
+JOB_SECONDS = histogram(
+    "job_duration_seconds",
+    "Run time of finished jobs",
+    ["workflow"],
+    buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    workflow TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    scenarios_total INTEGER,
+    scenarios_done INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+def _execute_job(job, event_queue, log_path):
+    """Child process entry point running one workflow"""
+    from development_simulation import DevelopmentSimulation
+
+    # Start from zero; the parent merges what this job adds
+    REGISTRY.reset()
+    with open(log_path, "a", encoding="utf-8") as log:
+        with redirect_stdout(log):
+            try:
+                simulation = DevelopmentSimulation(job["project"])
+                simulation.event_listeners.append(event_queue.put)
+                getattr(simulation, job["workflow"])(job["prompt"])
+            except Exception as e:
+                event_queue.put(
+                    {
+                        "type": "job_error",
+                        "time": time.time(),
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+                )
+                sys.exit(1)
+            finally:
+                event_queue.put(
+                    {"type": "metrics", "snapshot": REGISTRY.snapshot()}
+                )
+
+
+class JobStore:
+    """SQLite-backed job queue and event log"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            # Jobs cancelled during a previous shutdown are done; jobs it
+            # interrupted go back to the queue
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE status = 'cancelling'",
+                (time.time(),),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, "
+                "scenarios_done = 0 WHERE status = 'running'"
+            )
+
+    def add(self, project, workflow, prompt, priority):
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, project, workflow, prompt, priority, "
+                "status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, project, workflow, prompt, priority, time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim_next(self):
+        """
+        Mark the highest-priority queued job as running and return it. Jobs
+        of a project that already has a running job, or one whose process is
+        still being cancelled, are skipped, so two jobs never write into the
+        same project directory at once.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND project NOT IN "
+                "(SELECT project FROM jobs "
+                "WHERE status IN ('running', 'cancelling')) "
+                "ORDER BY priority DESC, created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? "
+                "WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+        return dict(row)
+
+    def update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def cancel_if_queued(self, job_id):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cursor.rowcount > 0
+
+    def mark_cancelling(self, job_id):
+        """Flag a running job; it turns cancelled once its process exits"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelling' "
+                "WHERE id = ? AND status = 'running'",
+                (job_id,),
+            )
+        return cursor.rowcount > 0
+
+    def add_event(self, job_id, event):
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT COUNT(*) FROM events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO events (job_id, seq, data) VALUES (?, ?, ?)",
+                (job_id, seq, json.dumps(event)),
+            )
+
+    def events(self, job_id, after=-1):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data FROM events WHERE job_id = ? AND seq > ? "
+                "ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [(row["seq"], json.loads(row["data"])) for row in rows]
+
+
+class JobService:
+    def __init__(self, db_path="jobs.sqlite3", workers=2, log_dir="job_logs"):
+        self.store = JobStore(db_path)
+        self.workers = workers
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.processes = {}
+        # Serializes starting a job's process with cancelling it
+        self._process_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{index}"
+            )
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for process in list(self.processes.values()):
+            process.terminate()
+
+    def submit(self, project, workflow, prompt, priority="normal"):
+        if not re.fullmatch(r"[\w.-]+", project or "") or project in (
+            ".",
+            "..",
+        ):
+            raise ValueError("invalid project name")
+        if workflow not in WORKFLOWS:
+            raise ValueError(f"unknown workflow: {workflow}")
+        if not prompt:
+            raise ValueError("missing prompt")
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f"unknown priority: {priority}")
+            priority = PRIORITIES[priority]
+
+        job = self.store.add(project, workflow, prompt, int(priority))
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or terminate the process of a running one"""
+        if self.store.cancel_if_queued(job_id):
+            self.store.add_event(
+                job_id, {"type": "job_cancelled", "time": time.time()}
+            )
+            return True
+        with self._process_lock:
+            if not self.store.mark_cancelling(job_id):
+                return False
+            # Not started yet when missing; _run then never starts it
+            process = self.processes.get(job_id)
+            if process is not None:
+                process.terminate()
+        return True
+
+    def _worker_loop(self):
+        while not self._stopping:
+            job = self.store.claim_next()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=1.0)
+                continue
+            self._run(job)
+            # A finished job may unblock queued jobs of the same project
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _run(self, job):
+        job_id = job["id"]
+        event_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_execute_job,
+            args=(job, event_queue, str(self.log_dir / f"{job_id}.log")),
+        )
+        self.store.add_event(
+            job_id, {"type": "job_started", "time": time.time()}
+        )
+        started = time.monotonic()
+        with self._process_lock:
+            cancelled = self.store.get(job_id)["status"] == "cancelling"
+            if not cancelled:
+                self.processes[job_id] = process
+                process.start()
+        if cancelled:
+            self._finish(job, "cancelled", None, started)
+            return
+
+        error = None
+        while True:
+            try:
+                event = event_queue.get(timeout=0.2)
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+                continue
+            self._record_event(job_id, event)
+            if event["type"] == "job_error":
+                error = event["error"]
+
+        # Drain events sent just before the process exited
+        while True:
+            try:
+                event = event_queue.get(timeout=0.1)
+            except queue.Empty:
+                break
+            self._record_event(job_id, event)
+            if event["type"] == "job_error":
+                error = event["error"]
+
+        process.join()
+        with self._process_lock:
+            del self.processes[job_id]
+
+        if self.store.get(job_id)["status"] == "cancelling":
+            status = "cancelled"
+        elif process.exitcode == 0 and error is None:
+            status = "succeeded"
+        else:
+            status = "failed"
+            error = error or f"worker exited with code {process.exitcode}"
+        self._finish(job, status, error, started)
+
+    def _finish(self, job, status, error, started):
+        job_id = job["id"]
+        self.store.update(
+            job_id, status=status, error=error, finished_at=time.time()
+        )
+        JOBS.labels(job["workflow"], status).inc()
+        JOB_SECONDS.labels(job["workflow"]).observe(time.monotonic() - started)
+        self.store.add_event(
+            job_id, {"type": f"job_{status}", "time": time.time()}
+        )
+
+    def _record_event(self, job_id, event):
+        if event["type"] == "metrics":
+            REGISTRY.merge(event["snapshot"])
+            return
+        self.store.add_event(job_id, event)
+        if event["type"] == "workflow_started":
+            self.store.update(job_id, scenarios_total=event["scenarios"])
+        elif event["type"] == "scenario_finished":
+            self.store.update(job_id, scenarios_done=event["scenario"])
+
+    def artifact_path(self, job_id):
+        """Build a zip of the job's project directory and return its path"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        project_dir = Path("website_project") / job["project"]
+        if not project_dir.is_dir():
+            return None
+        temp_dir = tempfile.mkdtemp(prefix="job-artifact-")
+        return shutil.make_archive(
+            os.path.join(temp_dir, job["project"]), "zip", project_dir
+        )
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_metrics(self):
+            data = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            return parts, parse_qs(url.query)
+
+        def do_GET(self):
+            parts, query = self._route()
+            if parts == ["metrics"]:
+                self._send_metrics()
+                return
+            if parts == ["jobs"]:
+                self._send_json(200, {"jobs": service.store.list()})
+                return
+            if len(parts) < 2 or parts[0] != "jobs":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            job = service.store.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "unknown job"})
+            elif len(parts) == 2:
+                self._send_json(200, job)
+            elif parts[2:] == ["events"]:
+                if query.get("stream", ["0"])[0] in ("1", "true"):
+                    self._stream_events(job["id"])
+                else:
+                    events = [e for _, e in service.store.events(job["id"])]
+                    self._send_json(200, {"events": events})
+            elif parts[2:] == ["artifact"]:
+                self._send_artifact(job["id"])
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            parts, _ = self._route()
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length) if length else b"{}"
+
+            if parts == ["jobs"]:
+                try:
+                    body = json.loads(raw)
+                    if not isinstance(body, dict):
+                        raise ValueError("request body must be a JSON object")
+                    job = service.submit(
+                        body.get("project"),
+                        body.get("workflow", "project_creation"),
+                        body.get("prompt"),
+                        body.get("priority", "normal"),
+                    )
+                except (ValueError, TypeError) as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                self._send_json(201, job)
+            elif (
+                len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel"
+            ):
+                if service.cancel(parts[1]):
+                    self._send_json(200, service.store.get(parts[1]))
+                else:
+                    self._send_json(409, {"error": "job is not cancellable"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def _stream_events(self, job_id):
+            """Server-sent events until the job reaches a terminal state"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            last_seq = -1
+            try:
+                while True:
+                    for seq, event in service.store.events(job_id, last_seq):
+                        last_seq = seq
+                        self.wfile.write(
+                            f"id: {seq}\nevent: {event['type']}\n"
+                            f"data: {json.dumps(event)}\n\n".encode("utf-8")
+                        )
+                    self.wfile.flush()
+                    status = service.store.get(job_id)["status"]
+                    if (
+                        status in TERMINAL_STATUSES
+                        and not service.store.events(job_id, last_seq)
+                    ):
+                        break
+                    time.sleep(0.2)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _send_artifact(self, job_id):
+            path = service.artifact_path(job_id)
+            if path is None:
+                self._send_json(404, {"error": "no project files yet"})
+                return
+            try:
+                size = os.path.getsize(path)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(size))
+                self.send_header(
+                    "Content-Disposition",
+                    f'attachment; filename="{os.path.basename(path)}"',
+                )
+                self.end_headers()
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile)
+            finally:
+                shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Job submission service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--db", default="jobs.sqlite3")
+    parser.add_argument("--log-dir", default="job_logs")
+    args = parser.parse_args(argv)
+
+    import metrics
+
+    metrics.install_from_env()
+    service = JobService(args.db, args.workers, args.log_dir)
+    service.start()
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    httpd.daemon_threads = True
+    print(f"🟢 Job service listening on http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        httpd.server_close()
+        print("🔴 Job service stopped")
+
+
+if __name__ == "__main__":
+    main()
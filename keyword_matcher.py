@@ -0,0 +1,199 @@
+"""
+Single-pass keyword signals for agent routing and context heuristics.
+
+Phase detection, keyword extraction, agent activation, client satisfaction,
+stuck tracking, agent-change requests and round endings all look for fixed
+words and phrases in the same message. ContextMatcher compiles all of them
+into one matcher, so a reply is scanned once instead of once per phrase.
+
+KeywordMatcher builds the trie of the phrases, as Aho-Corasick does, and
+compiles it into a single regular expression that the re engine runs in C;
+walking the automaton in Python was slower than the substring checks it
+replaces. Phrases match from the start of a word, so "ui" no longer fires
+on "build" while "develop" still covers "developer", and a match also
+reports the phrases inside it ("get qa" reports "qa"). Keywords must also
+end with a word, as the keyword split used to require: "helpful" is not
+"help". Signals don't, so "Next steps" still ends a round and "need
+designers" still asks for other agents.
+
+Matching ignores case, as the lowercased checks did, except for agent
+activation triggers, which match as written, as they always have. The
+phase is the one with the most hits, ties going to the order of PHASES,
+instead of the first phase with any hit.
+"""
+
+import re
+from collections import Counter
+
+# Phases by priority, with the words counting towards each
+PHASES = {
+    "design": ["design", "mockup", "ui", "layout"],
+    "development": ["code", "develop", "implement", "feature"],
+    "testing": ["test", "bug", "qa", "quality"],
+    "planning": ["requirements", "spec", "need", "want"],
+    "review": ["review", "feedback", "check"],
+}
+KEYWORDS = ["urgent", "deadline", "stuck", "help", "problem", "bug"]
+# Signal name -> phrases raising it
+SIGNALS = {
+    "stuck": ["stuck", "problem"],
+    "unstuck": ["solved", "fixed"],
+    "positive": ["good", "great", "perfect", "love"],
+    "negative": ["bad", "terrible", "hate", "wrong"],
+    "change_agents": ["need designer", "call the manager", "get qa"],
+    "end_round": [
+        "that sounds good",
+        "agreed",
+        "let's move forward",
+        "next step",
+    ],
+}
+
+
+def _word_start(pattern):
+    return rf"(?<!\w)(?:{pattern})"
+
+
+def _ends_word(text, end):
+    return end == len(text) or not (text[end].isalnum() or text[end] == "_")
+
+
+def trie_pattern(phrases):
+    """Regular expression of the character trie of phrases"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def compile_node(node):
+        branches = [
+            re.escape(char) + compile_node(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        alternation = "(?:" + "|".join(branches) + ")"
+        # Longer phrases are tried first
+        return alternation + "?" if "" in node else alternation
+
+    return compile_node(trie)
+
+
+class KeywordMatcher:
+    """Case-insensitive word-start matcher for fixed phrases, built once"""
+
+    def __init__(self, phrases):
+        phrases = [p for p in dict.fromkeys(p.lower() for p in phrases) if p]
+        # The second group holds the character after the phrase, empty
+        # when the phrase ends a word; consuming it cannot hide a match,
+        # as no phrase starts right after a word character
+        source = _word_start(f"({trie_pattern(phrases)})") + r"(\w?)"
+        self.pattern = re.compile(source)
+        # For text whose lowercase form has a different length, so match
+        # positions would not line up with the original
+        self.fallback = re.compile(source, re.IGNORECASE)
+        # A match consumes its text, so the phrases inside each phrase are
+        # looked up here instead: (phrase, start, end, whether it ends a
+        # word there, None when that depends on what follows the match)
+        self.inner = {phrase: [] for phrase in phrases}
+        for phrase in phrases:
+            for other in phrases:
+                if other == phrase:
+                    continue
+                for match in re.finditer(
+                    _word_start(re.escape(other)), phrase
+                ):
+                    start, end = match.span()
+                    ends = (
+                        None if end == len(phrase) else _ends_word(phrase, end)
+                    )
+                    self.inner[phrase].append((other, start, end, ends))
+
+    def find(self, text):
+        """
+        Every phrase occurrence in text, in order, as (phrase, text as
+        written, whether it ends a word) triples
+        """
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self.pattern.finditer(lowered)
+        else:
+            matches = self.fallback.finditer(text)
+        found = []
+        for match in matches:
+            start, end = match.span(1)
+            written = text[start:end]
+            phrase = written.lower()
+            if phrase not in self.inner:
+                continue
+            whole = not match.group(2)
+            found.append((phrase, written, whole))
+            found.extend(
+                (other, written[i:j], whole if ends is None else ends)
+                for other, i, j, ends in self.inner[phrase]
+            )
+        return found
+
+
+class MessageSignals:
+    """Everything ContextMatcher found in one message"""
+
+    def __init__(self, found, labels):
+        self.keywords = []
+        self.triggers = set()
+        self.phase_scores = Counter()
+        self.signals = set()
+        for phrase, written, whole in found:
+            for kind, value, whole_word in labels[phrase]:
+                if whole_word and not whole:
+                    continue
+                if kind == "trigger" and written != value:
+                    continue
+                if kind == "phase":
+                    self.phase_scores[value] += 1
+                elif kind == "keyword":
+                    self.keywords.append(value)
+                elif kind == "trigger":
+                    self.triggers.add(value)
+                else:
+                    self.signals.add(value)
+
+    def phase(self, default):
+        """Phase with the most hits, ties going to the earlier phase"""
+        if not self.phase_scores:
+            return default
+        return max(PHASES, key=lambda p: self.phase_scores[p])
+
+    def __contains__(self, signal):
+        return signal in self.signals
+
+
+class ContextMatcher:
+    def __init__(self, triggers=()):
+        """triggers: agent activation triggers to report when present"""
+        # Lowercase phrase -> (kind, value, whole word only) it stands for
+        self.labels = {}
+        for phase, phrases in PHASES.items():
+            for phrase in phrases:
+                self._label(phrase, "phase", phase)
+        for keyword in KEYWORDS:
+            self._label(keyword, "keyword", keyword, whole_word=True)
+        for signal, phrases in SIGNALS.items():
+            for phrase in phrases:
+                self._label(phrase, "signal", signal)
+        for trigger in triggers:
+            self._label(trigger, "trigger", trigger)
+        self.matcher = KeywordMatcher(self.labels)
+
+    def _label(self, phrase, kind, value, whole_word=False):
+        self.labels.setdefault(phrase.lower(), []).append(
+            (kind, value, whole_word)
+        )
+
+    def scan(self, text):
+        return MessageSignals(self.matcher.find(text), self.labels)
@@ -0,0 +1,264 @@
+"""
+Persistent per-project summaries of the project files.
+
+Agents lose everything they read when they are reset at the end of a
+workflow. So that the next workflow doesn't start by reading every file
+again, each text file is summarized once per content hash: document
+structure, navigation links, scripts and stylesheets of HTML pages, the
+classes, custom properties and media queries of stylesheets and the
+functions and DOM hooks of scripts. Summaries are stored in
+<project>/.knowledge.json and reused across sessions; the first prompt of a
+workflow carries a digest built from them instead of a bare file listing.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from html.parser import HTMLParser
+from project_delta import NON_TEXT, content_hash
+
+CACHE_NAME = ".knowledge.json"
+FORMAT_VERSION = 1
+MAX_ITEMS = 8
+
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)(?=[^{}]*\{)")
+CSS_ID = re.compile(r"#(-?[_a-zA-Z][\w-]*)(?=[^{}]*\{)")
+CSS_VARIABLE = re.compile(r"(--[\w-]+)\s*:")
+CSS_MEDIA = re.compile(r"@media\s*([^{]+)\{")
+CSS_KEYFRAMES = re.compile(r"@keyframes\s+([\w-]+)")
+JS_FUNCTION = re.compile(
+    r"\bfunction\s+([\w$]+)|\b(?:const|let|var)\s+([\w$]+)\s*=\s*"
+    r"(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|[\w$]+\s*=>)"
+)
+JS_EVENT = re.compile(r"addEventListener\(\s*['\"]([\w:-]+)")
+JS_SELECTOR = re.compile(
+    r"(?:querySelector(?:All)?|getElementById|getElementsByClassName)"
+    r"\(\s*['\"]([^'\"]+)"
+)
+
+
+def _join(items, limit=MAX_ITEMS):
+    items = list(dict.fromkeys(items))
+    text = ", ".join(items[:limit])
+    if len(items) > limit:
+        text += f" (+{len(items) - limit} more)"
+    return text
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.headings = []
+        self.nav_links = []
+        self.links = []
+        self.scripts = []
+        self.stylesheets = []
+        self.images = []
+        self.classes = Counter()
+        self.ids = []
+        self.forms = 0
+        self._open = []
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        self.classes.update((attrs.get("class") or "").split())
+        if attrs.get("id"):
+            self.ids.append(attrs["id"])
+        if tag == "a" and attrs.get("href"):
+            href = attrs["href"]
+            if not href.startswith(("http:", "https:", "mailto:", "tel:")):
+                self.links.append(href)
+                if "nav" in self._open:
+                    self.nav_links.append(href)
+        elif tag == "script" and attrs.get("src"):
+            self.scripts.append(attrs["src"])
+        elif tag == "link" and "stylesheet" in (attrs.get("rel") or ""):
+            self.stylesheets.append(attrs.get("href", ""))
+        elif tag == "img" and attrs.get("src"):
+            self.images.append(attrs["src"])
+        elif tag == "form":
+            self.forms += 1
+        if tag in ("title", "h1", "h2", "h3"):
+            self._text = []
+        if tag in ("nav", "header", "main", "footer", "section", "article"):
+            self._open.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in ("title", "h1", "h2", "h3") and self._text is not None:
+            text = " ".join("".join(self._text).split())
+            if tag == "title":
+                self.title = text
+            elif text:
+                self.headings.append(f"{tag} {text}")
+            self._text = None
+        if tag in self._open:
+            self._open.remove(tag)
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+
+def summarize_html(content):
+    parser = _PageParser()
+    try:
+        parser.feed(content)
+        parser.close()
+    except Exception:
+        pass
+    parts = []
+    if parser.title:
+        parts.append(f'title "{parser.title}"')
+    if parser.headings:
+        parts.append(f"headings: {_join(parser.headings, 5)}")
+    if parser.nav_links or parser.links:
+        label = "nav" if parser.nav_links else "links"
+        parts.append(f"{label}: {_join(parser.nav_links or parser.links)}")
+    if parser.stylesheets:
+        parts.append(f"styles: {_join(parser.stylesheets)}")
+    if parser.scripts:
+        parts.append(f"scripts: {_join(parser.scripts)}")
+    if parser.images:
+        parts.append(f"images: {_join(parser.images)}")
+    if parser.forms:
+        parts.append(f"{parser.forms} form(s)")
+    if parser.ids:
+        parts.append(f"ids: {_join(parser.ids)}")
+    if parser.classes:
+        classes = [name for name, _ in parser.classes.most_common()]
+        parts.append(f"classes: {_join(classes)}")
+    return "; ".join(parts)
+
+
+def summarize_css(content):
+    content = CSS_COMMENT.sub("", content)
+    parts = [f"{content.count('{') - content.count('@media')} rules"]
+    classes = CSS_CLASS.findall(content)
+    if classes:
+        parts.append(f"classes: {_join(classes)}")
+    ids = CSS_ID.findall(content)
+    if ids:
+        parts.append(f"ids: {_join(ids)}")
+    variables = CSS_VARIABLE.findall(content)
+    if variables:
+        parts.append(f"variables: {_join(variables)}")
+    media = [" ".join(m.split()) for m in CSS_MEDIA.findall(content)]
+    if media:
+        parts.append(f"media: {_join(media, 3)}")
+    keyframes = CSS_KEYFRAMES.findall(content)
+    if keyframes:
+        parts.append(f"keyframes: {_join(keyframes)}")
+    return "; ".join(parts)
+
+
+def summarize_js(content):
+    parts = []
+    functions = [a or b for a, b in JS_FUNCTION.findall(content)]
+    if functions:
+        parts.append(f"functions: {_join(functions)}")
+    events = JS_EVENT.findall(content)
+    if events:
+        parts.append(f"events: {_join(events)}")
+    selectors = JS_SELECTOR.findall(content)
+    if selectors:
+        parts.append(f"elements: {_join(selectors)}")
+    return "; ".join(parts) or f"{content.count(chr(10)) + 1} lines"
+
+
+def summarize_text(content):
+    lines = content.strip().splitlines()
+    first = lines[0][:80] if lines else ""
+    return f'{len(lines)} lines, starts "{first}"'
+
+
+SUMMARIZERS = {
+    ".html": summarize_html,
+    ".htm": summarize_html,
+    ".css": summarize_css,
+    ".js": summarize_js,
+}
+
+
+def summarize(filename, content):
+    """A one-line description of a text file's content"""
+    extension = os.path.splitext(filename)[1].lower()
+    return SUMMARIZERS.get(extension, summarize_text)(content)
+
+
+class KnowledgeCache:
+    """File summaries of one project, keyed by content hash"""
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.path = os.path.join(str(project_dir), CACHE_NAME)
+        self.summaries = self._load()
+        self.computed = 0
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != FORMAT_VERSION:
+            return {}
+        return data.get("summaries", {})
+
+    def _save(self):
+        if not os.path.isdir(str(self.project_dir)):
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": FORMAT_VERSION, "summaries": self.summaries},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(temp_path, self.path)
+
+    def summary(self, filename, content):
+        """The cached summary of content, computed on first sight"""
+        key = (
+            f"{os.path.splitext(filename)[1].lower()}:{content_hash(content)}"
+        )
+        summary = self.summaries.get(key)
+        if summary is None:
+            summary = summarize(filename, content)
+            self.summaries[key] = summary
+            self.computed += 1
+        return summary, key
+
+    def digest(self, project_files):
+        """Project digest for the first prompt of a workflow"""
+        lines = []
+        keys = set()
+        for filename, content in sorted(project_files.items()):
+            if not isinstance(content, str) or content in NON_TEXT:
+                kind = "image" if content == "image_file" else "binary"
+                lines.append(f"- {filename}: {kind} file")
+                continue
+            summary, key = self.summary(filename, content)
+            keys.add(key)
+            lines.append(
+                f"- {filename} ({len(content)} characters): {summary}"
+            )
+
+        # Keep only the summaries of current file versions
+        stale = [key for key in self.summaries if key not in keys]
+        if self.computed or stale:
+            for key in stale:
+                del self.summaries[key]
+            self._save()
+            self.computed = 0
+
+        return (
+            "\n\nProject digest (summaries of the current files; READ a file "
+            "only when you need its exact content):\n"
+            + "\n".join(lines)
+            + "\n"
+        )
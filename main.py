@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-from development_simulation import DevelopmentSimulation
 
 
 def show_main_menu():
@@ -68,6 +67,26 @@ def select_existing_project():
         return None
 
 
+def run_workflow(project_name, workflow, request):
+    """
+    Run a workflow in the session daemon if one is running, otherwise in
+    this process's long-lived session for the project
+    """
+    # Imported on first action so the menu appears without loading agents
+    import cassette
+    from session import get_session
+    from session_daemon import run_remote
+
+    # A recording or replay has to happen in this process
+    result = None
+    if cassette.active() is None:
+        result = run_remote(project_name, workflow, request)
+    if result is None:
+        get_session(project_name).run(workflow, request)
+    elif not result["ok"]:
+        print(f"❌ Workflow failed: {result['error']}")
+
+
 def create_new_project():
     """Handle new project creation"""
     project_name = input("\nEnter your project name: ").strip()
@@ -80,8 +99,7 @@ def create_new_project():
         print("❌ Please enter a valid project request.")
         return False
 
-    office = DevelopmentSimulation(project_name)
-    office.project_creation(prompt)
+    run_workflow(project_name, "project_creation", prompt)
     return True
 
 
@@ -102,8 +120,7 @@ def handle_existing_project(project_name):
                 print("❌ Please enter a valid page request.")
                 continue
 
-            office = DevelopmentSimulation(project_name)
-            office.add_new_page(page_request)
+            run_workflow(project_name, "add_new_page", page_request)
 
         elif choice == "2":
             improvement_request = input(
@@ -113,8 +130,9 @@ def handle_existing_project(project_name):
                 print("❌ Please enter a valid improvement request.")
                 continue
 
-            office = DevelopmentSimulation(project_name)
-            office.improve_existing_page(improvement_request)
+            run_workflow(
+                project_name, "improve_existing_page", improvement_request
+            )
 
         elif choice == "3":
             image_request = input(
@@ -124,8 +142,7 @@ def handle_existing_project(project_name):
                 print("❌ Please enter a valid image request.")
                 continue
 
-            office = DevelopmentSimulation(project_name)
-            office.add_images_to_website(image_request)
+            run_workflow(project_name, "add_images_to_website", image_request)
 
         elif choice == "4":
             feature_request = input(
@@ -135,14 +152,24 @@ def handle_existing_project(project_name):
                 print("❌ Please enter a valid feature request.")
                 continue
 
-            office = DevelopmentSimulation(project_name)
-            office.add_custom_feature(feature_request)
+            run_workflow(project_name, "add_custom_feature", feature_request)
 
         else:
             print("❌ Invalid choice. Please enter 0, 1, 2, 3, or 4.")
 
 
 def main():
+    import cassette
+    import metrics
+    import preview_server
+    import profiler
+    import tracing
+
+    cassette.install_from_env()
+    metrics.install_from_env()
+    preview_server.install_from_env()
+    profiler.install_from_env()
+    tracing.install_from_env()
     while True:
         show_main_menu()
         choice = input("Enter your choice (0-2): ").strip()
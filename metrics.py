@@ -0,0 +1,330 @@
+"""
+Prometheus-style metrics for long-running deployments.
+
+Modules declare counters, gauges and histograms at import time and update
+them as they work. The registry renders the Prometheus text exposition
+format, which can be served over HTTP and/or dumped to a file periodically:
+
+    METRICS_PORT=9464            serve http://127.0.0.1:9464/metrics
+    METRICS_FILE=metrics.prom    rewrite this file every METRICS_INTERVAL
+    METRICS_INTERVAL=15          seconds between file dumps
+
+Processes that run work in child processes (the job service) merge each
+child's snapshot into their own registry when the child finishes.
+"""
+
+import os
+import threading
+import time
+from environment import getenv, getenv_float, getenv_int
+
+DEFAULT_BUCKETS = (
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Child:
+    """The value of a metric for one combination of label values"""
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        with self._metric._lock:
+            samples = self._metric._samples
+            samples[self._key] = samples.get(self._key, 0) + amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._metric._lock:
+            self._metric._samples[self._key] = value
+
+    def observe(self, value):
+        metric = self._metric
+        with metric._lock:
+            sample = metric._samples.get(self._key)
+            if sample is None:
+                sample = [[0] * len(metric.buckets), 0.0, 0]
+                metric._samples[self._key] = sample
+            for index, bound in enumerate(metric.buckets):
+                if value <= bound:
+                    sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    def time(self):
+        """Context manager observing the duration of a block"""
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metric:
+    def __init__(self, kind, name, documentation, labelnames, buckets):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),) if buckets else ()
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **named):
+        if named:
+            values = tuple(named[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {', '.join(self.labelnames)}"
+            )
+        return _Child(self, tuple(str(v) for v in values))
+
+    # Unlabelled metrics are updated directly
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            samples = sorted(self._samples.items())
+        for key, value in samples:
+            if self.kind != "histogram":
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+                continue
+            counts, total, count = value
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(
+                    self.labelnames, key, [("le", _format_value(bound))]
+                )
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, kind, name, documentation, labelnames, buckets=()):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = Metric(kind, name, documentation, labelnames, buckets)
+                self.metrics[name] = metric
+            elif metric.kind != kind:
+                raise ValueError(f"{name} is already a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register("counter", name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register("gauge", name, documentation, labelnames)
+
+    def histogram(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        return self._register(
+            "histogram", name, documentation, labelnames, buckets
+        )
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self.metrics.values():
+            with metric._lock:
+                metric._samples.clear()
+
+    def snapshot(self):
+        """Picklable copy of every metric, for merging into another process"""
+        snapshot = {}
+        for name, metric in list(self.metrics.items()):
+            with metric._lock:
+                samples = {
+                    key: (
+                        [list(v[0]), v[1], v[2]]
+                        if metric.kind == "histogram"
+                        else v
+                    )
+                    for key, v in metric._samples.items()
+                }
+            snapshot[name] = {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": metric.labelnames,
+                "buckets": metric.buckets[:-1],
+                "samples": samples,
+            }
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add counters and histograms from a snapshot; gauges take its value"""
+        for name, data in snapshot.items():
+            metric = self._register(
+                data["kind"],
+                name,
+                data["documentation"],
+                data["labelnames"],
+                data["buckets"],
+            )
+            with metric._lock:
+                for key, value in data["samples"].items():
+                    current = metric._samples.get(key)
+                    if metric.kind == "gauge" or current is None:
+                        metric._samples[key] = value
+                    elif metric.kind == "counter":
+                        metric._samples[key] = current + value
+                    else:
+                        current[0] = [
+                            a + b for a, b in zip(current[0], value[0])
+                        ]
+                        current[1] += value[1]
+                        current[2] += value[2]
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def write_file(path, registry=REGISTRY):
+    """Atomically replace path with the current metrics"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(temp_path, path)
+
+
+def start_file_dump(path, interval=15.0, registry=REGISTRY):
+    """Rewrite path every interval seconds from a daemon thread"""
+
+    def loop():
+        while True:
+            try:
+                write_file(path, registry)
+            except OSError as e:
+                print(f"⚠️ Could not write metrics to {path}: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve /metrics from a daemon thread and return the server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(
+        target=httpd.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    return httpd
+
+
+_installed = False
+
+
+def install_from_env():
+    """Start the HTTP endpoint and/or file dump configured in the env"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    port = getenv_int("METRICS_PORT", None)
+    if port is not None:
+        httpd = start_http_server(port)
+        host, port = httpd.server_address[:2]
+        print(f"📈 Metrics at http://{host}:{port}/metrics")
+    path = getenv("METRICS_FILE")
+    if path:
+        start_file_dump(path, getenv_float("METRICS_INTERVAL", 15.0))
@@ -0,0 +1,367 @@
+"""
+Offline performance audit of a generated website.
+
+For every page in website_project/<name> the auditor estimates what a
+browser would download: the page, its stylesheets, scripts, images and
+url() assets of the stylesheets, with text assets counted gzip-compressed
+as a server would send them. It then checks the page against budgets:
+
+    page_weight_kb     transfer weight of the page and everything it loads
+    image_kb           weight of any single image
+    requests           number of requests for the page
+    render_blocking    stylesheets and synchronous scripts in <head>
+    oversize_ratio     image width / width it is displayed at
+    unminified_kb      bytes minification would save on a stylesheet/script
+
+plus images below the first one without loading="lazy". Budgets can be
+overridden with PERF_BUDGETS="page_weight_kb=300,requests=20". Violations
+are appended to the Developer's prompts so they get fixed in the same
+workflow; the auditor can also be run on its own:
+
+    python perf_audit.py website_project/<name> [--json]
+"""
+
+import json
+import os
+import zlib
+from html.parser import HTMLParser
+from environment import getenv, warn_once
+from image_variants import MANIFEST_NAME
+from reference_index import CSS_URL, resolve
+from site_build import BUILD_DIR, MINIFIERS
+
+DEFAULT_BUDGETS = {
+    "page_weight_kb": 500,
+    "image_kb": 200,
+    "requests": 30,
+    "render_blocking": 2,
+    "oversize_ratio": 2.0,
+    "unminified_kb": 2,
+}
+HTML_EXTENSIONS = (".html", ".htm")
+
+
+def load_budgets():
+    """DEFAULT_BUDGETS with any PERF_BUDGETS overrides applied"""
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in (getenv("PERF_BUDGETS") or "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() in budgets and value.strip():
+            try:
+                budgets[name.strip()] = float(value)
+            except ValueError:
+                warn_once(f"Ignoring PERF_BUDGETS entry {item.strip()!r}")
+    return budgets
+
+
+def minified_size(text, kind):
+    """Size of text after the build stage minified it"""
+    return len(MINIFIERS[f".{kind}"](text).encode("utf-8"))
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_head = False
+        self.stylesheets = []
+        self.scripts = []
+        self.images = []
+        self._sources = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "head":
+            self.in_head = True
+        elif tag == "body":
+            self.in_head = False
+        elif tag == "link" and "stylesheet" in (attrs.get("rel") or ""):
+            blocking = (attrs.get("media") or "all") != "print"
+            self.stylesheets.append((attrs.get("href") or "", blocking))
+        elif tag == "script" and attrs.get("src"):
+            blocking = (
+                self.in_head
+                and "async" not in attrs
+                and "defer" not in attrs
+                and attrs.get("type") != "module"
+            )
+            self.scripts.append((attrs["src"], blocking))
+        elif tag == "picture":
+            self._sources = []
+        elif tag == "source" and self._sources is not None:
+            self._sources.append(attrs.get("srcset") or "")
+        elif tag == "img":
+            srcsets = list(self._sources or [])
+            if attrs.get("srcset"):
+                srcsets.append(attrs["srcset"])
+            self.images.append({**attrs, "srcsets": srcsets})
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.in_head = False
+        elif tag == "picture":
+            self._sources = None
+
+
+def _candidates(srcset):
+    """(url, width) pairs of a srcset; width None for density descriptors"""
+    found = []
+    for candidate in srcset.split(","):
+        parts = candidate.split()
+        if parts:
+            width = None
+            if len(parts) > 1 and parts[1].endswith("w"):
+                # Malformed descriptors ("1.5w", "800vw") are ignored
+                try:
+                    width = int(parts[1][:-1] or 0)
+                except ValueError:
+                    pass
+            found.append((parts[0], width))
+    return found
+
+
+class PerformanceAuditor:
+    def __init__(self, project_dir, budgets=None):
+        self.project_dir = str(project_dir)
+        self.budgets = budgets or load_budgets()
+        # (size, gzip size, minifiable savings) by path and signature, so
+        # repeated audits only re-measure changed files
+        self._assets = {}
+
+    def _path(self, name):
+        return os.path.join(self.project_dir, name)
+
+    def _asset(self, name, kind=None):
+        """(bytes, transfer bytes, minification savings) or None"""
+        path = self._path(name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._assets.get(name)
+        if cached and cached[0] == signature:
+            return cached[1]
+        if kind in ("css", "js", "html"):
+            with open(path, "rb") as f:
+                data = f.read()
+            text = data.decode("utf-8", "replace")
+            savings = (
+                len(data) - minified_size(text, kind) if kind != "html" else 0
+            )
+            result = (len(data), len(zlib.compress(data, 6)), savings)
+        else:
+            result = (stat.st_size, stat.st_size, 0)
+        self._assets[name] = (signature, result)
+        return result
+
+    def _intrinsic_width(self, name):
+        if name in self._widths:
+            return self._widths[name]
+        try:
+            from PIL import Image
+
+            with Image.open(self._path(name)) as image:
+                return image.width
+        except Exception:
+            return None
+
+    def _load_manifest(self):
+        try:
+            with open(self._path(MANIFEST_NAME), "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+        except (OSError, ValueError):
+            self._manifest = {}
+        # Widths of source images and their responsive variants
+        self._widths = {}
+        for name, entry in self._manifest.items():
+            self._widths[name] = entry["width"]
+            for variant in entry.get("variants", []):
+                self._widths[variant["path"]] = variant["width"]
+
+    def pages(self):
+        found = []
+        for root, dirs, files in os.walk(self.project_dir):
+            dirs[:] = [
+                d
+                for d in dirs
+                if not d.startswith(".")
+                and not (root == self.project_dir and d == BUILD_DIR)
+            ]
+            for file in files:
+                if file.lower().endswith(HTML_EXTENSIONS):
+                    path = os.path.relpath(
+                        os.path.join(root, file), self.project_dir
+                    )
+                    found.append(path.replace(os.sep, "/"))
+        return sorted(found)
+
+    def audit_page(self, page):
+        budgets = self.budgets
+        parser = _PageParser()
+        with open(
+            self._path(page), "r", encoding="utf-8", errors="replace"
+        ) as f:
+            parser.feed(f.read())
+        page_asset = self._asset(page, "html")
+        weight = page_asset[1]
+        requests = 1
+        violations = []
+
+        def target(reference, source=page):
+            resolved = resolve(source, reference)
+            return resolved[0] if resolved else None
+
+        blocking = []
+        for kind, links in (
+            ("css", parser.stylesheets),
+            ("js", parser.scripts),
+        ):
+            for href, is_blocking in links:
+                name = target(href)
+                asset = self._asset(name, kind) if name else None
+                if asset is None:
+                    continue
+                requests += 1
+                weight += asset[1]
+                if is_blocking:
+                    blocking.append(name)
+                if asset[2] > budgets["unminified_kb"] * 1024 and (
+                    asset[2] > asset[0] * 0.1
+                ):
+                    violations.append(
+                        f"{name} is not minified (~{asset[2] // 1024} KB "
+                        f"to save)"
+                    )
+                if kind == "css":
+                    with open(
+                        self._path(name),
+                        "r",
+                        encoding="utf-8",
+                        errors="replace",
+                    ) as f:
+                        for url in CSS_URL.findall(f.read()):
+                            image = target(url, name)
+                            image_asset = self._asset(image) if image else None
+                            if image_asset:
+                                requests += 1
+                                weight += image_asset[1]
+
+        if len(blocking) > budgets["render_blocking"]:
+            violations.append(
+                f"{len(blocking)} render-blocking resources in <head> "
+                f"(budget {budgets['render_blocking']:g}): "
+                f"{', '.join(blocking)}; defer scripts or inline critical CSS"
+            )
+
+        for index, image in enumerate(parser.images):
+            src = image.get("src") or ""
+            rendered = image.get("width")
+            rendered = (
+                int(rendered) if rendered and rendered.isdigit() else None
+            )
+            # What the browser picks: the first srcset (the preferred format)
+            # candidate covering the rendered width, else the src
+            chosen = target(src) if src else None
+            if image["srcsets"]:
+                candidates = [
+                    (target(url), width)
+                    for url, width in _candidates(image["srcsets"][0])
+                ]
+                candidates = [c for c in candidates if c[0]]
+                covering = [
+                    c
+                    for c in candidates
+                    if rendered and c[1] and c[1] >= rendered
+                ]
+                if covering:
+                    chosen = min(covering, key=lambda c: c[1])[0]
+                elif candidates:
+                    chosen = max(candidates, key=lambda c: c[1] or 0)[0]
+            asset = self._asset(chosen) if chosen else None
+            if asset is None:
+                continue
+            requests += 1
+            weight += asset[1]
+            if asset[1] > budgets["image_kb"] * 1024:
+                violations.append(
+                    f"{chosen} weighs {asset[1] / 1024:.1f} KB "
+                    f"(budget {budgets['image_kb']:g} KB)"
+                )
+            intrinsic = self._intrinsic_width(chosen)
+            if (
+                rendered
+                and intrinsic
+                and intrinsic > rendered * budgets["oversize_ratio"]
+            ):
+                violations.append(
+                    f"{chosen} is {intrinsic}px wide but shown at "
+                    f"{rendered}px; add a smaller variant or srcset"
+                )
+            if index > 0 and image.get("loading") != "lazy":
+                violations.append(f'{src} is missing loading="lazy"')
+
+        if weight > budgets["page_weight_kb"] * 1024:
+            violations.insert(
+                0,
+                f"page weight {weight / 1024:.1f} KB "
+                f"(budget {budgets['page_weight_kb']:g} KB)",
+            )
+        if requests > budgets["requests"]:
+            violations.insert(
+                0, f"{requests} requests (budget {budgets['requests']:g})"
+            )
+        return {
+            "page": page,
+            "weight": weight,
+            "requests": requests,
+            "render_blocking": blocking,
+            "violations": violations,
+        }
+
+    def audit(self):
+        """Audit every page of the project"""
+        self._load_manifest()
+        return [self.audit_page(page) for page in self.pages()]
+
+    def report(self):
+        """Budget violations for a prompt, or "" if every page is in budget"""
+        results = self.audit()
+        lines = [
+            f"- {result['page']}: {violation}"
+            for result in results
+            for violation in result["violations"]
+        ]
+        if not lines:
+            return ""
+        return (
+            "\n\nPerformance budget violations (fix these in your changes):\n"
+            + "\n".join(lines)
+        )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Audit a generated website")
+    parser.add_argument("project_dir")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    auditor = PerformanceAuditor(args.project_dir)
+    results = auditor.audit()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(
+                f"{result['page']}: {result['weight'] / 1024:.1f} KB, "
+                f"{result['requests']} requests, "
+                f"{len(result['render_blocking'])} render-blocking"
+            )
+            for violation in result["violations"]:
+                print(f"  ❌ {violation}")
+    raise SystemExit(1 if any(r["violations"] for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_SIZE = (800, 600)
+
+# Fonts tried in order; the first one that loads is cached for the process
+FONT_CANDIDATES = [
+    "arial.ttf",
+    "Arial.ttf",
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+# Encoder settings tuned for flat placeholder artwork
+FORMAT_OPTIONS = {
+    "PNG": {"compress_level": 1},
+    "WEBP": {"quality": 80, "method": 2},
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+}
+
+EXTENSION_FORMATS = {
+    ".png": "PNG",
+    ".webp": "WEBP",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+}
+
+
+def wrap_text(text, width):
+    """Wrap text to specified width"""
+    words = text.split()
+    lines = []
+    current_line = []
+
+    for word in words:
+        current_line.append(word)
+        if len(" ".join(current_line)) > width:
+            if len(current_line) > 1:
+                current_line.pop()
+                lines.append(" ".join(current_line))
+                current_line = [word]
+            else:
+                lines.append(word)
+                current_line = []
+
+    if current_line:
+        lines.append(" ".join(current_line))
+
+    return lines
+
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """Load a TrueType font once per process, falling back to the default"""
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Older Pillow versions don't accept a size
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=8)
+def get_background(size=DEFAULT_SIZE):
+    """
+    Build the gradient background with its border for the given size.
+
+    The gradient is computed once as a single 1-pixel wide band and stretched
+    to the full width in one resize, instead of drawing one line per row.
+    """
+    width, height = size
+    band = bytearray()
+    for y in range(height):
+        # Gradient from light to slightly darker
+        color_value = int(240 - (y / height) * 40)
+        band += bytes(min(255, color_value + offset) for offset in (0, 10, 20))
+
+    image = Image.frombytes("RGB", (1, height), bytes(band))
+    image = image.resize((width, height), Image.NEAREST)
+
+    # Add a decorative border
+    ImageDraw.Draw(image).rectangle(
+        [10, 10, width - 10, height - 10], outline="#cccccc", width=2
+    )
+    return image
+
+
+def get_format(output_path, image_format=None):
+    """Resolve the output format from an explicit name or the file extension"""
+    if image_format:
+        return image_format.upper()
+    extension = os.path.splitext(str(output_path))[1].lower()
+    return EXTENSION_FORMATS.get(extension, "PNG")
+
+
+def render_placeholder(
+    prompt, style="", output_path="", size=DEFAULT_SIZE, image_format=None
+):
+    """Render a placeholder image with the prompt as text and save it"""
+    width, height = size
+    image = get_background(tuple(size)).copy()
+    draw = ImageDraw.Draw(image)
+    font_large = get_font(24)
+    font_small = get_font(16)
+
+    # Wrap text
+    lines = wrap_text(prompt, 50)
+
+    # Calculate text positioning
+    total_text_height = len(lines) * 30 + 60
+    start_y = (height - total_text_height) // 2
+
+    # Draw main prompt
+    y_offset = start_y
+    for line in lines:
+        text_width = draw.textlength(line, font=font_large)
+        x = (width - text_width) // 2
+        draw.text((x, y_offset), line, fill="#333333", font=font_large)
+        y_offset += 30
+
+    # Add style info if provided
+    if style:
+        style_text = f"Style: {style}"
+        text_width = draw.textlength(style_text, font=font_small)
+        x = (width - text_width) // 2
+        draw.text(
+            (x, y_offset + 20), style_text, fill="#666666", font=font_small
+        )
+
+    image_format = get_format(output_path, image_format)
+    image.save(
+        output_path,
+        format=image_format,
+        **FORMAT_OPTIONS.get(image_format, {}),
+    )
+    return True
+
+
+def _render_job(job):
+    """Process pool entry point for a single placeholder job"""
+    try:
+        return render_placeholder(
+            job["prompt"],
+            job.get("style", ""),
+            job["output_path"],
+            tuple(job.get("size", DEFAULT_SIZE)),
+            job.get("image_format"),
+        )
+    except Exception as e:
+        print(f"Placeholder generation failed: {e}")
+        return False
+
+
+def render_batch(jobs, max_workers=None):
+    """
+    Render many placeholder jobs, spreading them over a process pool.
+
+    Each job is a dict with "prompt", "output_path" and optionally "style",
+    "size" and "image_format". Returns a list of booleans in job order.
+    """
+    jobs = list(jobs)
+    if len(jobs) < 2 or max_workers == 1:
+        return [_render_job(job) for job in jobs]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render_job, jobs))
@@ -0,0 +1,469 @@
+"""
+Local preview server for generated websites.
+
+Serves website_project/ over HTTP, one project per path prefix:
+
+    http://127.0.0.1:8000/<name>/            the project's pages
+    http://127.0.0.1:8000/<name>/ (--dist)   its build output in dist/
+
+Responses carry ETags derived from the content hash, so reloads revalidate
+with a 304 instead of downloading again, and content-hashed build outputs
+(style.1a2b3c4d.css) are cached for a year. Precompressed .br/.gz siblings
+from the build stage are served to browsers accepting them; other text is
+gzip-compressed once per content hash. Large files are sent with
+socket.sendfile, so their bytes never pass through Python.
+
+Pages get a small live-reload script. Open pages reload when FileManager
+writes a file of their project (write_hooks) and, for writes from other
+processes such as the session daemon, when polling sees the project change.
+Every connection has its own daemon thread, so viewers never block the
+simulation.
+
+    python preview_server.py [<name>] [--port 8000] [--dist]
+
+or set PREVIEW_PORT to start it from main.py.
+"""
+
+import gzip
+import hashlib
+import html
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
+import file_manager
+from environment import getenv, getenv_int
+from metrics import counter, gauge
+from site_build import BUILD_DIR, TEXT_EXTENSIONS
+
+RELOAD_PATH = "/__reload/"
+# Files at least this large are sent with sendfile instead of read + write
+SENDFILE_MIN_BYTES = 64 * 1024
+MIN_COMPRESS_BYTES = 256
+COMPRESSED_CACHE_SIZE = 128
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{8}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Writes usually come in bursts; reload once they settle
+RELOAD_SETTLE_SECONDS = 0.3
+HEARTBEAT_SECONDS = 15
+
+RELOAD_SCRIPT = """<script>
+new EventSource("%s").addEventListener("reload", function () {
+  location.reload();
+});
+</script>"""
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+REQUESTS = counter(
+    "preview_requests_total", "Preview server responses", ["status"]
+)
+BYTES_SENT = counter(
+    "preview_bytes_sent_total", "Body bytes sent by the preview server"
+)
+VIEWERS = gauge("preview_live_viewers", "Open live-reload connections")
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PreviewServer:
+    def __init__(
+        self, root="website_project", host="127.0.0.1", port=8000, dist=False
+    ):
+        self.root = Path(root)
+        self.dist = dist
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 64
+        self._lock = threading.Lock()
+        # Content hashes by path and (mtime, size)
+        self._hashes = {}
+        # gzip bodies by path and ETag
+        self._compressed = OrderedDict()
+        self._changed = threading.Condition()
+        self._versions = {}
+        self._viewers = {}
+        self._snapshots = {}
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self, poll_interval=1.0):
+        """Serve from daemon threads and return immediately"""
+        file_manager.write_hooks.append(self._on_write)
+        threading.Thread(
+            target=self.httpd.serve_forever, name="preview-http", daemon=True
+        ).start()
+        if poll_interval:
+            threading.Thread(
+                target=self._poll,
+                args=(poll_interval,),
+                name="preview-poll",
+                daemon=True,
+            ).start()
+        return self
+
+    def stop(self):
+        if self._on_write in file_manager.write_hooks:
+            file_manager.write_hooks.remove(self._on_write)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def project_dir(self, project):
+        directory = self.root / project
+        if self.dist and (directory / BUILD_DIR).is_dir():
+            directory = directory / BUILD_DIR
+        return directory
+
+    def reload(self, project):
+        """Tell the open pages of a project to reload"""
+        with self._changed:
+            self._versions[project] = self._versions.get(project, 0) + 1
+            self._changed.notify_all()
+
+    def _on_write(self, project_dir, filename):
+        # Build outputs only change when the build runs; polling sees that
+        if not self.dist and Path(project_dir).parent == self.root:
+            self.reload(Path(project_dir).name)
+
+    def _poll(self, interval):
+        """Reload projects changed by other processes, while watched"""
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                watched = [p for p, n in self._viewers.items() if n]
+            for project in watched:
+                snapshot = self._snapshot(self.project_dir(project))
+                previous = self._snapshots.get(project)
+                self._snapshots[project] = snapshot
+                if previous is not None and snapshot != previous:
+                    self.reload(project)
+
+    def _snapshot(self, directory):
+        snapshot = {}
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [
+                d
+                for d in dirs
+                if not d.startswith(".")
+                and not (Path(root) == directory and d == BUILD_DIR)
+            ]
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    snapshot[path] = _signature(path)
+                except OSError:
+                    pass
+        return snapshot
+
+    def _hash(self, path):
+        signature = _signature(path)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        with self._lock:
+            self._hashes[path] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _gzip(self, key, data):
+        with self._lock:
+            body = self._compressed.get(key)
+            if body is not None:
+                self._compressed.move_to_end(key)
+                return body
+        body = gzip.compress(data, 6, mtime=0)
+        with self._lock:
+            self._compressed[key] = body
+            if len(self._compressed) > COMPRESSED_CACHE_SIZE:
+                self._compressed.popitem(last=False)
+        return body
+
+    def resolve(self, url_path):
+        """(project, file path) a request path maps to, or None"""
+        parts = [unquote(p) for p in url_path.split("/") if p]
+        if not parts or any(
+            p.startswith(".") or "/" in p or "\\" in p for p in parts
+        ):
+            return None
+        project, rest = parts[0], parts[1:]
+        directory = self.project_dir(project)
+        path = directory.joinpath(*rest) if rest else directory
+        if path.is_dir():
+            path = path / "index.html"
+        return (project, path) if path.is_file() else None
+
+    def _watch(self, project, delta):
+        with self._lock:
+            self._viewers[project] = self._viewers.get(project, 0) + delta
+        VIEWERS.inc(delta)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def _serve(self, head):
+                path = urlsplit(self.path).path
+                if path.startswith(RELOAD_PATH):
+                    self._live_reload(path[len(RELOAD_PATH) :].strip("/"))
+                    return
+                if path == "/":
+                    self._send_index(head)
+                    return
+                # /<name> -> /<name>/, so the pages' relative links work
+                if path.count("/") == 1 and server.resolve(path):
+                    self._redirect(path + "/")
+                    return
+                found = server.resolve(path)
+                if found is None:
+                    self._send_error(404, head)
+                    return
+                try:
+                    self._send_file(*found, head)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _send_file(self, project, path, head):
+                name = str(path)
+                is_page = name.lower().endswith((".html", ".htm"))
+                compressible = name.lower().endswith(TEXT_EXTENSIONS)
+                accepted = self.headers.get("Accept-Encoding", "")
+                content_type = (
+                    mimetypes.guess_type(name)[0] or "application/octet-stream"
+                )
+                if content_type.startswith("text/") or name.endswith(".js"):
+                    content_type += "; charset=utf-8"
+                headers = {
+                    "Content-Type": content_type,
+                    "Cache-Control": (
+                        IMMUTABLE if FINGERPRINTED.search(name) else "no-cache"
+                    ),
+                }
+
+                # Pages are served with the live-reload script, so only
+                # other files can use the build's precompressed siblings
+                tag = server._hash(name)[:16] + ("-lr" if is_page else "")
+                source, encoding = name, None
+                if compressible:
+                    headers["Vary"] = "Accept-Encoding"
+                    for suffix, candidate in ((".br", "br"), (".gz", "gzip")):
+                        sibling = name + suffix
+                        if (
+                            not is_page
+                            and candidate in accepted
+                            and os.path.isfile(sibling)
+                            and _signature(sibling)[0] >= _signature(name)[0]
+                        ):
+                            source, encoding = sibling, candidate
+                            break
+                    else:
+                        if (
+                            "gzip" in accepted
+                            and os.path.getsize(name) >= MIN_COMPRESS_BYTES
+                        ):
+                            encoding = "gzip"
+                if encoding:
+                    headers["Content-Encoding"] = encoding
+                    tag += f"-{encoding}"
+                etag = headers["ETag"] = f'"{tag}"'
+                if etag in self.headers.get("If-None-Match", ""):
+                    self._respond(304, headers, b"", head)
+                    return
+
+                if source != name or not (is_page or encoding):
+                    self._respond_file(200, headers, source, head)
+                    return
+                with open(name, "rb") as f:
+                    body = f.read()
+                if is_page:
+                    body = self._inject(project, body)
+                if encoding:
+                    body = server._gzip(f"{name}:{etag}", body)
+                self._respond(200, headers, body, head)
+
+            def _inject(self, project, page):
+                script = (
+                    RELOAD_SCRIPT % (RELOAD_PATH + quote(project))
+                ).encode()
+                position = page.lower().rfind(b"</body>")
+                if position < 0:
+                    return page + script
+                return page[:position] + script + page[position:]
+
+            def _respond(self, status, headers, body, head):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if not head and status != 304:
+                    self.wfile.write(body)
+                    BYTES_SENT.inc(len(body))
+                REQUESTS.labels(str(status)).inc()
+
+            def _respond_file(self, status, headers, path, head):
+                size = os.path.getsize(path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(size))
+                self.end_headers()
+                if not head:
+                    with open(path, "rb") as f:
+                        if size >= SENDFILE_MIN_BYTES:
+                            self.wfile.flush()
+                            self.connection.sendfile(f)
+                        else:
+                            self.wfile.write(f.read())
+                    BYTES_SENT.inc(size)
+                REQUESTS.labels(str(status)).inc()
+
+            def _redirect(self, location):
+                self._respond(301, {"Location": location}, b"", False)
+
+            def _send_error(self, status, head):
+                body = f"{status} {self.responses[status][0]}\n".encode()
+                self._respond(
+                    status, {"Content-Type": "text/plain"}, body, head
+                )
+
+            def _send_index(self, head):
+                projects = (
+                    sorted(
+                        p.name
+                        for p in server.root.iterdir()
+                        if p.is_dir() and not p.name.startswith(".")
+                    )
+                    if server.root.is_dir()
+                    else []
+                )
+                items = "".join(
+                    f'<li><a href="{quote(p)}/">{html.escape(p)}</a></li>'
+                    for p in projects
+                )
+                body = (
+                    "<!DOCTYPE html><title>Projects</title>"
+                    f"<h1>Projects</h1><ul>{items}</ul>"
+                ).encode("utf-8")
+                self._respond(
+                    200,
+                    {
+                        "Content-Type": "text/html; charset=utf-8",
+                        "Cache-Control": "no-cache",
+                    },
+                    body,
+                    head,
+                )
+
+            def _live_reload(self, project):
+                """Server-sent events: one "reload" per settled change"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                server._watch(project, 1)
+                with server._changed:
+                    seen = server._versions.get(project, 0)
+                try:
+                    while True:
+                        with server._changed:
+                            server._changed.wait_for(
+                                lambda: server._versions.get(project, 0)
+                                != seen,
+                                HEARTBEAT_SECONDS,
+                            )
+                            version = server._versions.get(project, 0)
+                        if version == seen:
+                            self.wfile.write(b": keep-alive\n\n")
+                            continue
+                        # Let a burst of writes finish first
+                        while True:
+                            time.sleep(RELOAD_SETTLE_SECONDS)
+                            with server._changed:
+                                latest = server._versions.get(project, 0)
+                            if latest == version:
+                                break
+                            version = latest
+                        seen = version
+                        self.wfile.write(b"event: reload\ndata: {}\n\n")
+                except (BrokenPipeError, ConnectionResetError, OSError):
+                    pass
+                finally:
+                    server._watch(project, -1)
+
+        return Handler
+
+
+_installed = None
+
+
+def install_from_env():
+    """Start the preview server configured in the env, if any"""
+    global _installed
+    port = getenv_int("PREVIEW_PORT", None)
+    if _installed or port is None:
+        return _installed
+    _installed = PreviewServer(
+        port=port, dist=getenv("PREVIEW_DIST", "0") != "0"
+    ).start()
+    print(f"👀 Preview at {_installed.url}")
+    return _installed
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preview generated websites")
+    parser.add_argument("project", nargs="?", help="open this project")
+    parser.add_argument("--root", default="website_project")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--dist", action="store_true", help="serve the build output"
+    )
+    args = parser.parse_args()
+
+    server = PreviewServer(args.root, args.host, args.port, args.dist).start()
+    url = server.url + (quote(args.project) + "/" if args.project else "")
+    print(f"🟢 Preview server at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print("🔴 Preview server stopped")
+
+
+if __name__ == "__main__":
+    main()
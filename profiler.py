@@ -0,0 +1,240 @@
+"""
+Profiling mode for simulation runs.
+
+When installed, every DevelopmentSimulation scenario (one conversation round)
+is profiled with cProfile, tracemalloc snapshots are taken at the start and
+end of each round, and, optionally, a background thread samples the stacks
+of all threads. Everything is written to a per-run directory:
+
+    <dir>/run-<timestamp>-<pid>/
+        01-project_creation-s1.prof    cProfile stats, one file per scenario
+        01-project_creation-s1.mem.txt top allocation growth in the round
+        samples.folded                 sampled stacks (flamegraph input)
+        summary.txt                    hottest functions and allocations
+
+Enable it with PROFILE_DIR for main.py and the session daemon, or with
+--profile for the batch runner. PROFILE_SAMPLE_MS sets the stack sampling
+interval (off by default) and PROFILE_MEMORY=0 turns tracemalloc off.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from environment import getenv, getenv_float
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 10
+
+# Allocations made by the profiling machinery itself
+IGNORED_ALLOCATIONS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+_active = None
+
+
+class StackSampler:
+    """Counts folded stacks of every thread at a fixed interval"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}"
+                        f":{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                with self._lock:
+                    self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with self._lock:
+            counts = list(self.counts.items())
+        Path(path).write_text("".join(f"{stack} {n}\n" for stack, n in counts))
+
+
+class Profiler:
+    def __init__(self, output_dir, sample_interval=None, memory=True):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.run_dir = Path(output_dir) / f"run-{stamp}-{os.getpid()}"
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self.memory = memory
+        self.sampler = (
+            StackSampler(sample_interval) if sample_interval else None
+        )
+        self.workflows = 0
+        self.scenarios = []
+        self._workflow = None
+        self._profile = None
+        self._owner = None
+        self._snapshot = None
+        self._started = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.sampler:
+            self.sampler.start()
+        return self
+
+    def on_event(self, event):
+        """DevelopmentSimulation event hook"""
+        handler = getattr(self, f"_on_{event['type']}", None)
+        if handler:
+            handler(event)
+
+    def _on_workflow_started(self, event):
+        with self._lock:
+            self.workflows += 1
+            self._workflow = f"{self.workflows:02d}-{event['workflow']}"
+
+    def _on_scenario_started(self, event):
+        with self._lock:
+            # cProfile follows one scenario at a time; scenarios running
+            # concurrently in other sessions are skipped
+            if self._profile is not None:
+                return
+            self._snapshot = (
+                tracemalloc.take_snapshot().filter_traces(IGNORED_ALLOCATIONS)
+                if tracemalloc.is_tracing()
+                else None
+            )
+            self._started = time.perf_counter()
+            self._owner = threading.get_ident()
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def _on_scenario_finished(self, event):
+        with self._lock:
+            if self._profile is None or self._owner != threading.get_ident():
+                return
+            profile, self._profile = self._profile, None
+            profile.disable()
+            name = f"{self._workflow}-s{event['scenario']}"
+
+            allocations = []
+            if self._snapshot is not None and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                diff = snapshot.filter_traces(IGNORED_ALLOCATIONS).compare_to(
+                    self._snapshot, "lineno"
+                )
+                allocations = [str(stat) for stat in diff[:TOP_ALLOCATIONS]]
+                (self.run_dir / f"{name}.mem.txt").write_text(
+                    "\n".join(allocations) + "\n"
+                )
+            self._snapshot = None
+            profile.dump_stats(self.run_dir / f"{name}.prof")
+            self.scenarios.append(
+                {
+                    "name": name,
+                    "title": event["title"],
+                    "seconds": time.perf_counter() - self._started,
+                    "allocations": allocations,
+                }
+            )
+
+    def _on_workflow_finished(self, event):
+        # Written after every workflow, since worker processes of the batch
+        # runner exit without running atexit handlers
+        self.write_summary()
+
+    def _on_workflow_failed(self, event):
+        with self._lock:
+            # Drop the profile of the scenario that raised
+            if (
+                self._profile is not None
+                and self._owner == threading.get_ident()
+            ):
+                self._profile.disable()
+                self._profile = None
+                self._snapshot = None
+        self.write_summary()
+
+    def write_summary(self):
+        with self._lock:
+            scenarios = list(self.scenarios)
+        if self.sampler:
+            self.sampler.write(self.run_dir / "samples.folded")
+
+        out = io.StringIO()
+        out.write(f"Profile of {len(scenarios)} scenarios in {self.run_dir}\n")
+        for scenario in scenarios:
+            out.write(
+                f"\n{scenario['name']}  {scenario['title']}  "
+                f"{scenario['seconds']:.2f}s\n"
+            )
+            for line in scenario["allocations"][:3]:
+                out.write(f"    mem {line}\n")
+
+        profiles = [str(self.run_dir / f"{s['name']}.prof") for s in scenarios]
+        if profiles:
+            out.write("\nHottest functions (all scenarios, by own time):\n")
+            stats = pstats.Stats(*profiles, stream=out)
+            stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+        (self.run_dir / "summary.txt").write_text(out.getvalue())
+
+    def stop(self):
+        if self.sampler:
+            self.sampler.stop()
+        self.write_summary()
+
+
+def install(output_dir, sample_interval=None, memory=True):
+    """Profile every simulation run in this process"""
+    global _active
+    import development_simulation
+
+    if _active is None:
+        _active = Profiler(output_dir, sample_interval, memory).start()
+        development_simulation.event_hooks.append(_active.on_event)
+        print(f"🔬 Profiling runs into {_active.run_dir}")
+    return _active
+
+
+def install_from_env():
+    """Install the profiler if PROFILE_DIR is set"""
+    output_dir = getenv("PROFILE_DIR")
+    if not output_dir:
+        return None
+    sample_ms = getenv_float("PROFILE_SAMPLE_MS", 0.0)
+    profiler = install(
+        output_dir,
+        sample_ms / 1000 if sample_ms > 0 else None,
+        getenv("PROFILE_MEMORY", "1") != "0",
+    )
+    import atexit
+
+    atexit.register(profiler.stop)
+    return profiler
@@ -0,0 +1,123 @@
+"""
+What changed in the project since an agent last looked.
+
+Each agent keeps a ProjectView: the hash and content of every project file
+as of its previous prompt. Instead of the full file listing, later prompts
+carry a change report of new, deleted and modified files. Small edits are
+inlined as unified diffs so the agent can follow them without reading the
+file again; larger ones are summarized by line and character counts.
+"""
+
+import difflib
+import hashlib
+
+# Markers FileManager stores instead of content for non-text files
+NON_TEXT = ("binary_file", "image_file")
+MAX_DIFF_LINES = 40
+MAX_DIFF_CHARS = 2000
+
+
+def content_hash(content):
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+
+
+def _is_text(content):
+    return isinstance(content, str) and content not in NON_TEXT
+
+
+def _describe(content):
+    if not _is_text(content):
+        return "image file" if content == "image_file" else "binary file"
+    return f"{len(content)} characters"
+
+
+def _diff(filename, old, new):
+    """A small unified diff, or a one-line summary of a large change"""
+    lines = list(
+        difflib.unified_diff(
+            old.splitlines(),
+            new.splitlines(),
+            f"a/{filename}",
+            f"b/{filename}",
+            n=1,
+            lineterm="",
+        )
+    )
+    text = "\n".join(lines)
+    if len(lines) <= MAX_DIFF_LINES and len(text) <= MAX_DIFF_CHARS:
+        return f"~ {filename}:\n```diff\n{text}\n```\n"
+    added = sum(
+        1 for l in lines if l.startswith("+") and not l.startswith("+++")
+    )
+    removed = sum(
+        1 for l in lines if l.startswith("-") and not l.startswith("---")
+    )
+    return (
+        f"~ {filename}: +{added}/-{removed} lines, "
+        f"{len(old)} -> {len(new)} characters (too large to show)\n"
+    )
+
+
+class ProjectView:
+    """The project files one agent has seen"""
+
+    def __init__(self):
+        self.files = None
+
+    def reset(self):
+        self.files = None
+
+    def see(self, filename, content):
+        """Record that the agent has seen content, e.g. by reading it"""
+        if self.files is not None:
+            self.files[filename] = (self._hash(content), content)
+
+    def _hash(self, content):
+        return content_hash(content) if _is_text(content) else content
+
+    def report(self, project_files, knowledge=None):
+        """
+        Describe project_files relative to the last report and remember
+        them. The first report lists every file, with its summary if a
+        KnowledgeCache is given.
+        """
+        previous = self.files
+        current = {}
+        for name, content in project_files.items():
+            seen = (previous or {}).get(name)
+            # Unchanged files are usually the very same string object
+            if seen is not None and seen[1] is content:
+                current[name] = seen
+            else:
+                current[name] = (self._hash(content), content)
+        self.files = current
+
+        if previous is None:
+            if knowledge is not None:
+                return knowledge.digest(project_files)
+            listing = "".join(
+                f"- {name}: {_describe(content)}\n"
+                for name, (_, content) in current.items()
+            )
+            return f"\n\nCurrent project files:\n{listing}"
+
+        changes = []
+        for name, (digest, content) in current.items():
+            if name not in previous:
+                changes.append(f"+ {name}: new, {_describe(content)}\n")
+            elif previous[name][0] != digest:
+                old = previous[name][1]
+                if _is_text(old) and _is_text(content):
+                    changes.append(_diff(name, old, content))
+                else:
+                    changes.append(f"~ {name}: {_describe(content)}\n")
+        changes.extend(
+            f"- {name}: deleted\n" for name in previous if name not in current
+        )
+
+        if not changes:
+            return (
+                f"\n\nNo project file changes since your last turn "
+                f"({len(current)} files)."
+            )
+        return "\n\nProject changes since your last turn:\n" + "".join(changes)
@@ -0,0 +1,330 @@
+"""
+Cross-file reference index of a generated website.
+
+Tracks what every page, stylesheet and script refers to: pages and nav
+menus, links and their #anchors, images, stylesheets, scripts, element ids
+and classes, CSS selectors and url()/@import references and the elements
+scripts look up. FileManager updates the index on every write, so it stays
+current without rescanning the project.
+
+Code can use it for link validation (broken_links), broken-image detection
+(broken_images) and impact analysis (referrers). Agents query it with:
+
+    FILE_ACTION: REFERENCES
+    FILENAME: about.html      (or * for the whole site)
+"""
+
+import posixpath
+import re
+from collections import defaultdict
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+HTML_EXTENSIONS = (".html", ".htm")
+EXTERNAL_PREFIXES = (
+    "http:",
+    "https:",
+    "//",
+    "mailto:",
+    "tel:",
+    "javascript:",
+    "data:",
+)
+
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_RULE = re.compile(r"([^{}]+)\{")
+CSS_CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+CSS_ID = re.compile(r"#(-?[_a-zA-Z][\w-]*)")
+CSS_URL = re.compile(r"url\(\s*['\"]?([^'\")]+)")
+CSS_IMPORT = re.compile(r"@import\s+(?:url\()?\s*['\"]([^'\"]+)")
+JS_CLASS_LOOKUP = re.compile(
+    r"(?:getElementsByClassName\(|classList\.\w+\()\s*['\"]([\w\s-]+)"
+)
+JS_ID_LOOKUP = re.compile(r"getElementById\(\s*['\"]([\w-]+)")
+JS_SELECTOR = re.compile(r"querySelector(?:All)?\(\s*['\"]([^'\"]+)")
+JS_URL = re.compile(r"""(?:fetch\(|location(?:\.href)?\s*=)\s*['"]([^'"]+)""")
+
+
+def resolve(source, reference):
+    """
+    Project-relative path and fragment a reference in source points at, or
+    None for external URLs.
+    """
+    reference = reference.strip()
+    if not reference or reference.lower().startswith(EXTERNAL_PREFIXES):
+        return None
+    parts = urlsplit(reference)
+    path = unquote(parts.path)
+    if not path:
+        target = source
+    elif path.startswith("/"):
+        target = path.lstrip("/")
+    else:
+        target = posixpath.join(posixpath.dirname(source), path)
+    target = posixpath.normpath(target) if target else ""
+    if target in ("", ".") or path.endswith("/"):
+        target = posixpath.join("" if target == "." else target, "index.html")
+    return target, parts.fragment
+
+
+class _Tokenizer(HTMLParser):
+    """Collects the references of one page"""
+
+    def __init__(self, source):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.entry = {
+            "kind": "html",
+            "refs": [],
+            "ids": set(),
+            "classes": set(),
+        }
+        self._nav_depth = 0
+
+    def _ref(self, kind, value):
+        resolved = resolve(self.source, value or "")
+        if resolved:
+            target, fragment = resolved
+            self.entry["refs"].append((kind, target, fragment, value))
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("id"):
+            self.entry["ids"].add(attrs["id"])
+        self.entry["classes"].update((attrs.get("class") or "").split())
+        if tag == "nav":
+            self._nav_depth += 1
+        elif tag == "a" and attrs.get("href"):
+            self._ref("nav" if self._nav_depth else "link", attrs["href"])
+        elif tag == "img":
+            self._ref("image", attrs.get("src"))
+        elif tag == "source" and attrs.get("srcset"):
+            for candidate in attrs["srcset"].split(","):
+                self._ref("image", candidate.strip().split(" ")[0])
+        elif tag == "link" and "stylesheet" in (attrs.get("rel") or ""):
+            self._ref("stylesheet", attrs.get("href"))
+        elif tag == "script" and attrs.get("src"):
+            self._ref("script", attrs["src"])
+
+    def handle_endtag(self, tag):
+        if tag == "nav" and self._nav_depth:
+            self._nav_depth -= 1
+
+
+def _index_html(filename, content):
+    tokenizer = _Tokenizer(filename)
+    try:
+        tokenizer.feed(content)
+        tokenizer.close()
+    except Exception:
+        # Keep whatever was found before the markup broke the parser
+        pass
+    return tokenizer.entry
+
+
+def _index_css(filename, content):
+    content = CSS_COMMENT.sub("", content)
+    selectors = [
+        " ".join(s.split())
+        for s in CSS_RULE.findall(content)
+        if not s.strip().startswith("@")
+    ]
+    refs = []
+    for kind, pattern in (("url", CSS_URL), ("import", CSS_IMPORT)):
+        for value in pattern.findall(content):
+            resolved = resolve(filename, value)
+            if resolved:
+                refs.append((kind, resolved[0], resolved[1], value))
+    classes = set()
+    ids = set()
+    for selector in selectors:
+        classes.update(CSS_CLASS.findall(selector))
+        ids.update(CSS_ID.findall(selector))
+    return {
+        "kind": "css",
+        "refs": refs,
+        "selectors": selectors,
+        "ids": ids,
+        "classes": classes,
+    }
+
+
+def _index_js(filename, content):
+    classes = set()
+    for value in JS_CLASS_LOOKUP.findall(content):
+        classes.update(value.split())
+    ids = set(JS_ID_LOOKUP.findall(content))
+    for selector in JS_SELECTOR.findall(content):
+        classes.update(CSS_CLASS.findall(selector))
+        ids.update(CSS_ID.findall(selector))
+    refs = []
+    for value in JS_URL.findall(content):
+        resolved = resolve(filename, value)
+        if resolved:
+            refs.append(("link", resolved[0], resolved[1], value))
+    return {"kind": "js", "refs": refs, "ids": ids, "classes": classes}
+
+
+INDEXERS = {".css": _index_css, ".js": _index_js}
+
+
+class ReferenceIndex:
+    def __init__(self):
+        self.entries = {}
+        self._contents = {}
+
+    def update(self, filename, content):
+        """(Re)index one file; returns False if it was already current"""
+        filename = filename.replace("\\", "/").lstrip("/")
+        previous = self._contents.get(filename)
+        if previous is content or previous == content:
+            return False
+        extension = posixpath.splitext(filename)[1].lower()
+        if extension in HTML_EXTENSIONS:
+            entry = _index_html(filename, content)
+        elif extension in INDEXERS:
+            entry = INDEXERS[extension](filename, content)
+        else:
+            return False
+        self.entries[filename] = entry
+        self._contents[filename] = content
+        return True
+
+    def remove(self, filename):
+        self.entries.pop(filename, None)
+        self._contents.pop(filename, None)
+
+    def sync(self, project_files):
+        """Catch up with files loaded or deleted outside FileManager writes"""
+        for filename, content in project_files.items():
+            if isinstance(content, str):
+                self.update(filename, content)
+        for filename in list(self.entries):
+            if filename not in project_files:
+                self.remove(filename)
+
+    def pages(self):
+        return sorted(
+            f for f, e in self.entries.items() if e["kind"] == "html"
+        )
+
+    def nav_menus(self):
+        """Nav link targets of every page, in document order"""
+        return {
+            page: [
+                target
+                for kind, target, _, _ in self.entries[page]["refs"]
+                if kind == "nav"
+            ]
+            for page in self.pages()
+        }
+
+    def referrers(self, target):
+        """(source, kind) of every reference to target: impact analysis"""
+        target = target.replace("\\", "/").lstrip("/")
+        found = [
+            (source, kind)
+            for source, entry in sorted(self.entries.items())
+            for kind, ref_target, _, _ in entry["refs"]
+            if ref_target == target
+        ]
+        return list(dict.fromkeys(found))
+
+    def broken_links(self, exists):
+        """(source, reference) of links to missing pages or #anchors"""
+        broken = []
+        for source, entry in sorted(self.entries.items()):
+            for kind, target, fragment, value in entry["refs"]:
+                if kind not in ("link", "nav", "stylesheet", "script"):
+                    continue
+                if not exists(target):
+                    broken.append((source, value))
+                elif (
+                    fragment
+                    and target in self.entries
+                    and self.entries[target]["kind"] == "html"
+                    and fragment not in self.entries[target]["ids"]
+                ):
+                    broken.append((source, value))
+        return broken
+
+    def broken_images(self, exists):
+        """(source, reference) of images and url()s to missing files"""
+        return [
+            (source, value)
+            for source, entry in sorted(self.entries.items())
+            for kind, target, _, value in entry["refs"]
+            if kind in ("image", "url", "import") and not exists(target)
+        ]
+
+    def unused_classes(self):
+        """CSS classes no page or script uses"""
+        used = set()
+        defined = set()
+        for entry in self.entries.values():
+            if entry["kind"] == "css":
+                defined |= entry["classes"]
+            else:
+                used |= entry["classes"]
+        return sorted(defined - used)
+
+    def describe(self, filename, exists):
+        """Compact query result for an agent: one file, or * for the site"""
+        filename = filename.replace("\\", "/").lstrip("/")
+        if filename in ("", "*", "."):
+            return self._describe_site(exists)
+        entry = self.entries.get(filename)
+        lines = [f"References of {filename}:"]
+        if entry:
+            by_kind = defaultdict(list)
+            for kind, target, fragment, _ in entry["refs"]:
+                by_kind[kind].append(
+                    f"{target}#{fragment}" if fragment else target
+                )
+            for kind, targets in by_kind.items():
+                lines.append(f"- {kind}: {', '.join(dict.fromkeys(targets))}")
+            if entry["ids"]:
+                lines.append(f"- ids: {', '.join(sorted(entry['ids']))}")
+            if entry["classes"]:
+                lines.append(
+                    f"- classes: {', '.join(sorted(entry['classes']))}"
+                )
+        referrers = self.referrers(filename)
+        if referrers:
+            lines.append(
+                "- referenced by: "
+                + ", ".join(f"{source} ({kind})" for source, kind in referrers)
+            )
+        elif not entry:
+            lines.append("- not indexed and not referenced by any file")
+        return "\n".join(lines)
+
+    def _describe_site(self, exists):
+        pages = self.pages()
+        lines = [f"Site references ({len(pages)} pages):"]
+        menus = defaultdict(list)
+        for page, targets in self.nav_menus().items():
+            menus[tuple(targets)].append(page)
+        for targets, members in sorted(
+            menus.items(), key=lambda i: -len(i[1])
+        ):
+            menu = ", ".join(targets) if targets else "no nav menu"
+            lines.append(f"- nav [{menu}] on: {', '.join(members)}")
+        unlinked = [p for p in pages if not self.referrers(p)]
+        if unlinked:
+            lines.append(f"- pages nothing links to: {', '.join(unlinked)}")
+        for label, broken in (
+            ("broken links", self.broken_links(exists)),
+            ("missing images", self.broken_images(exists)),
+        ):
+            if broken:
+                lines.append(
+                    f"- {label}: "
+                    + ", ".join(
+                        f"{source} -> {value}" for source, value in broken
+                    )
+                )
+        unused = self.unused_classes()
+        if unused:
+            lines.append(f"- unused CSS classes: {', '.join(unused[:20])}")
+        return "\n".join(lines)
@@ -0,0 +1,126 @@
+"""
+Adaptive length of a conversation round.
+
+A round used to run max_exchanges passes over its agents unless a reply said
+something like "agreed". RoundController decides after every pass instead:
+
+- a pass that changed project files extends the round, past max_exchanges
+  if need be, up to ROUND_MAX_EXCHANGES passes
+- a pass whose replies all nearly repeat earlier replies of the round ends
+  it; replies are compared through bottom-k MinHash sketches of their word
+  shingles, so each reply is hashed once
+- when the agents can act on files, passes without file changes end the
+  round, after ROUND_STALL_PASSES passes that only read files
+- the round never ends before ROUND_MIN_EXCHANGES passes; after that an
+  agreeing reply ("agreed", "next step", ...) still ends it
+
+    ROUND_MIN_EXCHANGES=1    passes every round runs
+    ROUND_MAX_EXCHANGES=5    hard limit while files keep changing
+    ROUND_STALL_PASSES=1     read-only passes allowed before stopping
+    ROUND_SIMILARITY=0.6     sketch similarity counted as a repeat
+"""
+
+import hashlib
+import re
+from environment import getenv_float, getenv_int
+from metrics import counter
+
+SKETCH_SIZE = 64
+SHINGLE_WORDS = 3
+WORD = re.compile(r"\w+")
+
+ROUND_ENDINGS = counter(
+    "conversation_round_endings_total",
+    "Why conversation rounds ended",
+    ["reason"],
+)
+
+
+def sketch(text, size=SKETCH_SIZE):
+    """Bottom-k MinHash sketch of the word shingles of text"""
+    words = WORD.findall(text.lower())
+    shingles = {
+        " ".join(words[i : i + SHINGLE_WORDS])
+        for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+    }
+    hashes = sorted(
+        int.from_bytes(
+            hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for s in shingles
+    )
+    return frozenset(hashes[:size])
+
+
+def similarity(a, b, size=SKETCH_SIZE):
+    """Estimated Jaccard similarity of the texts behind two sketches"""
+    union = sorted(a | b)[:size]
+    if not union:
+        return 1.0
+    return sum(1 for h in union if h in a and h in b) / len(union)
+
+
+class RoundController:
+    def __init__(self, base_exchanges, can_act):
+        self.base = base_exchanges
+        self.minimum = getenv_int("ROUND_MIN_EXCHANGES", 1)
+        self.maximum = max(
+            getenv_int("ROUND_MAX_EXCHANGES", 5), base_exchanges
+        )
+        self.stall_passes = getenv_int("ROUND_STALL_PASSES", 1)
+        self.threshold = getenv_float("ROUND_SIMILARITY", 0.6)
+        # Whether any agent of the round can read, write or generate files
+        self.can_act = can_act
+        self.passes = 0
+        self.stalls = 0
+        self._sketches = []
+        self._start_pass()
+
+    def _start_pass(self):
+        self.changed = False
+        self.acted = False
+        self.repeats = 0
+        self.replies = 0
+
+    def record(self, response, changed=False, acted=False):
+        """Note one reply and whether it changed files or ran actions"""
+        reply = sketch(response)
+        if any(similarity(reply, s) >= self.threshold for s in self._sketches):
+            self.repeats += 1
+        self._sketches.append(reply)
+        self.replies += 1
+        self.changed |= changed
+        self.acted |= acted
+
+    def end_pass(self, agreed=False):
+        """Why the round should end after this pass, or None to go on"""
+        self.passes += 1
+        reason = self._decide(agreed)
+        self._start_pass()
+        if reason:
+            ROUND_ENDINGS.labels(reason).inc()
+        return reason
+
+    def _decide(self, agreed):
+        if self.passes >= self.maximum:
+            return "limit"
+        if self.passes < self.minimum:
+            self.stalls = 0 if self.changed else self.stalls + 1
+            return None
+        if agreed:
+            return "agreed"
+        if self.changed:
+            self.stalls = 0
+            # Keep going while work is landing, even past the base budget
+            return None
+        self.stalls += 1
+        if self.replies and self.repeats == self.replies:
+            return "repetition"
+        if self.passes >= self.base:
+            return "budget"
+        if self.can_act:
+            if self.acted and self.stalls <= self.stall_passes:
+                # Files were read; the writes usually follow
+                return None
+            return "stalled"
+        return None
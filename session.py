@@ -0,0 +1,69 @@
+import threading
+import time
+from development_simulation import DevelopmentSimulation
+
+# Workflows a session can run, by DevelopmentSimulation method name
+WORKFLOWS = [
+    "project_creation",
+    "add_new_page",
+    "improve_existing_page",
+    "add_images_to_website",
+    "add_custom_feature",
+]
+
+
+class ProjectSession:
+    """
+    Keeps one project's DevelopmentSimulation alive between actions, so the
+    agents, FileManager, file index, HTTP connection pools and image backend
+    state are only built once.
+    """
+
+    def __init__(self, project_name):
+        start = time.perf_counter()
+        self.project_name = project_name
+        self.simulation = DevelopmentSimulation(project_name)
+        self.created_at = time.time()
+        self.startup_seconds = time.perf_counter() - start
+        self.actions_run = 0
+        self.last_used = self.created_at
+        self.lock = threading.Lock()
+
+    def run(self, workflow, request):
+        """Run one workflow such as "add_new_page" with the given request"""
+        if workflow not in WORKFLOWS:
+            raise ValueError(f"Unknown workflow: {workflow}")
+        with self.lock:
+            getattr(self.simulation, workflow)(request)
+            self.actions_run += 1
+            self.last_used = time.time()
+
+    def status(self):
+        return {
+            "project": self.project_name,
+            "actions_run": self.actions_run,
+            "startup_seconds": round(self.startup_seconds, 3),
+            "idle_seconds": round(time.time() - self.last_used, 1),
+            "files_indexed": len(
+                self.simulation.conversation_manager.file_index
+            ),
+        }
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(project_name):
+    """Return the live session for a project, creating it on first use"""
+    with _sessions_lock:
+        session = _sessions.get(project_name)
+        if session is None:
+            session = ProjectSession(project_name)
+            _sessions[project_name] = session
+        return session
+
+
+def all_sessions():
+    with _sessions_lock:
+        return list(_sessions.values())
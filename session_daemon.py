@@ -0,0 +1,239 @@
+"""
+Background daemon keeping project sessions alive across CLI invocations.
+
+Usage:
+    python session_daemon.py serve [--port 0]
+    python session_daemon.py status
+    python session_daemon.py stop
+
+While the daemon runs, main.py sends project actions to it instead of
+building a new DevelopmentSimulation, and streams the daemon's output back.
+"""
+
+import argparse
+import io
+import json
+import os
+import secrets
+import stat
+import threading
+import time
+from contextlib import redirect_stdout
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from session import all_sessions, get_session
+
+STATE_FILE = Path("website_project") / ".session_daemon.json"
+
+
+class _ConnectionWriter(io.TextIOBase):
+    """Text stream forwarding everything written to a client connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, text):
+        if text:
+            self.conn.send(("output", text))
+        return len(text)
+
+
+class SessionDaemon:
+    def __init__(self, port=0):
+        self.authkey = secrets.token_bytes(32)
+        self.listener = Listener(("127.0.0.1", port), authkey=self.authkey)
+        # Output is redirected per action, so actions run one at a time
+        self.run_lock = threading.Lock()
+        self.running = True
+
+    def serve_forever(self):
+        host, port = self.listener.address
+        STATE_FILE.parent.mkdir(exist_ok=True)
+        _write_state(
+            {
+                "pid": os.getpid(),
+                "port": port,
+                "authkey": self.authkey.hex(),
+                "cwd": os.getcwd(),
+            }
+        )
+        print(f"🟢 Session daemon listening on {host}:{port}")
+
+        try:
+            while self.running:
+                try:
+                    conn = self.listener.accept()
+                except OSError:
+                    break
+                if not self.running:
+                    conn.close()
+                    break
+                threading.Thread(
+                    target=self._handle, args=(conn,), daemon=True
+                ).start()
+        finally:
+            self.listener.close()
+            if STATE_FILE.exists():
+                STATE_FILE.unlink()
+            print("🔴 Session daemon stopped")
+
+    def _handle(self, conn):
+        try:
+            message = conn.recv()
+            command = message.get("command")
+
+            if command == "ping":
+                conn.send(("result", {"ok": True, "pid": os.getpid()}))
+            elif command == "status":
+                sessions = [session.status() for session in all_sessions()]
+                conn.send(("result", {"ok": True, "sessions": sessions}))
+            elif command == "run":
+                conn.send(("result", self._run(conn, message)))
+            elif command == "shutdown":
+                conn.send(("result", {"ok": True}))
+                self.running = False
+                # Wake up the accept loop so it can notice the shutdown
+                Client(self.listener.address, authkey=self.authkey).close()
+            else:
+                conn.send(("result", {"ok": False, "error": "bad command"}))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _run(self, conn, message):
+        start = time.perf_counter()
+        with self.run_lock:
+            try:
+                with redirect_stdout(_ConnectionWriter(conn)):
+                    get_session(message["project"]).run(
+                        message["workflow"], message["request"]
+                    )
+                error = None
+            except (EOFError, OSError):
+                raise
+            except Exception as e:
+                error = str(e)
+        return {
+            "ok": error is None,
+            "error": error,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+
+def _write_state(state):
+    """
+    Atomically write the state file, readable by the owner only: whoever
+    holds the authkey can make the daemon unpickle arbitrary objects
+    """
+    temp_path = f"{STATE_FILE}.tmp"
+    if os.path.lexists(temp_path):
+        os.unlink(temp_path)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, STATE_FILE)
+
+
+def _state_is_private(info):
+    if os.name != "posix":
+        return True
+    return info.st_uid == os.getuid() and not info.st_mode & (
+        stat.S_IRWXG | stat.S_IRWXO
+    )
+
+
+def connect():
+    """Connect to a running daemon for this directory, or return None"""
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            if not _state_is_private(os.fstat(f.fileno())):
+                print(
+                    f"⚠️ Ignoring session daemon: {STATE_FILE} is readable "
+                    "by other users"
+                )
+                return None
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("cwd") != os.getcwd():
+        return None
+    try:
+        return Client(
+            ("127.0.0.1", state["port"]),
+            authkey=bytes.fromhex(state["authkey"]),
+        )
+    except Exception:
+        return None
+
+
+def send_command(message):
+    """
+    Send one command to the daemon, printing streamed output. Returns the
+    result dict, or None when no daemon is running.
+    """
+    conn = connect()
+    if conn is None:
+        return None
+    try:
+        conn.send(message)
+        while True:
+            kind, payload = conn.recv()
+            if kind == "output":
+                print(payload, end="")
+            else:
+                return payload
+    except (EOFError, OSError) as e:
+        print(f"❌ Lost connection to session daemon: {e}")
+        return {"ok": False, "error": str(e)}
+    finally:
+        conn.close()
+
+
+def run_remote(project_name, workflow, request):
+    """Run a workflow in the daemon; returns None if no daemon is running"""
+    return send_command(
+        {
+            "command": "run",
+            "project": project_name,
+            "workflow": workflow,
+            "request": request,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project session daemon")
+    parser.add_argument("command", choices=["serve", "status", "stop"])
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        import cassette
+        import metrics
+        import profiler
+        import tracing
+
+        cassette.install_from_env()
+        metrics.install_from_env()
+        profiler.install_from_env()
+        tracing.install_from_env()
+        SessionDaemon(args.port).serve_forever()
+        return
+
+    result = send_command(
+        {"command": "status" if args.command == "status" else "shutdown"}
+    )
+    if result is None:
+        print("❌ No session daemon running.")
+    elif args.command == "status":
+        if not result["sessions"]:
+            print("No active sessions.")
+        for status in result["sessions"]:
+            print(json.dumps(status))
+    else:
+        print("👋 Session daemon stopping.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,634 @@
+"""
+Build stage turning a generated project into deployable files in dist/.
+
+The LLM writes readable HTML, CSS and JavaScript; browsers are better served
+by something else. After every workflow SiteBuilder writes
+website_project/<name>/dist/ with:
+
+- minified HTML (inline <style> and <script> included), CSS and JavaScript
+- per page, each run of adjacent local stylesheets or scripts bundled into
+  one file named after its content hash (css/style.1a2b3c4d.css), so it can
+  be cached forever; runs of stylesheets smaller than the inline budget are
+  inlined into the page as critical CSS instead
+- gzip (.gz) and, if the brotli package is installed, brotli (.br) siblings
+  of every text file, for servers that send precompressed files
+- every other file copied unchanged, and every source file also available
+  under its original name so references the build doesn't rewrite keep
+  working
+
+dist/.build.json records what every output was built from, so rebuilds only
+rewrite and recompress outputs whose content changed and delete outputs
+that are gone. Options come from the environment:
+
+    SITE_BUILD=0             skip the build stage
+    SITE_BUNDLE=0            fingerprint assets one by one instead of bundling
+    SITE_INLINE_CSS_KB=4     inline stylesheets up to this size (0 disables)
+
+Run it on its own with:
+
+    python site_build.py website_project/<name>
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+from environment import getenv, getenv_float
+from metrics import counter
+from reference_index import CSS_URL, resolve
+from static_checks import REGEX_KEYWORDS, REGEX_PRECEDERS, WORD_PATTERN
+from tracing import traced
+
+BUILD_DIR = "dist"
+MANIFEST_NAME = ".build.json"
+FORMAT_VERSION = 1
+TEXT_EXTENSIONS = (".html", ".htm", ".css", ".js", ".json", ".svg", ".txt")
+# Files smaller than this are not worth a compressed sibling
+MIN_COMPRESS_BYTES = 256
+HASH_LENGTH = 8
+
+CSS_TOKEN = re.compile(
+    r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.DOTALL
+)
+CSS_SPACE = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+HTML_RAW = re.compile(
+    r"<(pre|textarea|script|style)\b([^>]*)>(.*?)</\1\s*>"
+    r"|<!--(?!\[if)(?:.*?)-->",
+    re.IGNORECASE | re.DOTALL,
+)
+# Runs of adjacent stylesheet links or classic scripts, the unit of bundling
+ASSET_RUN = re.compile(
+    r"(?:<link\b[^>]*>\s*)+"
+    r"|(?:<script\b[^>]*\bsrc\b[^>]*>\s*</script\s*>\s*)+",
+    re.IGNORECASE,
+)
+TAG = re.compile(r"<(link|script)\b[^>]*>(?:\s*</script\s*>)?", re.I)
+ATTRIBUTE = re.compile(r"""([\w:-]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'>]+))?""")
+
+BUILD_FILES = counter(
+    "site_build_files_total",
+    "Build outputs by result",
+    ["result"],
+)
+BUILD_BYTES = counter(
+    "site_build_bytes_total", "Bytes written to build outputs"
+)
+
+
+def minify_css(text):
+    """Drop comments and insignificant whitespace, leaving strings alone"""
+    parts = []
+    position = 0
+    for match in CSS_TOKEN.finditer(text):
+        parts.append(_squeeze_css(text[position : match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        position = match.end()
+    parts.append(_squeeze_css(text[position:]))
+    return "".join(parts).strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r"\s+", " ", text)
+    text = CSS_SPACE.sub(lambda m: m.group(1) or m.group(2), text)
+    return text.replace(";}", "}")
+
+
+def minify_js(text):
+    """
+    Drop comments and collapse whitespace. Line breaks are kept (as one) so
+    automatic semicolon insertion still sees them; strings, template and
+    regex literals are copied as they are.
+    """
+    out = []
+    i = 0
+    length = len(text)
+    previous = ""
+    pending = ""
+
+    def emit(token):
+        if pending and out:
+            last = out[-1][-1]
+            if pending == "\n":
+                out.append("\n")
+            elif (_is_word(last) and _is_word(token[0])) or (
+                last in "+-" and token[0] == last
+            ):
+                out.append(" ")
+        out.append(token)
+
+    while i < length:
+        char = text[i]
+        if char.isspace():
+            end = i
+            while end < length and text[end].isspace():
+                end += 1
+            if "\n" in text[i:end]:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = end
+            continue
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = length if end < 0 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                break
+            if "\n" in text[i:end]:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = end + 2
+            continue
+
+        if char in "'\"`":
+            end = _string_end(text, i)
+            previous = "a"
+        elif char == "/" and previous in REGEX_PRECEDERS | {""}:
+            end = _regex_end(text, i)
+            previous = "a"
+        elif _is_word(char):
+            word = WORD_PATTERN.match(text, i)
+            end = word.end() if word else i + 1
+            previous = "" if text[i:end] in REGEX_KEYWORDS else "a"
+        else:
+            end = i + 1
+            previous = char
+        emit(text[i:end])
+        pending = ""
+        i = end
+
+    return "".join(out).strip()
+
+
+def _is_word(char):
+    return char.isalnum() or char in "_$"
+
+
+def _string_end(text, start):
+    quote = text[start]
+    i = start + 1
+    depth = 0
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if quote == "`" and text.startswith("${", i):
+            depth += 1
+            i += 2
+            continue
+        if depth and char == "}":
+            depth -= 1
+        elif not depth and char == quote:
+            return i + 1
+        elif char == "\n" and quote != "`":
+            return i
+        i += 1
+    return len(text)
+
+
+def _regex_end(text, start):
+    i = start + 1
+    in_class = False
+    while i < len(text) and text[i] != "\n":
+        char = text[i]
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            return i + 1
+        i += 1
+    return i
+
+
+def minify_html(text):
+    """
+    Drop comments (except conditional ones) and collapse whitespace runs to
+    a single space. <pre> and <textarea> are kept as they are, inline styles
+    and scripts are minified.
+    """
+    parts = []
+    position = 0
+    for match in HTML_RAW.finditer(text):
+        parts.append(re.sub(r"\s+", " ", text[position : match.start()]))
+        tag, attributes, body = match.group(1, 2, 3)
+        if tag is None:
+            pass
+        elif tag.lower() == "style":
+            parts.append(f"<{tag}{attributes}>{minify_css(body)}</{tag}>")
+        elif tag.lower() == "script" and _is_javascript(attributes):
+            parts.append(f"<{tag}{attributes}>{minify_js(body)}</{tag}>")
+        else:
+            parts.append(match.group(0))
+        position = match.end()
+    parts.append(re.sub(r"\s+", " ", text[position:]))
+    return "".join(parts).strip() + "\n"
+
+
+def _is_javascript(attributes):
+    script_type = _attributes(f"<script{attributes}>").get("type", "")
+    return script_type.lower() in (
+        "",
+        "module",
+        "text/javascript",
+        "application/javascript",
+    )
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def _attributes(tag):
+    body = re.sub(r"^<\w+|/?>$", "", tag.strip())
+    return {
+        name.lower(): (value or "").strip("\"'")
+        for name, value in ATTRIBUTE.findall(body)
+    }
+
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint(path, data):
+    """css/style.css -> css/style.<hash>.css"""
+    stem, extension = posixpath.splitext(path)
+    return f"{stem}.{_hash(data)[:HASH_LENGTH]}{extension}"
+
+
+def rebase_css(css, source, target):
+    """Rewrite relative url()s of css moved from source to target"""
+    target_dir = posixpath.dirname(target) or "."
+
+    def rebase(match):
+        reference = match.group(1).strip()
+        resolved = resolve(source, reference)
+        if not resolved or reference.startswith(("/", "#")):
+            return match.group(0)
+        path = posixpath.relpath(resolved[0], target_dir)
+        if resolved[1]:
+            path += f"#{resolved[1]}"
+        start = match.start(1) - match.start(0)
+        end = match.end(1) - match.start(0)
+        return match.group(0)[:start] + path + match.group(0)[end:]
+
+    return CSS_URL.sub(rebase, css)
+
+
+def _compressors():
+    compressors = [(".gz", lambda data: gzip.compress(data, 9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        return compressors
+    compressors.append((".br", brotli.compress))
+    return compressors
+
+
+class SiteBuilder:
+    def __init__(self, project_dir, bundle=None, inline_css_kb=None):
+        self.project_dir = str(project_dir)
+        self.build_dir = os.path.join(self.project_dir, BUILD_DIR)
+        self.manifest_path = os.path.join(self.build_dir, MANIFEST_NAME)
+        self.bundle = (
+            getenv("SITE_BUNDLE", "1") != "0" if bundle is None else bundle
+        )
+        if inline_css_kb is None:
+            inline_css_kb = getenv_float("SITE_INLINE_CSS_KB", 4.0)
+        self.inline_css_bytes = inline_css_kb * 1024
+        self.compressors = _compressors()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("version") != FORMAT_VERSION:
+            manifest = {"version": FORMAT_VERSION}
+        manifest.setdefault("sources", {})
+        manifest.setdefault("outputs", {})
+        manifest.setdefault("pages", {})
+        return manifest
+
+    def _save_manifest(self):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def _scan(self):
+        """Content hash of every source file, re-read only if it changed"""
+        previous = self.manifest["sources"]
+        sources = {}
+        for root, dirs, files in os.walk(self.project_dir):
+            if os.path.abspath(root) == os.path.abspath(self.project_dir):
+                dirs[:] = [d for d in dirs if d != BUILD_DIR]
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for file in files:
+                if file.startswith("."):
+                    continue
+                path = os.path.join(root, file)
+                name = os.path.relpath(path, self.project_dir)
+                name = name.replace(os.sep, "/")
+                stat = os.stat(path)
+                signature = [stat.st_mtime_ns, stat.st_size]
+                entry = previous.get(name)
+                if not entry or entry["signature"] != signature:
+                    with open(path, "rb") as f:
+                        entry = {
+                            "signature": signature,
+                            "hash": _hash(f.read()),
+                        }
+                sources[name] = entry
+        return sources
+
+    def _read(self, name):
+        with open(os.path.join(self.project_dir, name), "rb") as f:
+            return f.read()
+
+    @traced("site build", "build")
+    def build(self):
+        """
+        Bring dist/ up to date with the project. Returns a summary dict with
+        the written, unchanged and removed outputs and the byte totals of
+        the sources and their builds.
+        """
+        if not os.path.isdir(self.project_dir):
+            return None
+        os.makedirs(self.build_dir, exist_ok=True)
+        sources = self._scan()
+        self.outputs = {}
+        self.result = {
+            "written": [],
+            "unchanged": 0,
+            "removed": [],
+        }
+
+        for name, entry in sorted(sources.items()):
+            extension = posixpath.splitext(name)[1].lower()
+            if extension in (".html", ".htm"):
+                self._build_page(name, sources)
+                continue
+            previous = self.manifest["sources"].get(name)
+            if previous and previous["hash"] == entry["hash"]:
+                if self._keep(name):
+                    continue
+            data = self._read(name)
+            if extension in MINIFIERS:
+                data = self._minified(name, data)
+            self._emit(name, data)
+
+        for name in sorted(set(self.manifest["outputs"]) - set(self.outputs)):
+            self._remove(name)
+
+        self.manifest["sources"] = sources
+        self.manifest["outputs"] = self.outputs
+        self.manifest["pages"] = {
+            page: entry
+            for page, entry in self.manifest["pages"].items()
+            if page in sources
+        }
+        self._save_manifest()
+
+        self.result["source_bytes"] = sum(
+            e["signature"][1] for e in sources.values()
+        )
+        self.result["build_bytes"] = sum(
+            os.path.getsize(os.path.join(self.build_dir, name))
+            for name in self.outputs
+        )
+        BUILD_FILES.labels("written").inc(len(self.result["written"]))
+        BUILD_FILES.labels("unchanged").inc(self.result["unchanged"])
+        BUILD_FILES.labels("removed").inc(len(self.result["removed"]))
+        return self.result
+
+    def _minified(self, name, data):
+        extension = posixpath.splitext(name)[1].lower()
+        text = data.decode("utf-8", "replace")
+        return MINIFIERS[extension](text).encode("utf-8")
+
+    def _keep(self, name):
+        """Reuse an output of the last build if it is still on disk"""
+        digest = self.manifest["outputs"].get(name)
+        if digest is None or not os.path.isfile(
+            os.path.join(self.build_dir, name)
+        ):
+            return False
+        if name not in self.outputs:
+            self.outputs[name] = digest
+            self.result["unchanged"] += 1
+        return True
+
+    def _emit(self, name, data):
+        """Write an output and its compressed siblings unless it's current"""
+        digest = _hash(data)
+        if name in self.outputs:
+            return
+        if self.manifest["outputs"].get(name) == digest and self._keep(name):
+            return
+        path = os.path.join(self.build_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        written = len(data)
+        for suffix, compress in self.compressors:
+            if (
+                name.lower().endswith(TEXT_EXTENSIONS)
+                and len(data) >= MIN_COMPRESS_BYTES
+            ):
+                compressed = compress(data)
+                if len(compressed) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written += len(compressed)
+                    continue
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        self.outputs[name] = digest
+        self.result["written"].append(name)
+        BUILD_BYTES.inc(written)
+
+    def _remove(self, name):
+        path = os.path.join(self.build_dir, name)
+        for suffix in [""] + [s for s, _ in self.compressors]:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        self.result["removed"].append(name)
+
+    def _build_page(self, page, sources):
+        html = self._read(page).decode("utf-8", "replace")
+        runs = []
+        dependencies = []
+        for match in ASSET_RUN.finditer(html):
+            assets = self._run_assets(page, match.group(0), sources)
+            local = [name for _, name, _ in assets if name]
+            if local:
+                runs.append((match, assets))
+                dependencies += local
+
+        # The page only needs rebuilding if it or an asset it pulls in
+        # changed since the last build
+        key = _hash(
+            json.dumps(
+                [
+                    sources[page]["hash"],
+                    [sources[name]["hash"] for name in dependencies],
+                    self.bundle,
+                    self.inline_css_bytes,
+                ]
+            ).encode("utf-8")
+        )
+        previous = self.manifest["pages"].get(page)
+        if previous and previous["key"] == key:
+            if all(self._keep(name) for name in previous["outputs"]):
+                return
+
+        outputs = []
+        parts = []
+        position = 0
+        for match, assets in runs:
+            parts.append(html[position : match.start()])
+            replacement, written = self._build_run(page, assets)
+            parts.append(replacement)
+            outputs += written
+            position = match.end()
+        parts.append(html[position:])
+        self._emit(page, minify_html("".join(parts)).encode("utf-8"))
+        self.manifest["pages"][page] = {
+            "key": key,
+            "outputs": [page] + outputs,
+        }
+
+    def _run_assets(self, page, run, sources):
+        """
+        (tag, project path, kind) of every tag in a run of tags; path and
+        kind are None for tags the build leaves alone, such as icons,
+        external URLs and module scripts.
+        """
+        assets = []
+        for tag in TAG.finditer(run):
+            attributes = _attributes(tag.group(0).split(">")[0] + ">")
+            reference, kind = None, None
+            if tag.group(1).lower() == "link":
+                if "stylesheet" in attributes.get("rel", "").split():
+                    reference, kind = attributes.get("href", ""), "css"
+            elif attributes.get("type", "") in ("", "text/javascript"):
+                reference, kind = attributes.get("src", ""), "js"
+            resolved = resolve(page, reference) if reference else None
+            if resolved and resolved[0] in sources:
+                assets.append((tag.group(0), resolved[0], kind))
+            else:
+                assets.append((tag.group(0), None, None))
+        return assets
+
+    def _build_run(self, page, assets):
+        """Markup replacing a run of tags and the outputs it refers to"""
+        groups = []
+        for asset in assets:
+            if (
+                self.bundle
+                and groups
+                and asset[1]
+                and groups[-1][0][1]
+                and self._bundles_with(groups[-1][0], asset)
+            ):
+                groups[-1].append(asset)
+            else:
+                groups.append([asset])
+
+        markup = []
+        outputs = []
+        for group in groups:
+            tag, first, kind = group[0]
+            if first is None:
+                markup.append(tag)
+                continue
+            if kind == "css":
+                css = "".join(
+                    rebase_css(
+                        self._minified(name, self._read(name)).decode(),
+                        name,
+                        first,
+                    )
+                    for _, name, _ in group
+                )
+                if len(css) <= self.inline_css_bytes:
+                    css = rebase_css(css, first, page)
+                    markup.append(f"<style>{css}</style>")
+                    continue
+                data = css.encode("utf-8")
+            else:
+                data = b"\n;".join(
+                    self._minified(name, self._read(name))
+                    for _, name, _ in group
+                )
+            output = fingerprint(first, data)
+            self._emit(output, data)
+            outputs.append(output)
+            reference = posixpath.relpath(
+                output, posixpath.dirname(page) or "."
+            )
+            attribute = "href" if kind == "css" else "src"
+            markup.append(
+                re.sub(
+                    rf"""(\b{attribute}\s*=\s*)("[^"]*"|'[^']*'|[^\s>]+)""",
+                    lambda m: f'{m.group(1)}"{reference}"',
+                    tag,
+                    count=1,
+                    flags=re.IGNORECASE,
+                )
+            )
+        return "".join(markup), outputs
+
+    def _bundles_with(self, first, asset):
+        """Whether asset can share a bundle with the group starting at first"""
+        if first[2] != asset[2]:
+            return False
+        keep = ("media", "defer", "async", "type", "nomodule")
+        first_attributes = _attributes(first[0].split(">")[0] + ">")
+        attributes = _attributes(asset[0].split(">")[0] + ">")
+        return all(
+            first_attributes.get(name) == attributes.get(name) for name in keep
+        )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a generated website")
+    parser.add_argument("project_dir")
+    parser.add_argument(
+        "--clean", action="store_true", help="rebuild dist/ from scratch"
+    )
+    args = parser.parse_args()
+
+    if args.clean:
+        shutil.rmtree(os.path.join(args.project_dir, BUILD_DIR), True)
+    result = SiteBuilder(args.project_dir).build()
+    if result is None:
+        raise SystemExit(f"{args.project_dir} does not exist")
+    print(
+        f"{len(result['written'])} written, {result['unchanged']} unchanged, "
+        f"{len(result['removed'])} removed; {result['source_bytes']} -> "
+        f"{result['build_bytes']} bytes"
+    )
+    for name in result["written"]:
+        print(f"  ✅ {name}")
+    for name in result["removed"]:
+        print(f"  🗑️ {name}")
+
+
+if __name__ == "__main__":
+    main()
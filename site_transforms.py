@@ -0,0 +1,392 @@
+"""
+Local HTML transforms for mechanical site-wide edits.
+
+Keeping the nav menu of every page in sync and wiring generated images into
+pages don't need an LLM that re-emits whole HTML files. SiteTransformer
+does both from the project's own structure (the reference index):
+
+- sync_navigation makes the nav of every page list the site menu: the
+  pages some menu already links to, plus pages created during the current
+  workflow. Error pages (404, 500, ...) are never added. Entries copy the
+  markup of the existing menu entries; pages without a nav get a copy of
+  the menu.
+- attach_images points image slots (<img data-slot> tags and <img> tags
+  whose local src doesn't exist) at generated images nothing uses yet,
+  matched by name, and adds the remaining images to the page whose name
+  fits best. External and data: sources are left alone.
+
+All writes go through FileManager.modify_file, so responsive image markup,
+the reference index and metrics are updated as for any other write.
+"""
+
+import html
+import os
+import posixpath
+import re
+from reference_index import resolve
+from site_build import BUILD_DIR
+
+NAV_PATTERN = re.compile(
+    r"<nav\b[^>]*>.*?</nav\s*>", re.IGNORECASE | re.DOTALL
+)
+NAV_ITEM_PATTERN = re.compile(
+    r"<li\b[^>]*>.*?</li\s*>|<a\b[^>]*>.*?</a\s*>", re.IGNORECASE | re.DOTALL
+)
+ANCHOR_PATTERN = re.compile(
+    r"(<a\b[^>]*>)(.*?)(</a\s*>)", re.IGNORECASE | re.DOTALL
+)
+HREF_PATTERN = re.compile(
+    r"""(\bhref\s*=\s*)("[^"]*"|'[^']*'|[^\s>]+)""", re.I
+)
+ARIA_CURRENT_PATTERN = re.compile(
+    r"""\s+aria-current\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)""", re.IGNORECASE
+)
+CLASS_PATTERN = re.compile(r"""\s+class\s*=\s*(["'])(.*?)\1""", re.IGNORECASE)
+IMG_PATTERN = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(
+    r"""([\w:-]+)\s*=\s*("[^"]*"|'[^']*'|[^\s"'>]+)"""
+)
+TITLE_PATTERN = re.compile(
+    r"<(title|h1)\b[^>]*>(.*?)</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+BODY_PATTERN = re.compile(r"<body\b[^>]*>", re.IGNORECASE)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+# Responsive variants written by the image variant pipeline
+VARIANT_PATTERN = re.compile(r"-\d+w\.\w+$")
+ERROR_PAGE_PATTERN = re.compile(
+    r"(^|/)([45]\d\d|error|not-?found)\.html?$", re.IGNORECASE
+)
+
+
+def _words(text):
+    return set(re.findall(r"[a-z]{3,}", text.lower()))
+
+
+def _attributes(tag):
+    return {
+        name.lower(): value.strip("\"'")
+        for name, value in ATTRIBUTE_PATTERN.findall(tag)
+    }
+
+
+def _strip_active(markup):
+    """Drop the current-page marker copied from another menu entry"""
+
+    def clean(match):
+        classes = [
+            c
+            for c in match.group(2).split()
+            if c.lower() not in ("active", "current")
+        ]
+        return f' class="{" ".join(classes)}"' if classes else ""
+
+    return CLASS_PATTERN.sub(clean, ARIA_CURRENT_PATTERN.sub("", markup))
+
+
+def _nav_targets(page, page_html):
+    """Pages the nav of page_html links to"""
+    nav = NAV_PATTERN.search(page_html)
+    targets = set()
+    for match in HREF_PATTERN.finditer(nav.group(0) if nav else ""):
+        resolved = resolve(page, match.group(2).strip("\"'"))
+        if resolved:
+            targets.add(resolved[0])
+    return targets
+
+
+def _relative(target, page):
+    return posixpath.relpath(target, posixpath.dirname(page) or ".")
+
+
+def page_label(filename, content):
+    """Menu label for a page: its title (minus the site name) or h1"""
+    for _, text in TITLE_PATTERN.findall(content or ""):
+        text = html.unescape(re.sub(r"<[^>]+>", "", text)).strip()
+        text = re.split(r"\s+[-|–—]\s+", text)[0].strip()
+        if text:
+            return text
+    stem = posixpath.splitext(posixpath.basename(filename))[0]
+    return stem.replace("-", " ").replace("_", " ").title()
+
+
+def add_nav_entry(page_html, href, label):
+    """
+    Add a link to the page's nav, copying its last entry so classes and
+    indentation match. Returns the page unchanged if it has no nav.
+    """
+    nav = NAV_PATTERN.search(page_html)
+    if not nav:
+        return page_html
+    items = list(NAV_ITEM_PATTERN.finditer(nav.group(0)))
+    if items:
+        last = items[-1]
+        template = _strip_active(last.group(0))
+        entry = HREF_PATTERN.sub(
+            lambda m: f'{m.group(1)}"{href}"', template, count=1
+        )
+        entry = ANCHOR_PATTERN.sub(
+            lambda m: m.group(1) + html.escape(label) + m.group(3),
+            entry,
+            count=1,
+        )
+        line_start = nav.group(0).rfind("\n", 0, last.start()) + 1
+        indent = re.match(r"[ \t]*", nav.group(0)[line_start:]).group(0)
+        separator = f"\n{indent}" if line_start and indent else ""
+        position = nav.start() + last.end()
+    else:
+        entry = f'<a href="{href}">{html.escape(label)}</a>'
+        separator = ""
+        position = nav.end() - len("</nav>")
+    return page_html[:position] + separator + entry + page_html[position:]
+
+
+def set_image_src(page_html, tag, src, alt=None):
+    """Point one <img> tag at src, filling in alt text if it has none"""
+    attributes = _attributes(tag)
+    new_tag = re.sub(
+        r"""(\bsrc\s*=\s*)("[^"]*"|'[^']*'|[^\s>]+)""",
+        lambda m: f'{m.group(1)}"{src}"',
+        tag,
+        count=1,
+        flags=re.IGNORECASE,
+    )
+    if "src" not in attributes:
+        new_tag = re.sub(r"^<img\b", f'<img src="{src}"', new_tag, flags=re.I)
+    if alt and not attributes.get("alt"):
+        new_tag = re.sub(r"\s*/?>$", "", new_tag)
+        new_tag = re.sub(r'\salt=(["\'])\s*\1', "", new_tag)
+        closing = " />" if tag.rstrip().endswith("/>") else ">"
+        new_tag += f' alt="{html.escape(alt)}"{closing}'
+    return page_html.replace(tag, new_tag, 1)
+
+
+def insert_figure(page_html, src, alt):
+    """Add an image at the end of the page's <main>, or of its <body>"""
+    for closing in ("</main>", "</body>"):
+        position = page_html.lower().rfind(closing)
+        if position < 0:
+            continue
+        line_start = page_html.rfind("\n", 0, position) + 1
+        indent = re.match(r"[ \t]*", page_html[line_start:]).group(0)
+        figure = (
+            f'{indent}    <figure class="generated-image">\n'
+            f'{indent}        <img src="{src}" alt="{html.escape(alt)}">\n'
+            f"{indent}    </figure>\n"
+        )
+        if page_html[line_start:position].strip():
+            figure = "\n" + figure + indent
+            line_start = position
+        return page_html[:line_start] + figure + page_html[line_start:]
+    return page_html + f'\n<img src="{src}" alt="{html.escape(alt)}">\n'
+
+
+class SiteTransformer:
+    def __init__(self, file_manager):
+        self.file_manager = file_manager
+        # Pages that existed when the current workflow started
+        self.known_pages = None
+
+    def start_workflow(self):
+        """Note the existing pages, so pages added from now on are new"""
+        self.known_pages = set(self._pages_on_disk())
+
+    def _pages_on_disk(self):
+        project_dir = str(self.file_manager.project_dir)
+        found = []
+        for root, dirs, files in os.walk(project_dir):
+            dirs[:] = [
+                d
+                for d in dirs
+                if not d.startswith(".")
+                and not (root == project_dir and d == BUILD_DIR)
+            ]
+            for file in files:
+                if file.lower().endswith((".html", ".htm")):
+                    path = os.path.relpath(
+                        os.path.join(root, file), project_dir
+                    )
+                    found.append(path.replace(os.sep, "/"))
+        return found
+
+    @property
+    def references(self):
+        self.file_manager.references.sync(self.file_manager.project_files)
+        return self.file_manager.references
+
+    def _content(self, page):
+        content = self.file_manager.project_files.get(page)
+        if not isinstance(content, str):
+            content = self.file_manager.read_file(page)
+        return content
+
+    def sync_navigation(self):
+        """
+        Make every page's nav list the site menu. Returns the changed pages,
+        or None if the project has no pages or no nav menu to follow.
+        """
+        references = self.references
+        pages = references.pages()
+        menus = references.nav_menus()
+        if not pages or not any(menus.values()):
+            return None
+
+        # The site menu: the longest existing menu, then pages only other
+        # menus list, then pages created in this workflow
+        template_page = max(pages, key=lambda p: len(menus[p]))
+        site_menu = list(menus[template_page])
+        for targets in menus.values():
+            site_menu.extend(targets)
+        if self.known_pages is not None:
+            site_menu.extend(p for p in pages if p not in self.known_pages)
+        site_menu = [
+            t
+            for t in dict.fromkeys(site_menu)
+            if t in pages and not ERROR_PAGE_PATTERN.search(t)
+        ]
+
+        template_nav = NAV_PATTERN.search(self._content(template_page))
+        labels = {
+            page: page_label(page, self._content(page)) for page in pages
+        }
+
+        changed = []
+        for page in pages:
+            content = self._content(page)
+            updated = content
+            if not NAV_PATTERN.search(updated) and template_nav:
+                nav = template_nav.group(0)
+                body = BODY_PATTERN.search(updated)
+                position = body.end() if body else 0
+                updated = (
+                    updated[:position]
+                    + "\n"
+                    + self._rebase_nav(nav, template_page, page)
+                    + updated[position:]
+                )
+            present = _nav_targets(page, updated)
+            for target in site_menu:
+                if target not in present:
+                    updated = add_nav_entry(
+                        updated, _relative(target, page), labels[target]
+                    )
+            if updated != content:
+                self.file_manager.modify_file(page, updated)
+                changed.append(page)
+        return changed
+
+    def _rebase_nav(self, nav, source_page, page):
+        """Copy a nav to another page, fixing relative links"""
+
+        def rebase(match):
+            href = match.group(2).strip("\"'")
+            if re.match(r"^([a-z]+:|/|#)", href, re.IGNORECASE):
+                return match.group(0)
+            target = posixpath.normpath(
+                posixpath.join(posixpath.dirname(source_page), href)
+            )
+            return f'{match.group(1)}"{_relative(target, page)}"'
+
+        return _strip_active(HREF_PATTERN.sub(rebase, nav))
+
+    def unused_images(self):
+        """Generated source images no page or stylesheet refers to"""
+        file_manager = self.file_manager
+        images = {
+            name
+            for name, content in file_manager.project_files.items()
+            if content == "image_file"
+        }
+        images_dir = file_manager.project_dir / "images"
+        if images_dir.is_dir():
+            for path in images_dir.rglob("*"):
+                if path.is_file():
+                    images.add(
+                        path.relative_to(file_manager.project_dir).as_posix()
+                    )
+        references = self.references
+        return sorted(
+            image
+            for image in images
+            if image.lower().endswith(IMAGE_EXTENSIONS)
+            and not VARIANT_PATTERN.search(image)
+            and not references.referrers(image)
+        )
+
+    def attach_images(self):
+        """
+        Wire unused images into the pages. Returns (page, image) pairs, or
+        None if the project has no pages.
+        """
+        references = self.references
+        pages = references.pages()
+        if not pages:
+            return None
+        images = self.unused_images()
+        attached = []
+        pending = {}
+
+        # Fill slots, best name match first
+        for page in pages:
+            content = pending.get(page) or self._content(page)
+            for tag in IMG_PATTERN.findall(content):
+                if not images:
+                    break
+                attributes = _attributes(tag)
+                src = attributes.get("src", "")
+                if "data-slot" not in attributes and src:
+                    # Only local sources that don't exist are slots
+                    resolved = resolve(page, src)
+                    if resolved is None or self.file_manager.exists(
+                        resolved[0]
+                    ):
+                        continue
+                slot_words = _words(
+                    " ".join(
+                        [
+                            src,
+                            attributes.get("alt", ""),
+                            attributes.get("data-slot", ""),
+                        ]
+                    )
+                )
+                image = max(
+                    images,
+                    key=lambda i: len(
+                        slot_words & _words(posixpath.basename(i))
+                    ),
+                )
+                images.remove(image)
+                content = set_image_src(
+                    content, tag, _relative(image, page), self._alt(image)
+                )
+                pending[page] = content
+                attached.append((page, image))
+
+        # Add the rest to the page whose name or title fits best
+        for image in images:
+            image_words = _words(posixpath.basename(image))
+            page = max(
+                pages,
+                key=lambda p: (
+                    len(
+                        image_words
+                        & _words(p + " " + page_label(p, self._content(p)))
+                    ),
+                    posixpath.basename(p) == "index.html",
+                ),
+            )
+            content = pending.get(page) or self._content(page)
+            pending[page] = insert_figure(
+                content, _relative(image, page), self._alt(image)
+            )
+            attached.append((page, image))
+
+        for page, content in pending.items():
+            self.file_manager.modify_file(page, content)
+        return attached
+
+    def _alt(self, image):
+        stem = os.path.splitext(posixpath.basename(image))[0]
+        # Drop the hash suffix generated filenames carry
+        stem = re.sub(r"[-_][0-9a-f]{4,}$", "", stem)
+        return stem.replace("-", " ").replace("_", " ").strip().capitalize()
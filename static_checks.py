@@ -0,0 +1,338 @@
+"""
+Offline static analysis of generated HTML, CSS and JavaScript.
+
+Catches the mechanical problems QA would otherwise spend LLM turns on:
+unclosed and stray tags, images without alt text, duplicate ids, unbalanced
+CSS braces and JavaScript bracket, string and comment errors, plus the
+cross-file problems the reference index knows about (broken links, missing
+images, unused CSS classes).
+
+FileManager checks every file it writes. Results are cached by content
+hash, so unchanged files are never checked twice, and the QA agent gets the
+findings as a compact list with each prompt.
+"""
+
+import posixpath
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+from project_delta import NON_TEXT, content_hash
+
+MAX_FINDINGS = 25
+CACHE_SIZE = 1024
+
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+# Elements whose end tag HTML lets authors leave out
+OPTIONAL_END = {
+    "html",
+    "head",
+    "body",
+    "p",
+    "li",
+    "dt",
+    "dd",
+    "tr",
+    "td",
+    "th",
+    "thead",
+    "tbody",
+    "tfoot",
+    "option",
+    "optgroup",
+    "colgroup",
+}
+BRACKETS = {")": "(", "]": "[", "}": "{"}
+# A / after these starts a regular expression literal, not a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of"}
+WORD_PATTERN = re.compile(r"[\w$]+")
+
+_cache = OrderedDict()
+
+
+class _HTMLChecker(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.findings = []
+        self.stack = []
+        self.ids = {}
+
+    def handle_starttag(self, tag, attrs):
+        line = self.getpos()[0]
+        attrs = dict(attrs)
+        if tag == "img" and "alt" not in attrs:
+            self.findings.append(
+                (line, f"<img src=\"{attrs.get('src', '')}\"> has no alt text")
+            )
+        if attrs.get("id"):
+            if attrs["id"] in self.ids:
+                self.findings.append(
+                    (
+                        line,
+                        f"duplicate id \"{attrs['id']}\" "
+                        f"(first on line {self.ids[attrs['id']]})",
+                    )
+                )
+            else:
+                self.ids[attrs["id"]] = line
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, line))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self.stack:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        line = self.getpos()[0]
+        if tag in VOID_ELEMENTS:
+            return
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            self.findings.append((line, f"stray </{tag}>"))
+            return
+        while self.stack:
+            open_tag, open_line = self.stack.pop()
+            if open_tag == tag:
+                break
+            if open_tag not in OPTIONAL_END:
+                self.findings.append(
+                    (open_line, f"<{open_tag}> is not closed before </{tag}>")
+                )
+
+    def finish(self):
+        self.close()
+        for tag, line in self.stack:
+            if tag not in OPTIONAL_END:
+                self.findings.append((line, f"<{tag}> is never closed"))
+        return self.findings
+
+
+def check_html(content):
+    checker = _HTMLChecker()
+    try:
+        checker.feed(content)
+        return checker.finish()
+    except Exception as e:
+        return checker.findings + [(checker.getpos()[0], f"unparsable: {e}")]
+
+
+def _check_brackets(content, allow_regex):
+    """
+    Scan source for unbalanced brackets and unterminated strings and
+    comments, skipping their contents. Template literals and regex literals
+    are understood well enough for generated code.
+    """
+    findings = []
+    stack = []
+    line = 1
+    i = 0
+    length = len(content)
+    previous = ""
+
+    while i < length:
+        char = content[i]
+        if char == "\n":
+            line += 1
+        elif content.startswith("/*", i):
+            end = content.find("*/", i + 2)
+            if end < 0:
+                findings.append((line, "unterminated /* comment"))
+                break
+            line += content.count("\n", i, end)
+            i = end + 2
+            continue
+        elif allow_regex and content.startswith("//", i):
+            end = content.find("\n", i)
+            i = length if end < 0 else end
+            continue
+        elif char in "'\"" or (allow_regex and char == "`"):
+            start_line = line
+            i += 1
+            while i < length and content[i] != char:
+                if content[i] == "\\":
+                    i += 1
+                elif content[i] == "\n":
+                    if char != "`":
+                        break
+                    line += 1
+                elif char == "`" and content.startswith("${", i):
+                    # Good enough: expressions inside templates rarely
+                    # contain backticks themselves
+                    depth = 0
+                    while i < length:
+                        if content[i] == "{":
+                            depth += 1
+                        elif content[i] == "}":
+                            depth -= 1
+                            if depth == 0:
+                                break
+                        i += 1
+                i += 1
+            if i < length and content[i] == char:
+                i += 1
+            else:
+                findings.append((start_line, f"unterminated {char} string"))
+                if i >= length:
+                    break
+            previous = "a"
+            continue
+        elif (
+            allow_regex
+            and char == "/"
+            and (previous in REGEX_PRECEDERS or previous == "")
+        ):
+            # Regular expression literal
+            i += 1
+            in_class = False
+            while i < length and content[i] != "\n":
+                if content[i] == "\\":
+                    i += 1
+                elif content[i] == "[":
+                    in_class = True
+                elif content[i] == "]":
+                    in_class = False
+                elif content[i] == "/" and not in_class:
+                    break
+                i += 1
+            previous = "a"
+            i += 1
+            continue
+        elif char in "([{":
+            stack.append((char, line))
+        elif char in ")]}":
+            if not stack or stack[-1][0] != BRACKETS[char]:
+                findings.append((line, f"unexpected '{char}'"))
+                break
+            stack.pop()
+
+        if not char.isspace():
+            if char.isalnum() or char in "_$":
+                # Track words so `return /re/` is seen as a regex
+                word = WORD_PATTERN.match(content, i).group(0)
+                previous = "" if word in REGEX_KEYWORDS else "a"
+                i += len(word)
+                continue
+            previous = char
+        i += 1
+
+    for char, open_line in stack[-3:]:
+        findings.append((open_line, f"'{char}' is never closed"))
+    return findings
+
+
+def check_css(content):
+    return _check_brackets(content, allow_regex=False)
+
+
+def check_js(content):
+    return _check_brackets(content, allow_regex=True)
+
+
+CHECKERS = {
+    ".html": check_html,
+    ".htm": check_html,
+    ".css": check_css,
+    ".js": check_js,
+}
+
+
+def check_file(filename, content):
+    """Findings (line, message) for one file, cached by content hash"""
+    extension = posixpath.splitext(filename)[1].lower()
+    checker = CHECKERS.get(extension)
+    if checker is None:
+        return []
+    key = f"{extension}:{content_hash(content)}"
+    findings = _cache.get(key)
+    if findings is None:
+        findings = checker(content)
+        _cache[key] = findings
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return findings
+
+
+class StaticAnalyzer:
+    """Findings for the current version of every project file"""
+
+    def __init__(self):
+        self.findings = {}
+        self._contents = {}
+
+    def check(self, filename, content):
+        if self._contents.get(filename) is content:
+            return self.findings.get(filename, [])
+        self._contents[filename] = content
+        self.findings[filename] = check_file(filename, content)
+        return self.findings[filename]
+
+    def sync(self, project_files):
+        for filename, content in project_files.items():
+            if isinstance(content, str) and content not in NON_TEXT:
+                self.check(filename, content)
+        for filename in list(self.findings):
+            if filename not in project_files:
+                del self.findings[filename]
+                self._contents.pop(filename, None)
+
+    def all_findings(self, references, exists):
+        """(file, line, message) for every file plus cross-file checks"""
+        found = [
+            (filename, line, message)
+            for filename, findings in sorted(self.findings.items())
+            for line, message in findings
+        ]
+        found += [
+            (source, None, f"broken link {value}")
+            for source, value in references.broken_links(exists)
+        ]
+        found += [
+            (source, None, f"missing image {value}")
+            for source, value in references.broken_images(exists)
+        ]
+        unused = references.unused_classes()
+        if unused:
+            found.append(
+                (
+                    "*.css",
+                    None,
+                    f"unused CSS classes: {', '.join(unused[:10])}",
+                )
+            )
+        return found
+
+    def report(self, references, exists):
+        """Compact findings list for an agent prompt"""
+        found = self.all_findings(references, exists)
+        if not found:
+            return (
+                f"\n\nStatic analysis: no issues found in "
+                f"{len(self.findings)} files."
+            )
+        lines = [
+            f"- {filename}{f':{line}' if line else ''}: {message}"
+            for filename, line, message in found[:MAX_FINDINGS]
+        ]
+        if len(found) > MAX_FINDINGS:
+            lines.append(f"- ... {len(found) - MAX_FINDINGS} more")
+        return (
+            f"\n\nStatic analysis findings ({len(found)}; already checked "
+            f"mechanically, focus your review on everything else):\n"
+            + "\n".join(lines)
+        )
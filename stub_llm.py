@@ -0,0 +1,179 @@
+"""
+Deterministic offline stand-in for the Gemini API.
+
+Enabled with LLM_PROVIDER=stub. Each agent answers in its role with the
+same action formats the real model is instructed to use, so whole workflows
+(file writes, reads and image jobs included) can run without network access
+or API quota.
+
+STUB_LLM_LATENCY adds a fixed delay (in seconds) to every reply and
+STUB_LLM_RESPONSE_BYTES pads replies to roughly that size, so benchmarks can
+model a slow or verbose model.
+"""
+
+import hashlib
+import re
+import time
+from environment import getenv
+
+PAGE_NAMES = ["about", "services", "contact", "gallery", "team", "pricing"]
+IMAGE_NAMES = ["hero", "product", "banner", "team", "gallery", "background"]
+
+
+def _pick(names, texts, digest):
+    """First known name mentioned in the texts, else one chosen by digest"""
+    for text in texts:
+        lowered = text.lower()
+        for name in names:
+            if re.search(rf"\b{name}\b", lowered):
+                return name
+    return names[int(digest, 16) % len(names)]
+
+
+def _last_prompt(conversation_text):
+    """The prompt of the final turn in the conversation transcript"""
+    marker = conversation_text.rfind("\nUser: ")
+    last = (
+        conversation_text[marker + 1 :] if marker >= 0 else conversation_text
+    )
+    last = re.sub(r"^User: [^:\n]*: ", "", last)
+    # Drop the file listing, change report or findings appended to prompts
+    return re.split(
+        r"\n\n(?:Current project files|Project digest|Static analysis"
+        r"|Performance budget violations"
+        r"|Project changes since your last turn"
+        r"|No project file changes since your last turn)",
+        last,
+    )[0]
+
+
+def _page(title, slug):
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="stylesheet" href="styles.css">
+</head>
+<body>
+    <nav>
+        <ul>
+            <li><a href="index.html">Home</a></li>
+        </ul>
+    </nav>
+    <main>
+        <h1>{title}</h1>
+        <img src="images/{slug}.png" alt="{title}">
+        <p>Content for {title}.</p>
+    </main>
+    <script src="script.js"></script>
+</body>
+</html>"""
+
+
+STYLESHEET = """body {
+    font-family: sans-serif;
+    margin: 0;
+    color: #333333;
+}
+
+nav ul {
+    display: flex;
+    gap: 1rem;
+    list-style: none;
+}
+
+img {
+    max-width: 100%;
+    height: auto;
+}"""
+
+SCRIPT = """document.addEventListener("DOMContentLoaded", function () {
+    console.log("Site loaded");
+});"""
+
+
+def _filler(size, line):
+    """Numbered copies of a template line adding up to about size bytes"""
+    lines = []
+    total = 0
+    while total < size:
+        lines.append(line.format(n=len(lines) + 1))
+        total += len(lines[-1]) + 1
+    return "\n".join(lines)
+
+
+def generate(agent_name, conversation_text):
+    """Return a canned but well-formed reply for the given agent"""
+    latency = float(getenv("STUB_LLM_LATENCY", "0") or 0)
+    if latency > 0:
+        time.sleep(latency)
+    reply = _reply(agent_name, conversation_text)
+
+    padding = int(getenv("STUB_LLM_RESPONSE_BYTES", "0") or 0) - len(reply)
+    if padding <= 0:
+        return reply
+    if agent_name == "Developer":
+        rules = _filler(padding, ".section-{n} {{ margin: {n}px 0; }}")
+        return reply.replace(STYLESHEET, f"{STYLESHEET}\n\n{rules}", 1)
+    notes = _filler(padding, "- Note {n}: keep the layout consistent.")
+    return f"{reply}\n\n{notes}"
+
+
+def _reply(agent_name, conversation_text):
+    prompt = _last_prompt(conversation_text)
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:6]
+
+    if agent_name == "Developer":
+        if "index.html" not in conversation_text or "HTML structure" in prompt:
+            filename, title = "index.html", "Home"
+        else:
+            turns = re.findall(r"^User: user: (.*)$", conversation_text, re.M)
+            name = _pick(PAGE_NAMES, [prompt] + turns[::-1], digest)
+            filename, title = f"{name}.html", name.title()
+        return f"""I'll implement this now.
+
+FILE_ACTION: CREATE
+FILENAME: {filename}
+CONTENT:
+```html
+{_page(title, filename[:-5])}
+```
+
+FILE_ACTION: CREATE
+FILENAME: styles.css
+CONTENT:
+```css
+{STYLESHEET}
+```
+
+FILE_ACTION: CREATE
+FILENAME: script.js
+CONTENT:
+```javascript
+{SCRIPT}
+```
+
+The files are in place. Next step: QA review."""
+
+    if agent_name == "Designer":
+        slug = f"{_pick(IMAGE_NAMES, [prompt], digest)}-{digest[:4]}"
+        return f"""Here is the visual direction: a clean layout with a warm palette.
+
+IMAGE_ACTION: GENERATE
+FILENAME: images/{slug}.png
+PROMPT: Professional {slug.split("-")[0]} image for the website
+STYLE: modern, clean
+
+That sounds good for a first pass."""
+
+    if agent_name == "QA":
+        return """Let me check the current implementation.
+
+FILE_ACTION: READ
+FILENAME: index.html
+
+Structure looks correct, no blocking bugs found."""
+
+    return "That sounds good, agreed. Let's move forward with the next step."
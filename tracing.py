@@ -0,0 +1,245 @@
+"""
+Lightweight tracing spans for conversation rounds, LLM calls, parsing, file
+access and image jobs.
+
+Tracing is off by default and a disabled span costs one flag check. Set
+TRACE_FILE=trace.json to record spans for a run: at exit they are written as
+Chrome trace events (open the file in https://ui.perfetto.dev or
+chrome://tracing), as folded stacks next to it (trace.folded, for
+flamegraph.pl or speedscope), and a critical-path summary is printed.
+
+A saved trace can be summarized again with:
+    python tracing.py trace.json
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from pathlib import Path
+from environment import getenv
+
+enabled = False
+events = []
+
+_NULL_SPAN = nullcontext()
+_origin = time.perf_counter()
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "start")
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        events.append(
+            {
+                "name": self.name,
+                "cat": self.cat,
+                "ph": "X",
+                "ts": round((self.start - _origin) * 1e6, 1),
+                "dur": round((end - self.start) * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            }
+        )
+        return False
+
+
+def span(name, cat="", **args):
+    """Context manager timing a block; a shared no-op when disabled"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def traced(name, cat="", detail=None):
+    """
+    Decorator wrapping every call of a function in a span. detail, if
+    given, is called with the function's arguments and returns span args.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            span_args = detail(*args, **kwargs) if detail else {}
+            with _Span(name, cat, span_args):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def start():
+    global enabled
+    events.clear()
+    enabled = True
+
+
+def stop():
+    global enabled
+    enabled = False
+
+
+def export_chrome(path):
+    """Write the recorded spans in Chrome trace-event format"""
+    Path(path).write_text(
+        json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+    )
+
+
+def build_tree(trace_events):
+    """
+    Nest spans into a tree of dicts with a children list. Spans are nested
+    by time on their own thread; a span that starts a thread (an image job
+    in a worker) hangs under the innermost span enclosing it on any thread.
+    """
+    spans = sorted(
+        (
+            {**e, "end": e["ts"] + e["dur"], "children": []}
+            for e in trace_events
+            if e.get("ph") == "X"
+        ),
+        key=lambda s: (s["ts"], -s["dur"]),
+    )
+    roots = []
+    stacks = defaultdict(list)
+    for node in spans:
+        stack = stacks[(node["pid"], node["tid"])]
+        while stack and stack[-1]["end"] <= node["ts"]:
+            stack.pop()
+        parent = stack[-1] if stack else None
+        if parent is None:
+            enclosing = [
+                s
+                for s in spans
+                if s is not node
+                and s["pid"] == node["pid"]
+                and s["ts"] <= node["ts"]
+                and s["end"] >= node["end"]
+                and s["dur"] > node["dur"]
+            ]
+            if enclosing:
+                parent = min(enclosing, key=lambda s: s["dur"])
+        (parent["children"] if parent else roots).append(node)
+        stack.append(node)
+    return roots
+
+
+def critical_path(node):
+    """
+    Walk backwards from the end of a span, always following the child that
+    finishes last before the current point. Returns (span, exclusive time)
+    pairs; time not covered by a chosen child is the span's own.
+    """
+    path = []
+    cursor = node["end"]
+    own = 0.0
+    for child in sorted(
+        node["children"], key=lambda c: c["end"], reverse=True
+    ):
+        # Skip children overlapping one already on the path (1 us slack
+        # absorbs timestamp rounding)
+        if child["end"] > cursor + 1.0:
+            continue
+        own += max(0.0, cursor - child["end"])
+        path.extend(critical_path(child))
+        cursor = child["ts"]
+    own += max(0.0, cursor - node["ts"])
+    path.append((node, own))
+    return path
+
+
+def export_folded(path, roots):
+    """Write folded stacks (name;child;grandchild microseconds)"""
+    lines = defaultdict(float)
+
+    def walk(node, prefix):
+        stack = f"{prefix};{node['name']}" if prefix else node["name"]
+        children = sum(c["dur"] for c in node["children"])
+        lines[stack] += max(0.0, node["dur"] - children)
+        for child in node["children"]:
+            walk(child, stack)
+
+    for root in roots:
+        walk(root, "")
+    Path(path).write_text(
+        "".join(f"{stack} {round(us)}\n" for stack, us in lines.items())
+    )
+
+
+def report(trace_events, top=15):
+    """Summarize where the critical path of the run spent its time"""
+    roots = build_tree(trace_events)
+    if not roots:
+        return "No spans recorded."
+    wall = max(r["end"] for r in roots) - min(r["ts"] for r in roots)
+    by_category = defaultdict(float)
+    by_name = defaultdict(lambda: [0.0, 0])
+    for root in roots:
+        for node, own in critical_path(root):
+            by_category[node["cat"] or node["name"]] += own
+            by_name[node["name"]][0] += own
+            by_name[node["name"]][1] += 1
+
+    lines = [f"Critical path of {wall / 1e6:.2f}s across {len(roots)} roots"]
+    lines.append("By category:")
+    for cat, us in sorted(by_category.items(), key=lambda i: -i[1]):
+        lines.append(f"  {cat:<12} {us / 1e6:9.2f}s  {us / wall:6.1%}")
+    lines.append("By span:")
+    ranked = sorted(by_name.items(), key=lambda i: -i[1][0])[:top]
+    for name, (us, count) in ranked:
+        lines.append(
+            f"  {name:<32} {us / 1e6:9.2f}s  {us / wall:6.1%}  ({count}x)"
+        )
+    return "\n".join(lines)
+
+
+def _write_outputs(path):
+    export_chrome(path)
+    folded = Path(path).with_suffix(".folded")
+    export_folded(folded, build_tree(events))
+    print(f"\n🧭 Trace written to {path} and {folded}")
+    print(report(events))
+
+
+def install_from_env():
+    """Start tracing if TRACE_FILE is set and write the results at exit"""
+    path = getenv("TRACE_FILE")
+    if not path or enabled:
+        return None
+    import atexit
+
+    start()
+    atexit.register(_write_outputs, path)
+    return path
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a saved trace")
+    parser.add_argument("trace")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    trace = json.loads(Path(args.trace).read_text())
+    print(report(trace["traceEvents"], args.top))
+
+
+if __name__ == "__main__":
+    main()